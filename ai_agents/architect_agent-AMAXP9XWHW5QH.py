@@ -1,18 +1,25 @@
 
 # ai_agents/architect_agent.py
 import logging
+import time
+from ai_agents.config import get_config
+from ai_agents.jobs import current_job, get_job_registry
+from ai_agents.resilience import LLMUnavailable, backoff_delay
 from ai_agents.requirements_agent import RequirementsAnalyzer
 from ai_agents.understanding_agent import UnderstandingAgent
 from ai_agents.impact_agent import ImpactAnalyzerAgent
 from ai_agents.blueprint_agent import BlueprintGeneratorAgent
 from ai_agents.doc_generator_agent import DocGeneratorAgent
-from ai_agents.sdk_tools import search_vector, detect_intent
+from ai_agents.sdk_tools import retrieve, detect_intent
 from ai_agents.db import ChatDB
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import json
+from ai_agents.pipeline import Stage, run_pipeline
+from tools.doc_store import materialize
 
 logger = logging.getLogger(__name__)
 
+# seconds an agent stage may run before the pipeline gives up on it
+STAGE_TIMEOUT = 180
+
 # Initialize agents
 req_analyzer = RequirementsAnalyzer()
 understanding_agent = UnderstandingAgent()
@@ -21,49 +28,39 @@ blueprint_agent = BlueprintGeneratorAgent()
 doc_agent = DocGeneratorAgent()
 db = ChatDB()
 
-# Structured status reporting for UI polling
-_STATUS = {"phase": None, "agents": [], "logs": []}
+# Progress is reported to the job the request runs in (ai_agents.jobs), so concurrent
+# users each see their own phase, agent statuses and logs.
+_NO_JOB_STATUS = {"phase": None, "agents": [], "logs": []}
 
 
 def set_status(msg: str):
     """Set a human-readable phase/status string for UI."""
-    try:
-        _STATUS["phase"] = msg
-    except Exception:
-        pass
+    job = current_job()
+    if job is not None:
+        job.set_phase(msg)
 
 
 def set_agent_status(agent_name: str, status: str):
     """Set/append status for a named agent (pending, running, done, error)."""
-    try:
-        agents = _STATUS.setdefault("agents", [])
-        # find existing
-        for a in agents:
-            if a.get("name") == agent_name:
-                a["status"] = status
-                return
-        # not found, append
-        agents.append({"name": agent_name, "status": status})
-    except Exception:
-        pass
+    job = current_job()
+    if job is not None:
+        job.set_agent(agent_name, status)
 
-def append_log(msg: str):
-    """Append a short log entry to the status for UI streaming."""
-    try:
-        lst = _STATUS.setdefault("logs", [])
-        # keep logs bounded
-        # store the original object (dict or string) so UI can render structured logs
-        lst.append(msg)
-        if len(lst) > 200:
-            lst[:] = lst[-200:]
-    except Exception:
-        pass
 
-def get_logs():
-    try:
-        return _STATUS.get("logs", [])
-    except Exception:
-        return []
+def append_log(msg):
+    """Append a short log entry (string or dict) to the job's bounded event buffer."""
+    job = current_job()
+    if job is not None:
+        job.log(msg)
+
+
+def _job(job_id=None):
+    return get_job_registry().get(job_id) if job_id else current_job()
+
+
+def get_logs(job_id=None):
+    job = _job(job_id)
+    return job.snapshot()["logs"] if job is not None else []
 
 
 def _resolve_agent_name(agent_callable):
@@ -88,41 +85,72 @@ def _resolve_agent_name(agent_callable):
         return str(agent_callable)
 
 
-def get_status():
-    """Return the structured status dict for UI consumption.
-
-    Older UI code may expect a string; callers should handle both.
+def get_status(job_id=None):
+    """Return the structured status dict of a job (default: the current one) for UI polling:
+    {"id", "state", "phase", "agents": [{"name", "status"}], "logs": [...], "seq"}.
+    Unknown or expired jobs get an empty status.
     """
-    return _STATUS
+    job = _job(job_id)
+    return job.snapshot() if job is not None else dict(_NO_JOB_STATUS)
+
+
+def submit_agent_job(user_input: str, persist_dir: str = "chroma_db"):
+    """Run `run_agent_sync` as a job on the shared job pool; returns the `Job` immediately.
+    Poll `get_status(job.id)` (or follow `job.wait_events`) and collect `job.result()`."""
+    return get_job_registry().submit(run_agent_sync, user_input, persist_dir, query=user_input)
 
 
 def _build_context(user_input: str, persist_dir: str):
-    rag = search_vector(user_input, top_k=5, persist_dir=persist_dir)
-    docs = rag.get("documents", [[]])[0] if isinstance(rag.get("documents"), list) else []
-    metadatas = rag.get("metadatas", [[]])[0] if isinstance(rag.get("metadatas"), list) else []
-
-    context_pieces = []
-    for i, doc in enumerate(docs):
-        src = metadatas[i].get("source") if i < len(metadatas) else None
-        context_pieces.append(f"Source: {src}\n{doc}")
+    # typed hits, like architect_agent; texts are loaded in one batch
+    hits = materialize(retrieve(user_input, top_k=5, persist_dir=persist_dir))
+    context_pieces = [f"Source: {h.source}\n{h.text}" for h in hits if h.text]
     context = "\n\n---\n\n".join(context_pieces)[:30000] if context_pieces else "No relevant documents found."
     return context, len(context_pieces)
 
 
+def _stage(agent_callable, deps=(), timeout=STAGE_TIMEOUT):
+    return Stage(_resolve_agent_name(agent_callable), agent_callable,
+                 tuple(_resolve_agent_name(d) for d in deps), timeout)
+
+
+# Per-intent DAGs: stages without dependencies run in parallel on the shared pipeline
+# executor; a stage receives the outputs of the stages it depends on in its context.
+# Understanding and impact analysis both only need the RAG context, so they always overlap.
 AGENT_PIPELINES = {
-    "impact": {"strategy": "parallel", "agents": [understanding_agent.analyze, impact_agent.analyze], "synthesis": True},
-    "blueprint": {"strategy": "sequence", "agents": [understanding_agent.analyze, impact_agent.analyze, blueprint_agent.generate], "synthesis": False},
-    "documentation": {"strategy": "sequence", "agents": [doc_agent.generate], "synthesis": False},
-    "understanding": {"strategy": "sequence", "agents": [understanding_agent.analyze], "synthesis": False},
-    "generic": {"strategy": "parallel", "agents": [understanding_agent.analyze], "synthesis": False},
+    "impact": {"stages": [
+        _stage(understanding_agent.analyze),
+        _stage(impact_agent.analyze),
+        # synthesis of both findings
+        _stage(blueprint_agent.generate, deps=(understanding_agent.analyze, impact_agent.analyze)),
+    ], "synthesis": True},
+    "blueprint": {"stages": [
+        _stage(understanding_agent.analyze),
+        _stage(impact_agent.analyze),
+        _stage(blueprint_agent.generate, deps=(understanding_agent.analyze, impact_agent.analyze)),
+    ], "synthesis": False},
+    "documentation": {"stages": [_stage(doc_agent.generate)], "synthesis": False},
+    "understanding": {"stages": [_stage(understanding_agent.analyze)], "synthesis": False},
+    "generic": {"stages": [_stage(understanding_agent.analyze)], "synthesis": False},
 }
 
+# user asked for an "impact assessment document"
+IMPACT_DOC_PIPELINE = {"stages": [
+    _stage(understanding_agent.analyze),
+    _stage(impact_agent.analyze),
+    _stage(doc_agent.generate, deps=(understanding_agent.analyze, impact_agent.analyze)),
+], "synthesis": False}
+
 
 def _attempt_refinement(agent_callable, user_input, context, prev_outputs, max_retries=2):
-    """Try to call the agent up to `max_retries` times, passing previous outputs as extra context."""
-    attempt = 0
+    """Try to call the agent up to `max_retries` times, passing previous outputs as extra context.
+
+    Attempts are spaced with jittered backoff; an open LLM circuit ends refinement at once
+    (the LLM layer has already retried transient errors)."""
     last_out = None
-    while attempt <= max_retries:
+    settings = get_config().resilience
+    for attempt in range(max_retries + 1):
+        if attempt:
+            time.sleep(backoff_delay(attempt - 1, settings.backoff_base_s, settings.backoff_cap_s))
         try:
             augmented_context = context + "\n\nPrevious agent outputs:\n" + ("\n".join(prev_outputs) if prev_outputs else "")
             out = agent_callable(user_input, augmented_context)
@@ -130,16 +158,18 @@ def _attempt_refinement(agent_callable, user_input, context, prev_outputs, max_r
             # Quick quality heuristic: non-empty and not the 'could not parse' fallback
             if out and not out.strip().lower().startswith("could not parse"):
                 return out
+        except LLMUnavailable as e:
+            logger.warning("⛔ Skipping refinement: %s", e)
+            break
         except Exception:
-            pass
-        attempt += 1
+            logger.exception("Refinement attempt %d failed", attempt + 1)
     return last_out or ""
 
 
 def run_agent_sync(user_input: str, persist_dir: str = "chroma_db"):
     """
-    Enhanced orchestrator supporting pipeline execution (sequence/parallel), optional synthesis,
-    and simple iterative refinement when outputs look incomplete.
+    Enhanced orchestrator running per-intent agent DAGs (see `ai_agents.pipeline`), optional
+    synthesis, and simple iterative refinement when outputs look incomplete.
     Returns a combined response and persists chat history.
     """
     try:
@@ -160,83 +190,32 @@ def run_agent_sync(user_input: str, persist_dir: str = "chroma_db"):
         pipeline = AGENT_PIPELINES.get(intent, AGENT_PIPELINES.get("generic"))
         lower_input = (user_input or "").lower()
         if "impact assessment" in lower_input or ("impact" in lower_input and "document" in lower_input) or ("generate" in lower_input and "impact" in lower_input):
-            pipeline = {"strategy": "sequence", "agents": [understanding_agent.analyze, impact_agent.analyze, doc_agent.generate], "synthesis": False}
-        strategy = pipeline.get("strategy")
-        agent_calls = pipeline.get("agents", [])
-
-        results = []
-
-        # Initialize per-agent statuses
-        _STATUS["agents"] = []
-        for ag in agent_calls:
-            name = _resolve_agent_name(ag)
-            set_agent_status(name, "pending")
-            append_log({"agent": name, "status": "pending", "output": ""})
-
-        # Execute agents
-        if strategy == "parallel":
-            set_status("Running agents (parallel)")
-            with ThreadPoolExecutor(max_workers=len(agent_calls) or 1) as ex:
-                futures = {ex.submit(agent, user_input, context): agent for agent in agent_calls}
-                for fut in as_completed(futures):
-                    agent = futures[fut]
-                    name = _resolve_agent_name(agent)
-                    set_agent_status(name, "running")
-                    append_log({"agent": name, "status": "running", "output": ""})
-                    try:
-                        out = fut.result()
-                        set_agent_status(name, "done")
-                        append_log({"agent": name, "status": "done", "output": out[:400]})
-                    except Exception as e:
-                        logger.exception("Agent %s failed: %s", name, e)
-                        out = f"Agent {name} error: {e}"
-                        set_agent_status(name, "error")
-                        append_log({"agent": name, "status": "error", "output": str(e)})
-                    results.append((name, out))
-        else:  # sequence
-            set_status("Running agents (sequence)")
-            prev_outputs = []
-            for agent in agent_calls:
-                name = _resolve_agent_name(agent)
-                set_agent_status(name, "running")
-                append_log({"agent": name, "status": "running", "output": ""})
-                try:
-                    out = agent(user_input, context)
-                    set_agent_status(name, "done")
-                    append_log({"agent": name, "status": "done", "output": out[:400]})
-                except TypeError:
-                    # try without context
-                    try:
-                        out = agent(user_input)
-                        set_agent_status(name, "done")
-                        append_log({"agent": name, "status": "done", "output": out[:400]})
-                    except Exception as e:
-                        logger.exception("Agent sequence failure: %s", e)
-                        out = f"Agent error: {e}"
-                        set_agent_status(name, "error")
-                        append_log({"agent": name, "status": "error", "output": str(e)})
-                except Exception as e:
-                    logger.exception("Agent sequence failure: %s", e)
-                    out = f"Agent error: {e}"
-                    set_agent_status(name, "error")
-                    append_log({"agent": name, "status": "error", "output": str(e)})
-                results.append((name, out))
-                prev_outputs.append(out if isinstance(out, str) else json.dumps(out))
-
-        # Optional synthesis step: when pipeline requests it, ask the blueprint agent to synthesize findings
-        final_response = None
-        if pipeline.get("synthesis"):
-            set_status("Synthesizing final response")
-            # combine results into a single context and call blueprint_agent to synthesize
-            synth_context = context + "\n\nAgent outputs:\n" + "\n\n".join([f"=={name}==\n{out}" for name, out in results])
-            try:
-                final_response = blueprint_agent.generate(user_input, synth_context)
-            except Exception as e:
-                logger.exception("Synthesis failed: %s", e)
-                final_response = "\n\n".join([out for _, out in results])
+            pipeline = IMPACT_DOC_PIPELINE
+        stages = pipeline["stages"]
+
+        # stage callbacks run on pipeline threads; bind this request's job explicitly
+        job = current_job()
+
+        def on_event(name, status, detail):
+            if job is not None:
+                job.set_agent(name, status, detail)
+
+        set_status("Running agents")
+        pipeline_result = run_pipeline(stages, user_input, context, on_event=on_event)
+        logger.info("⏱️ Stage timings (ms): %s", pipeline_result.timings)
+        if not pipeline_result.complete:
+            logger.warning("⚠️ Partial pipeline result: errors=%s skipped=%s",
+                           pipeline_result.errors, pipeline_result.skipped)
+
+        # Synthesis pipelines answer with their final stage; otherwise concatenate agent outputs
+        # in pipeline order (a failed synthesis falls back to whatever branches finished)
+        results = [(st.name, pipeline_result.outputs[st.name]) for st in stages if st.name in pipeline_result.outputs]
+        final_stage = stages[-1].name
+        if pipeline.get("synthesis") and final_stage in pipeline_result.outputs:
+            final_response = pipeline_result.outputs[final_stage]
         else:
-            # Concatenate agent outputs as the final response
             final_response = "\n\n".join([f"[{name}]\n{out}" for name, out in results])
+        agent_calls = [s.fn for s in stages]
 
         # Quick iterative refinement: if response seems too short or contains known error markers, retry main agent
         if (not final_response or len(final_response) < 20) and agent_calls:
@@ -1,81 +1,463 @@
 # ai_agents/architect_agent.py
+import asyncio
 import logging
-from ai_agents.requirements_agent import RequirementsAnalyzer
-from ai_agents.understanding_agent import UnderstandingAgent
-from ai_agents.impact_agent import ImpactAnalyzerAgent
-from ai_agents.blueprint_agent import BlueprintGeneratorAgent
-from ai_agents.doc_generator_agent import DocGeneratorAgent
-from ai_agents.sdk_tools import search_vector, detect_intent
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+from ai_agents.config import get_config, subscribe
+from ai_agents.registry import get_agent
+from ai_agents.sdk_tools import retrieve, detect_intent, get_vector_store
+from ai_agents.intent_classifier import DEFAULT_EXAMPLES, IntentClassifier, load_examples
 from ai_agents.db import ChatDB
+from ai_agents.prompt_cache import bypass_prompt_cache
+from ai_agents.runtime import limit, run_coroutine
+from ai_agents.singleflight import SingleFlight
+from tools.retrieval_executor import run_retrieval
+from tools.reranker import get_reranker, DEFAULT_RERANK_MODEL
+from tools.window_assembler import assemble_windows
+from tools.doc_store import materialize
+from tools.embedding_cache import get_query_embedding_cache, normalize_query
+from tools.symbol_index import get_symbol_index
+from tools.response_cache import CachedResponse, get_response_cache
+from ai_agents.context_assembler import ContextPiece, assemble_context
+from tools.context_compressor import compress_pieces
 
 logger = logging.getLogger(__name__)
 
-# Initialize agents
-req_analyzer = RequirementsAnalyzer()
-understanding_agent = UnderstandingAgent()
-impact_agent = ImpactAnalyzerAgent()
-blueprint_agent = BlueprintGeneratorAgent()
-doc_agent = DocGeneratorAgent()
-db = ChatDB()
+# first call sizes the shared query-embedding cache
+QUERY_CACHE = get_query_embedding_cache(max_bytes=int(get_config().retrieval.query_cache_mb * 1024 * 1024))
 
+# identical requests / retrievals in flight at once share one execution
+_REQUEST_FLIGHTS = SingleFlight("request")
+_RETRIEVAL_FLIGHTS = SingleFlight("retrieval")
 
-def run_agent_sync(user_input: str, persist_dir: str = "chroma_db"):
+# agents are built on first use (ai_agents.registry); so is the chat DB
+_CHAT_DB = None
+_CHAT_DB_LOCK = threading.Lock()
+
+
+def _chat_db() -> ChatDB:
+    global _CHAT_DB
+    with _CHAT_DB_LOCK:
+        if _CHAT_DB is None:
+            _CHAT_DB = ChatDB()
+        return _CHAT_DB
+
+
+_INTENT_CLASSIFIER = None
+_INTENT_CLASSIFIER_LOCK = threading.Lock()
+
+
+@subscribe
+def _on_config_change(old, new):
+    global _INTENT_CLASSIFIER
+    if old.retrieval.query_cache_mb != new.retrieval.query_cache_mb:
+        QUERY_CACHE.resize(int(new.retrieval.query_cache_mb * 1024 * 1024))
+        logger.info("🧠 Query embedding cache resized to %.0f MB", new.retrieval.query_cache_mb)
+    if (old.intent.examples, old.intent.temperature) != (new.intent.examples, new.intent.temperature):
+        # rebuilt (and centroids refitted) on the next query
+        with _INTENT_CLASSIFIER_LOCK:
+            _INTENT_CLASSIFIER = None
+
+
+def _intent_classifier(persist_dir: str) -> IntentClassifier:
+    """Shared local classifier on the vector store's (cached) query embedder."""
+    global _INTENT_CLASSIFIER
+    with _INTENT_CLASSIFIER_LOCK:
+        if _INTENT_CLASSIFIER is None:
+            cfg = get_config()
+            vs = get_vector_store(persist_dir, cfg.retrieval.nprobe)
+            _INTENT_CLASSIFIER = IntentClassifier(vs.encode_queries,
+                                                  load_examples(cfg.intent.examples or DEFAULT_EXAMPLES),
+                                                  temperature=cfg.intent.temperature)
+        return _INTENT_CLASSIFIER
+
+
+async def _detect_intent(user_input: str, persist_dir: str) -> dict:
+    """Local embedding classifier first; the LLM analyzer only for low-confidence queries."""
+    settings = get_config().intent
+    if settings.local:
+        try:
+            async with limit("retrieval"):
+                label, confidence = await run_retrieval(_intent_classifier(persist_dir).classify, user_input)
+            if confidence >= settings.min_confidence:
+                logger.info("🧭 Local intent: %s (confidence %.2f)", label, confidence)
+                return {"intent": label, "confidence": confidence, "source": "local"}
+            logger.info("🧭 Local intent %s too uncertain (%.2f); asking the LLM", label, confidence)
+        except Exception:
+            logger.exception("Local intent classification failed; asking the LLM")
+    info = await get_agent("requirements").aget_intent(user_input)
+    info.setdefault("source", "llm")
+    return info
+
+
+async def _timed(timings: Dict[str, float], stage: str, awaitable):
+    """Await `awaitable`, recording its wall time in ms under `stage`."""
+    t0 = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[stage] = round((time.perf_counter() - t0) * 1000, 1)
+
+
+def _index_generation(persist_dir: str) -> int:
+    """Generation of the vector index (changes on every write); part of coalescing keys."""
+    return get_vector_store(persist_dir, get_config().retrieval.nprobe).generation()
+
+
+async def _aindex_generation(persist_dir: str) -> Optional[int]:
+    try:
+        return await run_retrieval(_index_generation, persist_dir)
+    except Exception:
+        logger.exception("Could not read the index generation; not coalescing")
+        return None
+
+
+async def _aretrieve_pieces(user_input: str, persist_dir: str) -> List[ContextPiece]:
+    """`_retrieve_pieces` on the shared retrieval pool, within the "retrieval" concurrency limit.
+    Identical retrievals (same normalised query, index and generation) in flight share one search."""
+    async def search():
+        async with limit("retrieval"):
+            return await run_retrieval(_retrieve_pieces, user_input, persist_dir)
+
+    generation = await _aindex_generation(persist_dir)
+    if generation is None:
+        return await search()
+    return await _RETRIEVAL_FLIGHTS.ado((normalize_query(user_input), persist_dir, generation), search)
+
+
+def _symbol_pieces(user_input: str) -> List[ContextPiece]:
+    """Defining code of the known symbols / files the query names exactly (empty if none)."""
+    cfg = get_config()
+    if not cfg.retrieval.symbol_index.enabled:
+        return []
+    pieces = []
+    for sym in get_symbol_index(cfg.app.metadata_dir).lookup(user_input, cfg.retrieval.symbol_index.max_symbols):
+        text = sym.read()
+        if text:
+            span = f" [lines {sym.start_line}-{sym.end_line}]" if sym.start_line else ""
+            pieces.append(ContextPiece(sym.file, text, f"Source: {sym.file}{span} ({sym.kind} {sym.name})", 1.0))
+    return pieces
+
+
+def _retrieve_pieces(user_input: str, persist_dir: str) -> List[ContextPiece]:
+    """Retrieve ranked RAG context pieces for the query (best first).
+
+    Queries naming known symbols (see `tools.symbol_index`) get the defining code directly,
+    without embedding the query or searching the vector index. Otherwise, when `retrieval.rerank.enabled` is set, over-fetches `candidates` hits and keeps the
+    `keep` best according to the local cross-encoder, so the prompt stays small.
+    """
+    pieces = _symbol_pieces(user_input)
+    if pieces:
+        logger.info("🎯 Symbol fast path: %s", [p.header for p in pieces])
+        return pieces
+
+    settings = get_config().retrieval
+    rerank_cfg, windows_cfg = settings.rerank, settings.windows
+    top_k = settings.top_k
+    rerank = rerank_cfg.enabled
+    rerank_model = rerank_cfg.model or DEFAULT_RERANK_MODEL
+    candidates = rerank_cfg.candidates
+    if rerank:
+        top_k = rerank_cfg.keep
+        # first call builds the shared reranker with the configured bounds
+        get_reranker(rerank_model, batch_size=rerank_cfg.batch_size,
+                     max_candidates=candidates, max_chars=rerank_cfg.max_chars)
+
+    hits = retrieve(user_input, top_k=top_k, persist_dir=persist_dir,
+                    rerank=rerank, candidates=candidates, rerank_model=rerank_model,
+                    mode=settings.mode,
+                    lambda_mult=settings.mmr_lambda,
+                    nprobe=settings.nprobe)
+    if windows_cfg.enabled:
+        # coalesce neighbouring chunk hits into one excerpt per file region; windows are read
+        # from the source files (spans checked against their index-time digests), so chunk
+        # texts are only loaded for the fallbacks
+        windows = assemble_windows(hits, pad_bytes=windows_cfg.pad_bytes, max_gap=windows_cfg.max_gap)
+        return [ContextPiece(w.source, w.text,
+                             f"Source: {w.source}" + (f" [bytes {w.start}-{w.end}]" if w.start is not None else ""),
+                             w.score) for w in windows]
+    return [ContextPiece(h.source, h.text, f"Source: {h.source}", h.score) for h in materialize(hits)]
+
+
+def _context_budget(agent_key: str) -> int:
+    """Token budget for an agent's prompt context (`context_budgets` in config, keyed like llm_mapping)."""
+    return get_config().context_budget(agent_key)
+
+
+def _compression_settings(agent_key: str) -> dict:
+    """Per-agent compression settings (`compression` in config) layered over `compression.default`."""
+    return get_config().compression_for(agent_key)
+
+
+def _prepare_context(pieces: List[ContextPiece], agent_key: str):
+    """Compress then budget the retrieved pieces for one agent; returns the AssembledContext."""
+    pieces, stats = compress_pieces(pieces, _compression_settings(agent_key))
+    assembled = assemble_context(pieces, _context_budget(agent_key))
+    assembled.compression = stats
+    return assembled
+
+
+def _build_context(user_input: str, persist_dir: str, agent_key: str = "default"):
+    """Retrieve and assemble RAG context sized for `agent_key`; returns (context_text, num_pieces)."""
+    assembled = _prepare_context(_retrieve_pieces(user_input, persist_dir), agent_key)
+    return assembled.text, len(assembled.included)
+
+
+# intent -> (llm_mapping / context_budgets key, display name, registry agent, blocking method);
+# the async path awaits the agent's "a" + method coroutine
+ROUTES = {
+    "impact": ("impact_agent", "ImpactAnalyserAgent", "impact", "analyze"),
+    "blueprint": ("blueprint_agent", "BlueprintGeneratorAgent", "blueprint", "generate"),
+    "documentation": ("doc_agent", "DocGeneratorAgent", "documentation", "generate"),
+    "understanding": ("understanding_agent", "UnderstandingAgent", "understanding", "analyze"),
+}
+GENERIC_ROUTE = ("understanding_agent", "GenericAgent", "understanding", "analyze")
+
+
+@dataclass
+class PreparedRequest:
+    agent_name: str
+    agent: Any
+    method: str
+    intent: str
+    assembled: Any = None                     # AssembledContext; None when served from cache
+    cached: Optional[CachedResponse] = None
+
+
+def _response_cache(persist_dir: str):
+    """Semantic response cache stored next to the index, or None when disabled."""
+    settings = get_config().response_cache
+    if not settings.enabled:
+        return None
+    return get_response_cache(os.path.join(persist_dir, settings.file),
+                              threshold=settings.threshold, max_entries=settings.max_entries)
+
+
+def _cacheable_intent(intent: str) -> bool:
+    return intent in get_config().response_cache.intents
+
+
+def _cache_key(user_input: str, persist_dir: str):
+    """(query embedding, index generation); the embedding comes from the shared query cache."""
+    vs = get_vector_store(persist_dir, get_config().retrieval.nprobe)
+    return vs.encode_queries([user_input])[0], vs.generation()
+
+
+def _lookup_response(user_input: str, persist_dir: str, intent: str) -> Optional[CachedResponse]:
+    cache = _response_cache(persist_dir)
+    if cache is None or not _cacheable_intent(intent):
+        return None
+    try:
+        embedding, generation = _cache_key(user_input, persist_dir)
+        hit = cache.lookup(embedding, intent, generation)
+    except Exception:
+        logger.exception("Response cache lookup failed")
+        return None
+    if hit is not None:
+        logger.info("♻️ Response cache hit (similarity %.3f) for %r", hit.similarity, hit.query)
+    return hit
+
+
+def _remember_response(req: PreparedRequest, user_input: str, persist_dir: str, out: str, cost_ms: float):
+    cache = _response_cache(persist_dir)
+    if cache is None or req.cached is not None or not _cacheable_intent(req.intent):
+        return
+    if not out or out.strip() in ("[]", "{}") or out.startswith(("Error generating", "Documentation generation failed")):
+        return
+    try:
+        embedding, generation = _cache_key(user_input, persist_dir)
+        sources = [i["source"] for i in req.assembled.included if i.get("source")]
+        cache.put(embedding, req.intent, generation, user_input, req.agent_name, out, sources, cost_ms)
+        logger.info("♻️ Response cache: %s", cache.report())
+    except Exception:
+        logger.exception("Failed to store response in cache")
+
+
+async def _prepare_request(user_input: str, persist_dir: str, timings: Dict[str, float],
+                           t_start: float, use_cache: bool = True) -> PreparedRequest:
+    """Intent + retrieval (overlapped), response-cache lookup, routing and context assembly
+    shared by the async and streaming paths."""
+    # Step 1+2: intent detection and RAG retrieval are independent; overlap them
+    retrieval = asyncio.ensure_future(_timed(timings, "retrieval", _aretrieve_pieces(user_input, persist_dir)))
+    try:
+        with bypass_prompt_cache(not use_cache):
+            intent_info = await _timed(timings, "intent", _detect_intent(user_input, persist_dir))
+        intent = intent_info.get("intent", detect_intent(user_input))
+        logger.info("🧠 Detected intent: %s (%s)", intent, intent_info.get("source", "llm"))
+        agent_key, agent_name, agent_id, method = ROUTES.get(intent, GENERIC_ROUTE)
+        agent = get_agent(agent_id)
+
+        # a semantically equivalent question answered against this index generation needs
+        # neither the rest of retrieval nor the agent
+        cached = None
+        if use_cache:
+            cached = await _timed(timings, "cache_lookup", run_retrieval(_lookup_response, user_input, persist_dir, intent))
+        if cached is not None:
+            return PreparedRequest(cached.agent, agent, method, intent, cached=cached)
+        pieces = await retrieval
+    finally:
+        retrieval.cancel()
+    timings["intent_and_retrieval"] = round((time.perf_counter() - t_start) * 1000, 1)
+    logger.info("🧠 Query embedding cache: %s (%d entries)", QUERY_CACHE.stats, len(QUERY_CACHE))
+
+    # Step 3: Route to correct agent, with context sized to that agent's token budget
+    assembled = await _timed(timings, "context", run_retrieval(_prepare_context, pieces, agent_key))
+    logger.info("📚 Context prepared for %s: %s (compression ratio %.2f)",
+                agent_name, assembled.summary(), assembled.compression.ratio)
+    return PreparedRequest(agent_name, agent, method, intent, assembled)
+
+
+def _persist(user_input: str, agent_name: str, out: str, timings: Dict[str, float], t_start: float):
+    t0 = time.perf_counter()
+    chat_id = _chat_db().add_chat(
+        user_query=user_input,
+        agent_name=agent_name,
+        agent_response=out
+    )
+    timings["persist"] = round((time.perf_counter() - t0) * 1000, 1)
+    logger.info("💾 Chat saved: id=%s, agent=%s", chat_id, agent_name)
+    timings["total"] = round((time.perf_counter() - t_start) * 1000, 1)
+    if "intent_and_retrieval" in timings:
+        timings["overlap_saved"] = round(timings["intent"] + timings["retrieval"] - timings["intent_and_retrieval"], 1)
+    logger.info("⏱️ Stage timings (ms): %s", timings)
+    return chat_id
+
+
+def _cache_info(cached: Optional[CachedResponse]) -> Optional[Dict]:
+    if cached is None:
+        return None
+    return {"similarity": round(cached.similarity, 3), "query": cached.query, "saved_ms": cached.saved_ms}
+
+
+async def run_agent_async(user_input: str, persist_dir: str = "chroma_db", use_cache: bool = True):
+    """
+    Run the orchestrator for `user_input` (see `_run_agent_async`). Identical requests in flight
+    at the same time — same normalised query, index, index generation and `use_cache` — share
+    one execution (intent, retrieval, agent call and saved chat) and all get its result.
+    """
+    generation = await _aindex_generation(persist_dir)
+    if generation is None:
+        return await _run_agent_async(user_input, persist_dir, use_cache)
+    key = (normalize_query(user_input), persist_dir, generation, use_cache)
+    return dict(await _REQUEST_FLIGHTS.ado(key, lambda: _run_agent_async(user_input, persist_dir, use_cache)))
+
+
+async def _run_agent_async(user_input: str, persist_dir: str = "chroma_db", use_cache: bool = True):
     """
     Orchestrates all sub-agents based on detected intent.
     Performs:
-      - Intent detection
-      - Context retrieval (RAG)
-      - Delegation to correct agent
+      - Intent detection and context retrieval (RAG), concurrently
+      - Semantic response cache lookup (`response_cache` in config)
+      - Delegation to correct agent (Gemini async client)
       - Persists chat result
+    LLM and retrieval calls wait for the shared `concurrency` limits, so many conversations
+    can run on one event loop without overrunning the API or the retrieval pool.
+    use_cache=False skips the response and prompt caches (the fresh answer is still stored).
+    The result carries per-stage wall times in ms under "timings", and under "cached" the
+    similarity / original query of a cache hit (None otherwise).
     """
+    timings: Dict[str, float] = {}
+    t_start = time.perf_counter()
     try:
         logger.info("🚀 Received input: %s", user_input)
-
-        # Step 1: Detect intent
-        intent_info = req_analyzer.get_intent(user_input)
-        intent = intent_info.get("intent", detect_intent(user_input))
-        logger.info("🧠 Detected intent: %s", intent)
-
-        # Step 2: Retrieve RAG context
-        rag = search_vector(user_input, top_k=5, persist_dir=persist_dir)
-        docs = rag.get("documents", [[]])[0] if isinstance(rag.get("documents"), list) else []
-        metadatas = rag.get("metadatas", [[]])[0] if isinstance(rag.get("metadatas"), list) else []
-
-        context_pieces = []
-        for i, doc in enumerate(docs):
-            src = metadatas[i].get("source") if i < len(metadatas) else None
-            context_pieces.append(f"Source: {src}\n{doc}")
-        context = "\n\n---\n\n".join(context_pieces)[:60000] if context_pieces else "No relevant documents found."
-        logger.info("📚 Context prepared with %d docs.", len(context_pieces))
-
-        # Step 3: Route to correct agent
-        if intent == "impact":
-            out = impact_agent.analyze(user_input, context)
-            agent_name = "ImpactAnalyserAgent"
-        elif intent == "blueprint":
-            out = blueprint_agent.generate(user_input, context)
-            agent_name = "BlueprintGeneratorAgent"
-        elif intent == "documentation":
-            out = doc_agent.generate(user_input, context)
-            agent_name = "DocGeneratorAgent"
-        elif intent == "understanding":
-            out = understanding_agent.analyze(user_input, context)
-            agent_name = "UnderstandingAgent"
+        req = await _prepare_request(user_input, persist_dir, timings, t_start, use_cache)
+        if req.cached is not None:
+            out = req.cached.response
         else:
-            out = understanding_agent.analyze(user_input, context)
-            agent_name = "GenericAgent"
+            with bypass_prompt_cache(not use_cache):
+                out = await _timed(timings, "agent", getattr(req.agent, "a" + req.method)(user_input, req.assembled.text))
+            cost_ms = (time.perf_counter() - t_start) * 1000
+            await run_retrieval(_remember_response, req, user_input, persist_dir, out, cost_ms)
 
-        # Step 4: Persist chat to DB
-        chat_id = db.add_chat(
-            user_query=user_input,
-            agent_name=agent_name,
-            agent_response=out
-        )
-        logger.info("💾 Chat saved: id=%s, agent=%s", chat_id, agent_name)
+        # Step 4: Persist chat to DB (sqlite, off the loop)
+        chat_id = await asyncio.to_thread(_persist, user_input, req.agent_name, out, timings, t_start)
 
         # Step 5: Return structured response
-        return {"chat_id": chat_id, "agent": agent_name, "response": out}
+        return {"chat_id": chat_id, "agent": req.agent_name, "response": out, "timings": timings,
+                "cached": _cache_info(req.cached)}
+
+    except Exception as e:
+        logger.exception("❌ Agent run failed: %s", e)
+        return {"chat_id": None, "agent": "error", "response": f"Agent error: {e}", "timings": timings}
+
+
+def run_agent_sync(user_input: str, persist_dir: str = "chroma_db", timeout: Optional[float] = None,
+                   use_cache: bool = True):
+    """Blocking shim over `run_agent_async` for Streamlit / script callers: the request runs
+    on the shared orchestrator loop (`ai_agents.runtime`)."""
+    return run_coroutine(run_agent_async(user_input, persist_dir, use_cache), timeout)
+
+
+def run_agent_stream(user_input: str, persist_dir: str = "chroma_db", use_cache: bool = True) -> Iterator[Dict]:
+    """
+    Streaming variant of `run_agent_sync`. Yields events:
+      {"type": "sources", "agent": name, "sources": [paths in the prompt context]}
+      {"type": "token", "text": chunk}            # as the agent's model streams
+      {"type": "done", "chat_id", "agent", "response", "timings", "cached"}
+    When the agent's stream fails part-way the done event has "failed": True and no chat id;
+    the partial response is neither saved nor put in the response cache.
+    timings["first_token"] is the time from the request to the first token; "total" also
+    covers finalizing and persisting the answer. A response cache hit arrives as one token.
+    Identical requests streaming at the same time (keyed like `run_agent_async`) share one
+    run: later callers replay its events from the start, with the same answer and chat id.
+    """
+    try:
+        generation = _index_generation(persist_dir)
+    except Exception:
+        logger.exception("Could not read the index generation; not coalescing")
+        generation = None
+    if generation is None:
+        yield from _run_agent_stream(user_input, persist_dir, use_cache)
+        return
+    key = (normalize_query(user_input), persist_dir, generation, use_cache)
+    for event in _REQUEST_FLIGHTS.stream(key, lambda: _run_agent_stream(user_input, persist_dir, use_cache)):
+        yield dict(event)
+
+
+def _run_agent_stream(user_input: str, persist_dir: str, use_cache: bool) -> Iterator[Dict]:
+    timings: Dict[str, float] = {}
+    t_start = time.perf_counter()
+    try:
+        logger.info("🚀 Received input (streaming): %s", user_input)
+        req = run_coroutine(_prepare_request(user_input, persist_dir, timings, t_start, use_cache))
+        if req.cached is not None:
+            yield {"type": "sources", "agent": req.agent_name, "sources": req.cached.sources}
+            timings["first_token"] = round((time.perf_counter() - t_start) * 1000, 1)
+            yield {"type": "token", "text": req.cached.response}
+            out = req.cached.response
+        else:
+            sources = list(dict.fromkeys(i["source"] for i in req.assembled.included if i.get("source")))
+            yield {"type": "sources", "agent": req.agent_name, "sources": sources}
+
+            parts: List[str] = []
+            t_agent = time.perf_counter()
+            with bypass_prompt_cache(not use_cache):
+                for text in req.agent.stream(user_input, req.assembled.text):
+                    if not parts:
+                        timings["first_token"] = round((time.perf_counter() - t_start) * 1000, 1)
+                        logger.info("⚡ First token after %.1f ms", timings["first_token"])
+                    parts.append(text)
+                    yield {"type": "token", "text": text}
+            timings["agent"] = round((time.perf_counter() - t_agent) * 1000, 1)
+            # read before `finalize`, which may reset it
+            failed = getattr(req.agent, "stream_failed", False)
+            out = req.agent.finalize("".join(parts))
+            if failed:
+                # partial text plus an error message: neither cached nor saved as an answer
+                logger.warning("⚠️ %s stream failed part-way; not caching or saving the response", req.agent_name)
+                timings["total"] = round((time.perf_counter() - t_start) * 1000, 1)
+                yield {"type": "done", "chat_id": None, "agent": req.agent_name, "response": out,
+                       "timings": timings, "cached": None, "failed": True}
+                return
+            _remember_response(req, user_input, persist_dir, out, (time.perf_counter() - t_start) * 1000)
+
+        chat_id = _persist(user_input, req.agent_name, out, timings, t_start)
+        yield {"type": "done", "chat_id": chat_id, "agent": req.agent_name, "response": out, "timings": timings,
+               "cached": _cache_info(req.cached)}
 
     except Exception as e:
         logger.exception("❌ Agent run failed: %s", e)
-        return {"chat_id": None, "agent": "error", "response": f"Agent error: {e}"}
+        yield {"type": "done", "chat_id": None, "agent": "error", "response": f"Agent error: {e}", "timings": timings}
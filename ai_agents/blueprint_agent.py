@@ -1,20 +1,16 @@
 # agents/blueprint_agent.py
-import google.generativeai as genai
-import os, logging, json, yaml
+import os, logging, json, threading
+from typing import Iterator
+from ai_agents.config import get_config
+from ai_agents.llm import agenerate, generate, get_model, stream_text
 
 logger = logging.getLogger(__name__)
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-
-# Load config
-with open("config.yaml", "r") as fh:
-    CONFIG = yaml.safe_load(fh)
 
 # Ensure dirs
-os.makedirs(CONFIG["app"]["persist_dir"], exist_ok=True)
-os.makedirs(CONFIG["app"]["metadata_dir"], exist_ok=True)
-os.makedirs(os.path.dirname(CONFIG["app"]["db_path"]), exist_ok=True)
+_APP = get_config().app
+os.makedirs(_APP.persist_dir, exist_ok=True)
+os.makedirs(_APP.metadata_dir, exist_ok=True)
+os.makedirs(os.path.dirname(_APP.db_path), exist_ok=True)
 
 
 PROMPT = """
@@ -40,21 +36,20 @@ Return STRICT JSON:
 """
 
 class BlueprintGeneratorAgent:
+    def __init__(self):
+        # per-thread: the agent instance is shared and `stream` runs on the requesting thread
+        self._stream_state = threading.local()
+
+    def build_prompt(self, query: str, context: str = "") -> str:
+        return PROMPT.format(context=context or "No context", query=query)
+
     def generate(self, query: str, context: str = "") -> str:
-        prompt = PROMPT.format(context=context or "No context", query=query)
+        prompt = self.build_prompt(query, context)
         logger.info("✅ BlueprintGenerator Agent prompt: %s", prompt)
         try:
-            #resp = genai.generate_text(model="gemini-2.5-flash", input=prompt) if GEMINI_API_KEY else None
-            # Configure the API key
-            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-            # Load the model
-            model = genai.GenerativeModel(CONFIG["llm_mapping"]["blueprint_agent"])
-            # Generate content from the model
-            resp = model.generate_content(prompt)
-            # Access the generated text
-            #resp = response.text
+            resp = generate(get_model("blueprint_agent"), prompt)
             logger.info("✅ BlueprintGenerator Agent resp: %s", resp)
-            text = resp.text if resp else "{}"
+            text = resp or "{}"
         except Exception as e:
             logger.exception("Gemini error: %s", e)
             text = "{}"
@@ -70,3 +65,39 @@ class BlueprintGeneratorAgent:
                 #"risks": ["LLM output unparsable"],
                 #"estimated_effort": "<NONE>"
             #})
+
+    async def agenerate(self, query: str, context: str = "") -> str:
+        """`generate` on Gemini's async client."""
+        prompt = self.build_prompt(query, context)
+        logger.info("✅ BlueprintGenerator Agent async prompt: %s", prompt)
+        try:
+            return self.finalize(await agenerate(get_model("blueprint_agent"), prompt) or "{}")
+        except Exception as e:
+            logger.exception("Gemini error: %s", e)
+            return "{}"
+
+    def stream(self, query: str, context: str = "") -> Iterator[str]:
+        """Yield the blueprint JSON as Gemini streams it."""
+        prompt = self.build_prompt(query, context)
+        logger.info("✅ BlueprintGenerator Agent streaming prompt: %s", prompt)
+        streamed = False
+        self._stream_state.failed = False
+        try:
+            for text in stream_text(get_model("blueprint_agent"), prompt):
+                streamed = True
+                yield text
+        except Exception as e:
+            logger.exception("Gemini error: %s", e)
+            # what did stream is truncated JSON; flag it so it isn't kept as a blueprint
+            self._stream_state.failed = True
+            if not streamed:
+                yield "{}"
+
+    @property
+    def stream_failed(self) -> bool:
+        """True when the last `stream` on this thread ended in an error, so its text is not an answer."""
+        return getattr(self._stream_state, "failed", False)
+
+    def finalize(self, text: str) -> str:
+        """Final response for a fully streamed blueprint (returned as-is, like `generate`)."""
+        return text
@@ -0,0 +1,231 @@
+# ai_agents/config.py
+"""
+Typed, cached application configuration (config.yaml).
+
+`get_config()` returns the parsed `Settings`; the file is parsed once and re-parsed only
+when its mtime changes (checked at most every `check_interval` seconds), so callers can ask
+for the config on hot paths instead of keeping their own copies. Components that size
+resources from config (semaphores, caches) `subscribe` to be told about reloads. A file
+that fails to parse or validate is logged and the previous settings stay in effect.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import yaml
+from pydantic import BaseModel, ConfigDict, Field
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = "config.yaml"
+
+
+class _Section(BaseModel):
+    # unknown keys are kept, so new settings don't need a model change to be read
+    model_config = ConfigDict(extra="allow")
+
+
+class AppSettings(_Section):
+    name: str = "RAG-Agentic Code Analyst"
+    sample_codebase_dir: str = "./sample_codebase"
+    metadata_dir: str = "metadata"
+    persist_dir: str = "chroma_db"
+    db_path: str = "data/chats.db"
+    embed_model: str = "all-MiniLM-L6-v2"
+    chunk_size: int = 1500
+    chunk_overlap: int = 200
+
+
+class SymbolIndexSettings(_Section):
+    enabled: bool = True
+    max_symbols: int = 5
+
+
+class WindowSettings(_Section):
+    enabled: bool = False
+    pad_bytes: int = 400
+    max_gap: int = 0
+
+
+class RerankSettings(_Section):
+    enabled: bool = False
+    model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    candidates: int = 30
+    keep: int = 5
+    batch_size: int = 16
+    max_chars: int = 2000
+
+
+class RetrievalSettings(_Section):
+    top_k: int = 5
+    mode: str = "similarity"
+    mmr_lambda: float = 0.5
+    nprobe: int = 8
+    query_cache_mb: float = 32
+    symbol_index: SymbolIndexSettings = Field(default_factory=SymbolIndexSettings)
+    windows: WindowSettings = Field(default_factory=WindowSettings)
+    rerank: RerankSettings = Field(default_factory=RerankSettings)
+
+
+class IntentSettings(_Section):
+    local: bool = True
+    min_confidence: float = 0.6
+    temperature: float = 0.05
+    examples: Optional[str] = None
+
+
+class ResponseCacheSettings(_Section):
+    enabled: bool = False
+    file: str = "response_cache.sqlite"
+    threshold: float = 0.92
+    max_entries: int = 5000
+    intents: List[str] = Field(default_factory=lambda: ["understanding", "impact", "blueprint"])
+
+
+class PromptCacheSettings(_Section):
+    enabled: bool = True
+    path: str = "data/prompt_cache.sqlite"
+    ttl_hours: float = 168
+    max_entries: int = 20000
+
+
+class ConcurrencySettings(_Section):
+    llm: int = 16
+    retrieval: int = 8
+    # in-flight calls per Gemini model name ("default" for unlisted models)
+    models: Dict[str, int] = Field(default_factory=lambda: {"default": 8})
+
+
+class ResilienceSettings(_Section):
+    # per Gemini model name ("default" for unlisted models); 0 = unlimited
+    rate_limits: Dict[str, Dict[str, float]] = Field(default_factory=lambda: {"default": {"rpm": 0, "tpm": 0}})
+    retries: int = 4
+    backoff_base_s: float = 0.5
+    backoff_cap_s: float = 20.0
+    breaker_failures: int = 5
+    breaker_reset_s: float = 30.0
+
+    def limits_for(self, model: str) -> Dict[str, float]:
+        limits = dict(self.rate_limits.get("default") or {})
+        limits.update(self.rate_limits.get(model) or {})
+        return limits
+
+
+class LLMBackendSettings(_Section):
+    kind: str = "gemini"  # gemini | standin | http
+    url: str = "http://127.0.0.1:8765"
+    timeout_s: float = 120
+    standin: Dict[str, Any] = Field(default_factory=dict)
+
+
+class JobSettings(_Section):
+    workers: int = 4
+    ttl_s: float = 3600
+    max_events: int = 200
+
+
+class UISettings(_Section):
+    title: str = "Agentic Architect AI"
+    description: str = ""
+
+
+class Settings(_Section):
+    app: AppSettings = Field(default_factory=AppSettings)
+    llm_mapping: Dict[str, str] = Field(default_factory=lambda: {"default": "gemini-2.5-flash"})
+    llm_defaults: Dict[str, Any] = Field(default_factory=dict)
+    llm_backend: LLMBackendSettings = Field(default_factory=LLMBackendSettings)
+    agents: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    retrieval: RetrievalSettings = Field(default_factory=RetrievalSettings)
+    context_budgets: Dict[str, int] = Field(default_factory=lambda: {"default": 12000})
+    intent: IntentSettings = Field(default_factory=IntentSettings)
+    compression: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    response_cache: ResponseCacheSettings = Field(default_factory=ResponseCacheSettings)
+    prompt_cache: PromptCacheSettings = Field(default_factory=PromptCacheSettings)
+    concurrency: ConcurrencySettings = Field(default_factory=ConcurrencySettings)
+    resilience: ResilienceSettings = Field(default_factory=ResilienceSettings)
+    jobs: JobSettings = Field(default_factory=JobSettings)
+    ui: UISettings = Field(default_factory=UISettings)
+
+    def model_for(self, agent_key: str) -> str:
+        return self.llm_mapping.get(agent_key) or self.llm_mapping.get("default", "gemini-2.5-flash")
+
+    def context_budget(self, agent_key: str) -> int:
+        return int(self.context_budgets.get(agent_key, self.context_budgets.get("default", 12000)))
+
+    def compression_for(self, agent_key: str) -> Dict[str, Any]:
+        """Per-agent compression settings layered over `compression.default`."""
+        settings = dict(self.compression.get("default") or {})
+        settings.update(self.compression.get(agent_key) or {})
+        return settings
+
+
+Subscriber = Callable[[Settings, Settings], None]
+
+
+class ConfigStore:
+    def __init__(self, path: str = DEFAULT_PATH, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._subscribers: List[Subscriber] = []
+        self._settings: Optional[Settings] = None
+        self._mtime: Optional[int] = None
+        self._next_check = 0.0
+
+    def _parse(self) -> Settings:
+        with open(self.path, "r", encoding="utf8") as fh:
+            return Settings.model_validate(yaml.safe_load(fh) or {})
+
+    def get(self) -> Settings:
+        now = time.monotonic()
+        if self._settings is not None and now < self._next_check:
+            return self._settings
+        changed = None
+        with self._lock:
+            self._next_check = now + self.check_interval
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if self._settings is None or (mtime is not None and mtime != self._mtime):
+                try:
+                    new = self._parse()
+                except Exception:
+                    if self._settings is None:
+                        raise
+                    logger.exception("⚠️ Ignoring invalid %s; keeping the previous settings", self.path)
+                else:
+                    old, self._settings = self._settings, new
+                    if old is not None:
+                        changed = (old, new)
+                        logger.info("🔄 Reloaded %s", self.path)
+                self._mtime = mtime
+            settings = self._settings
+            subscribers = list(self._subscribers)
+        if changed:
+            for fn in subscribers:
+                try:
+                    fn(*changed)
+                except Exception:
+                    logger.exception("Config subscriber %r failed", fn)
+        return settings
+
+    def subscribe(self, fn: Subscriber) -> Subscriber:
+        """Call `fn(old, new)` after each reload; returns `fn` (usable as a decorator)."""
+        with self._lock:
+            self._subscribers.append(fn)
+        return fn
+
+
+_STORE = ConfigStore()
+
+
+def get_config() -> Settings:
+    return _STORE.get()
+
+
+def subscribe(fn: Subscriber) -> Subscriber:
+    return _STORE.subscribe(fn)
@@ -0,0 +1,152 @@
+# ai_agents/context_assembler.py
+"""
+Token-budgeted context assembly for agent prompts.
+
+Takes ranked context pieces (retrieval windows or chunks), drops exact duplicates by chunk
+hash, splits the token budget fairly across sources (water-filling: sources that need less
+than an equal share hand the surplus to the others), and fills each source's share with its
+best pieces. A piece that doesn't fit is cut at a line boundary rather than mid-line.
+
+The result carries the final context text plus an accounting of everything that was
+deduplicated, truncated or dropped, so callers can log what the agent did not see.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from tools.reranker import chunk_hash
+
+logger = logging.getLogger(__name__)
+
+SEPARATOR = "\n\n---\n\n"
+NO_CONTEXT = "No relevant documents found."
+
+_ENCODER = None
+
+
+def count_tokens(text: str) -> int:
+    """Token count via tiktoken (cl100k) when installed, else the ~4 chars/token heuristic."""
+    global _ENCODER
+    if _ENCODER is None:
+        try:
+            import tiktoken
+            _ENCODER = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _ENCODER = False
+    if _ENCODER:
+        return len(_ENCODER.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of whole lines that fits in `max_tokens` (empty if even one line doesn't)."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    lines = text.splitlines(keepends=True)
+    lo, hi = 0, len(lines)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens("".join(lines[:mid])) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return "".join(lines[:lo])
+
+
+@dataclass
+class ContextPiece:
+    source: Optional[str]
+    text: str
+    header: str = ""
+    score: Optional[float] = None
+
+
+@dataclass
+class AssembledContext:
+    text: str
+    budget: int
+    used_tokens: int
+    included: List[Dict] = field(default_factory=list)
+    dropped: List[Dict] = field(default_factory=list)
+    compression: Optional[object] = None  # tools.context_compressor.CompressionStats, when compressed
+
+    def summary(self) -> str:
+        reasons: Dict[str, int] = {}
+        for d in self.dropped:
+            reasons[d["reason"]] = reasons.get(d["reason"], 0) + 1
+        return (f"{self.used_tokens}/{self.budget} tokens, {len(self.included)} pieces"
+                + (f", dropped {reasons}" if reasons else ""))
+
+
+def _fair_shares(demands: Dict[str, int], budget: int) -> Dict[str, int]:
+    """Water-filling: every source gets min(demand, equal share of what's left)."""
+    shares = {s: 0 for s in demands}
+    remaining = dict(demands)
+    left = budget
+    while remaining and left > 0:
+        equal = left // len(remaining)
+        if equal == 0:
+            break
+        satisfied = {s: d for s, d in remaining.items() if d <= equal}
+        if not satisfied:
+            for s in remaining:
+                shares[s] += equal
+            left -= equal * len(remaining)
+            break
+        for s, d in satisfied.items():
+            shares[s] += d
+            left -= d
+            del remaining[s]
+    return shares
+
+
+def assemble_context(pieces: Sequence[ContextPiece], budget_tokens: int) -> AssembledContext:
+    """Build a prompt context of at most `budget_tokens` from ranked pieces (best first)."""
+    dropped: List[Dict] = []
+    seen = set()
+    unique = []
+    for rank, p in enumerate(pieces):
+        h = chunk_hash(p.text.strip())
+        if not p.text.strip() or h in seen:
+            dropped.append({"source": p.source, "reason": "duplicate" if p.text.strip() else "empty",
+                            "tokens": count_tokens(p.text)})
+            continue
+        seen.add(h)
+        block = f"{p.header}\n{p.text}" if p.header else p.text
+        unique.append((rank, p, block, count_tokens(block)))
+
+    sep_tokens = count_tokens(SEPARATOR)
+    demands: Dict[str, int] = {}
+    for _, p, _, tokens in unique:
+        demands[p.source or ""] = demands.get(p.source or "", 0) + tokens + sep_tokens
+    shares = _fair_shares(demands, budget_tokens)
+
+    chosen = []
+    for rank, p, block, tokens in unique:
+        key = p.source or ""
+        room = shares[key] - sep_tokens
+        if tokens <= room:
+            chosen.append((rank, block, p, tokens, False))
+            shares[key] -= tokens + sep_tokens
+            continue
+        cut = truncate_to_tokens(block, room) if room > 0 else ""
+        if cut.strip() and cut.strip() != p.header.strip():
+            cut_tokens = count_tokens(cut)
+            chosen.append((rank, cut, p, cut_tokens, True))
+            shares[key] -= cut_tokens + sep_tokens
+            dropped.append({"source": p.source, "reason": "truncated", "tokens": tokens - cut_tokens})
+        else:
+            dropped.append({"source": p.source, "reason": "budget", "tokens": tokens})
+
+    chosen.sort(key=lambda c: c[0])
+    text = SEPARATOR.join(block for _, block, _, _, _ in chosen) if chosen else NO_CONTEXT
+    result = AssembledContext(
+        text=text,
+        budget=budget_tokens,
+        used_tokens=count_tokens(text) if chosen else 0,
+        included=[{"source": p.source, "tokens": t, "truncated": cut} for _, _, p, t, cut in chosen],
+        dropped=dropped,
+    )
+    logger.info("🧾 Context assembled: %s", result.summary())
+    return result
@@ -1,6 +1,7 @@
 # ai_agents/crew_adapter.py
 import asyncio
 from typing import Callable, Any, List, Dict
+from ai_agents.runtime import limit, run_coroutine
 
 class AgentInterface:
     def __init__(self, name: str, run_fn: Callable[[str, Dict[str,Any]], Any]):
@@ -8,7 +9,9 @@ class AgentInterface:
         self._run_fn = run_fn
 
     async def a_run(self, user_input: str, context: Dict[str, Any] | None = None):
-        return await asyncio.to_thread(self._run_fn, user_input, context or {})
+        # agent run functions call the LLM; share the process-wide bound on in-flight calls
+        async with limit("llm"):
+            return await asyncio.to_thread(self._run_fn, user_input, context or {})
 
     def run(self, user_input: str, context: Dict[str, Any] | None = None):
         return self._run_fn(user_input, context or {})
@@ -27,12 +30,5 @@ class Crew:
         return await agent.a_run(user_input, context or {})
 
     def run_agent(self, agent_name: str, user_input: str, context: Dict[str, Any] | None = None):
-        try:
-            loop = asyncio.get_running_loop()
-        except RuntimeError:
-            loop = None
-        if loop and loop.is_running():
-            fut = asyncio.run_coroutine_threadsafe(self.a_run_agent(agent_name, user_input, context or {}), loop)
-            return fut.result()
-        else:
-            return asyncio.run(self.a_run_agent(agent_name, user_input, context or {}))
+        # blocking shim on the shared orchestrator loop (no new event loop per call)
+        return run_coroutine(self.a_run_agent(agent_name, user_input, context or {}))
@@ -1,16 +1,15 @@
 # ai_agents/doc_generator_agent.py
 import os
-import logging, yaml
+import logging
+import threading
 from datetime import datetime
-import google.generativeai as genai
+from typing import Iterator
 from dotenv import load_dotenv
+from ai_agents.llm import agenerate, generate, get_model, stream_text
 load_dotenv()
 
 logger = logging.getLogger(__name__)
-# Load config
-with open("config.yaml", "r") as fh:
-    CONFIG = yaml.safe_load(fh)
-    
+
 class DocGeneratorAgent:
     """
     Generates markdown/text documentation from codebase context.
@@ -20,22 +19,18 @@ class DocGeneratorAgent:
     def __init__(self, output_dir: str = "generated_docs"):
         self.output_dir = output_dir
         os.makedirs(self.output_dir, exist_ok=True)
+        # per-thread "last stream failed" flag: the orchestrator calls `stream` then `finalize`
+        # on the same thread, and the agent instance is shared between requests
+        self._stream_state = threading.local()
 
-        # Configure Gemini
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not found in environment variables.")
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(CONFIG["llm_mapping"]["doc_agent"])
-
-    def generate(self, user_input: str, context: str) -> str:
-        """
-        Generate markdown documentation file and return the short summary text.
-        """
-        try:
-            logger.info("🧠 Generating documentation for user query...")
+    @property
+    def model(self):
+        # shared, configured-once Gemini model (follows llm_mapping reloads); a missing API
+        # key surfaces on the first call
+        return get_model("doc_agent")
 
-            prompt = f"""
+    def build_prompt(self, user_input: str, context: str) -> str:
+        return f"""
 You are a senior solution architect and technical writer.
 Write a clean, structured markdown documentation based on:
 
@@ -43,7 +38,7 @@ User request:
 {user_input}
 
 Context (from codebase or retrieved documents):
-{context[:6000]}
+{context}
 
 Structure your output with sections:
 - Overview
@@ -53,21 +48,78 @@ Structure your output with sections:
 - Example / Usage
 - Recommendations
 """
+
+    def generate(self, user_input: str, context: str) -> str:
+        """
+        Generate markdown documentation file and return the short summary text.
+        The context is expected pre-sized by the orchestrator (`context_budgets.doc_agent`).
+        """
+        try:
+            logger.info("🧠 Generating documentation for user query...")
+            prompt = self.build_prompt(user_input, context)
             logger.info("✅ DocGenerator Agent prompt: %s", prompt)
-            resp = self.model.generate_content(prompt)
+            resp = generate(self.model, prompt)
             logger.info("✅ DocGenerator Agent resp: %s", resp)
-            text = resp.text if resp else "[]"
-
-            filename = f"doc_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
-            filepath = os.path.join(self.output_dir, filename)
-
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write("# Generated Documentation\n\n")
-                f.write(text)
+            text = resp or "[]"
+            return self.finalize(text)
 
-            logger.info("✅ Documentation saved at: %s", filepath)
-            return f"Documentation generated successfully: {filepath}\n\n{text[:2000]}"
+        except Exception as e:
+            logger.exception("❌ Doc generation failed: %s", e)
+            return f"Documentation generation failed: {e}"
 
+    async def agenerate(self, user_input: str, context: str) -> str:
+        """`generate` on Gemini's async client."""
+        try:
+            prompt = self.build_prompt(user_input, context)
+            logger.info("✅ DocGenerator Agent async prompt: %s", prompt)
+            text = await agenerate(self.model, prompt) or "[]"
+            return self.finalize(text)
         except Exception as e:
             logger.exception("❌ Doc generation failed: %s", e)
             return f"Documentation generation failed: {e}"
+
+    def stream(self, user_input: str, context: str) -> Iterator[str]:
+        """Yield the markdown as Gemini streams it; `finalize` saves the joined text."""
+        prompt = self.build_prompt(user_input, context)
+        logger.info("✅ DocGenerator Agent streaming prompt: %s", prompt)
+        self._stream_state.failed = False
+        try:
+            yield from stream_text(self.model, prompt)
+        except Exception as e:
+            logger.exception("❌ Doc generation failed: %s", e)
+            self._stream_state.failed = True
+            yield f"Documentation generation failed: {e}"
+
+    @property
+    def stream_failed(self) -> bool:
+        """True when the last `stream` on this thread ended in an error, so its text is not an answer."""
+        return getattr(self._stream_state, "failed", False)
+
+    def finalize(self, text: str) -> str:
+        """Save the generated markdown and return the short summary text.
+
+        After a failed `stream` nothing is saved: the joined text is a partial doc plus the
+        error message, and is returned as-is.
+        """
+        if self.stream_failed:
+            self._stream_state.failed = False
+            logger.warning("⚠️ Documentation stream failed; nothing saved")
+            return text
+
+        filename = f"doc_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
+        filepath = os.path.join(self.output_dir, filename)
+
+        # write next to the target and rename, so a crash mid-write never leaves a truncated doc
+        tmp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write("# Generated Documentation\n\n")
+                f.write(text)
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        logger.info("✅ Documentation saved at: %s", filepath)
+        return f"Documentation generated successfully: {filepath}\n\n{text[:2000]}"
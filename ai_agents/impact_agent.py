@@ -1,15 +1,9 @@
 # agents/impact_agent.py
-import google.generativeai as genai
-import os, logging, json, yaml
-
-# Load config
-with open("config.yaml", "r") as fh:
-    CONFIG = yaml.safe_load(fh)
+import os, logging, json
+from typing import Iterator
+from ai_agents.llm import agenerate, generate, get_model, stream_text
 
 logger = logging.getLogger(__name__)
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
 
 PROMPT = """
 You are a solution architect assistant. Given context and a change request, list impacted modules.
@@ -34,25 +28,44 @@ Output STRICT JSON array of objects:
 """
 
 class ImpactAnalyzerAgent:
+    def build_prompt(self, query: str, context: str = "") -> str:
+        return PROMPT.format(context=context or "No context", query=query)
+
     def analyze(self, query: str, context: str = "") -> str:
-        prompt = PROMPT.format(context=context or "No context", query=query)
+        prompt = self.build_prompt(query, context)
         logger.info("✅ ImpactAnalyzer Agent prompt: %s", prompt)
         try:
-            #resp = genai.generate_text(model="gemini-2.5-flash", input=prompt) if GEMINI_API_KEY else None
-            # Configure the API key
-            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-            # Load the model
-            model = genai.GenerativeModel(CONFIG["llm_mapping"]["impact_agent"])
-            # Generate content from the model
-            resp = model.generate_content(prompt)
-            # Access the generated text
-            #resp = response.text
-            logger.info("✅ ImpactAnalyzer Agent resp: %s", resp)
-            text = resp.text if resp else "[]"
+            resp = generate(get_model("impact_agent"), prompt)
+        except Exception as e:
+            # quota/upstream failures propagate: "[]" would read as "nothing is impacted"
+            logger.exception("Gemini error: %s", e)
+            raise
+        logger.info("✅ ImpactAnalyzer Agent resp: %s", resp)
+        return self.finalize(resp or "[]")
+
+    async def aanalyze(self, query: str, context: str = "") -> str:
+        """`analyze` on Gemini's async client."""
+        prompt = self.build_prompt(query, context)
+        logger.info("✅ ImpactAnalyzer Agent async prompt: %s", prompt)
+        try:
+            text = await agenerate(get_model("impact_agent"), prompt)
         except Exception as e:
             logger.exception("Gemini error: %s", e)
-            text = "[]"
-        # try to validate JSON, fallback to message
+            raise
+        return self.finalize(text or "[]")
+
+    def stream(self, query: str, context: str = "") -> Iterator[str]:
+        """Yield the raw JSON as Gemini streams it; pass the joined text to `finalize`."""
+        prompt = self.build_prompt(query, context)
+        logger.info("✅ ImpactAnalyzer Agent streaming prompt: %s", prompt)
+        try:
+            yield from stream_text(get_model("impact_agent"), prompt)
+        except Exception as e:
+            logger.exception("Gemini error: %s", e)
+            raise
+
+    def finalize(self, text: str) -> str:
+        """Validate the model's JSON, wrapping unparsable output in a single entry."""
         try:
             json.loads(text)
             return text
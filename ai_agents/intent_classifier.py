@@ -0,0 +1,69 @@
+# ai_agents/intent_classifier.py
+"""
+Local intent classification with the query embedding model.
+
+Nearest-centroid over the labelled examples in `intent_examples.yaml`: each intent's
+centroid is the normalised mean embedding of its examples, a query is scored by cosine
+similarity to every centroid, and a softmax over those similarities (with `temperature`)
+gives the confidence. Callers escalate to the LLM only below their confidence threshold.
+"""
+
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import yaml
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXAMPLES = os.path.join(os.path.dirname(__file__), "intent_examples.yaml")
+
+EmbedFn = Callable[[List[str]], Sequence]
+
+
+def load_examples(path: str = DEFAULT_EXAMPLES) -> Dict[str, List[str]]:
+    with open(path, "r", encoding="utf8") as fh:
+        return {label: list(texts) for label, texts in (yaml.safe_load(fh) or {}).items() if texts}
+
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    return m / np.maximum(np.linalg.norm(m, axis=-1, keepdims=True), 1e-12)
+
+
+class IntentClassifier:
+    def __init__(self, embed_fn: EmbedFn, examples: Optional[Dict[str, List[str]]] = None,
+                 temperature: float = 0.05):
+        self.embed_fn = embed_fn
+        self.examples = examples if examples is not None else load_examples()
+        self.temperature = temperature
+        self.labels = list(self.examples)
+        self._centroids: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def _fit(self) -> np.ndarray:
+        with self._lock:
+            if self._centroids is None:
+                rows = []
+                for label in self.labels:
+                    emb = _normalize(np.asarray(self.embed_fn(self.examples[label]), dtype=np.float32))
+                    rows.append(emb.mean(axis=0))
+                self._centroids = _normalize(np.stack(rows))
+                logger.info("🧭 Intent centroids fitted for %s", self.labels)
+            return self._centroids
+
+    def scores(self, query: str) -> Dict[str, float]:
+        """Softmax-normalised scores per intent (sum to 1)."""
+        centroids = self._fit()
+        q = _normalize(np.asarray(self.embed_fn([query])[0], dtype=np.float32))
+        logits = centroids @ q / self.temperature
+        p = np.exp(logits - logits.max())
+        p /= p.sum()
+        return {label: float(s) for label, s in zip(self.labels, p)}
+
+    def classify(self, query: str) -> Tuple[str, float]:
+        """(best intent, confidence in [0, 1])."""
+        scores = self.scores(query)
+        label = max(scores, key=scores.get)
+        return label, scores[label]
@@ -0,0 +1,188 @@
+# ai_agents/jobs.py
+"""
+Per-request jobs for orchestrator runs.
+
+Every request submitted through the `JobRegistry` gets its own `Job`: an id, a phase, the
+status of each agent and a bounded ring buffer of events (newest `max_events` kept). Work
+runs on the registry's worker pool with the job bound to `current_job()`, so code deep in
+the orchestrator reports progress to the right request without passing the job around.
+
+Each job has its own lock, so concurrent requests never contend on shared progress state;
+the registry lock is only taken to add, look up or expire jobs. The UI either polls
+`Job.snapshot()` or follows `Job.wait_events(after)`, which blocks until new events arrive.
+Finished jobs are dropped `ttl_s` seconds after they end.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ai_agents.config import get_config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_TTL_S = 3600.0
+DEFAULT_MAX_EVENTS = 200
+
+_CURRENT: contextvars.ContextVar = contextvars.ContextVar("current_job", default=None)
+
+
+def current_job() -> Optional["Job"]:
+    """The job the calling code runs for, if any."""
+    return _CURRENT.get()
+
+
+class Job:
+    def __init__(self, query: str = "", max_events: int = DEFAULT_MAX_EVENTS):
+        self.id = uuid.uuid4().hex
+        self.query = query
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.state = "pending"  # pending | running | done | error
+        self.phase: Optional[str] = None
+        self.agents: Dict[str, str] = {}
+        self.future: Optional[Future] = None
+        self._events: deque = deque(maxlen=max_events)  # (seq, ts, payload)
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    def _emit(self, payload: Any):
+        # caller holds self._cond
+        self._seq += 1
+        self._events.append((self._seq, time.time(), payload))
+        self._cond.notify_all()
+
+    def set_phase(self, phase: str):
+        with self._cond:
+            self.phase = phase
+            self._emit({"phase": phase})
+
+    def set_agent(self, name: str, status: str, output: Any = None):
+        """pending, running, done or error; agents keep their first-reported order. Records one
+        event per change, carrying `output` (e.g. a stage's error detail) when given."""
+        with self._cond:
+            self.agents[name] = status
+            event = {"agent": name, "status": status}
+            if output:
+                event["output"] = output
+            self._emit(event)
+
+    def log(self, payload: Any):
+        """Append a log event (string or dict) to the ring buffer."""
+        with self._cond:
+            self._emit(payload)
+
+    def _finish(self, state: str):
+        with self._cond:
+            self.state = state
+            self.finished = time.time()
+            self._emit({"state": state})
+
+    @property
+    def done(self) -> bool:
+        return self.finished is not None
+
+    def events(self, after: int = 0) -> List[Tuple[int, float, Any]]:
+        """Buffered events with a sequence number above `after` (oldest first)."""
+        with self._cond:
+            return [e for e in self._events if e[0] > after]
+
+    def wait_events(self, after: int = 0, timeout: Optional[float] = None) -> List[Tuple[int, float, Any]]:
+        """Like `events`, but blocks until there is a newer event, the job ends or `timeout`."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after or self.finished is not None, timeout)
+            return [e for e in self._events if e[0] > after]
+
+    def snapshot(self, logs: int = 50) -> Dict[str, Any]:
+        """Status dict for UI polling: id, state, phase, per-agent statuses and recent logs."""
+        with self._cond:
+            events = list(self._events)[-logs:] if logs else []
+            return {
+                "id": self.id,
+                "state": self.state,
+                "phase": self.phase,
+                "agents": [{"name": n, "status": s} for n, s in self.agents.items()],
+                "logs": [payload for _, _, payload in events],
+                "seq": self._seq,
+            }
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        return self.future.result(timeout)
+
+
+class JobRegistry:
+    def __init__(self, workers: int = DEFAULT_WORKERS, ttl_s: float = DEFAULT_TTL_S,
+                 max_events: int = DEFAULT_MAX_EVENTS):
+        self.ttl_s = ttl_s
+        self.max_events = max_events
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    def submit(self, fn: Callable[..., Any], *args, query: str = "", **kwargs) -> Job:
+        """Run `fn(*args, **kwargs)` on the worker pool as a new job; returns the job at once."""
+        job = Job(query, self.max_events)
+        with self._lock:
+            self._sweep_locked()
+            self._jobs[job.id] = job
+        ctx = contextvars.copy_context()
+        ctx.run(_CURRENT.set, job)
+        job.future = self._executor.submit(ctx.run, self._run, job, fn, args, kwargs)
+        return job
+
+    @staticmethod
+    def _run(job: Job, fn: Callable[..., Any], args, kwargs) -> Any:
+        with job._cond:
+            job.state = "running"
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            logger.exception("❌ Job %s failed", job.id)
+            job._finish("error")
+            raise
+        job._finish("done")
+        return result
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def sweep(self) -> int:
+        """Drop jobs that finished more than `ttl_s` ago; returns how many were dropped."""
+        with self._lock:
+            return self._sweep_locked()
+
+    def _sweep_locked(self) -> int:
+        cutoff = time.time() - self.ttl_s
+        expired = [jid for jid, job in self._jobs.items() if job.finished is not None and job.finished < cutoff]
+        for jid in expired:
+            del self._jobs[jid]
+        return len(expired)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+_REGISTRY: Optional[JobRegistry] = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_job_registry() -> JobRegistry:
+    """Process-wide registry sized by the `jobs` config section (when first created)."""
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            settings = get_config().jobs
+            _REGISTRY = JobRegistry(settings.workers, settings.ttl_s, settings.max_events)
+            logger.info("🧵 Job registry started with %d workers", settings.workers)
+        return _REGISTRY
@@ -0,0 +1,338 @@
+# ai_agents/llm.py
+"""
+Gateway for every LLM call in the process.
+
+Models come from the backend selected by `llm_backend` (`ai_agents.llm_backends`: Gemini,
+the local stand-in, or an HTTP server). The Gemini SDK is configured once (`configure_client`;
+re-configuring drops the SDK's cached clients and their open connections), and `get_model` /
+`model_handle` return one handle per model name, so all calls share the SDK's default sync
+and async clients and the connections they keep open. Nothing outside the backends module
+should import `google.generativeai`.
+
+`generate`, `stream_text` and `agenerate` hold a per-model slot (`concurrency.models`)
+while the request is upstream; the slots are one process-wide `SharedLimit` per model, so
+sync, streaming and async callers together never exceed the cap. `agenerate` also waits for
+the shared "llm" limit (see `ai_agents.runtime`). Upstream requests go through the model's `ModelGuard`
+(`ai_agents.resilience`): token-bucket quotas, backoff with jitter on retryable errors and a
+circuit breaker. `stream_text` yields response text as Gemini produces it, so callers
+can show the first tokens long before the whole answer is ready. Every call uses the
+`llm_defaults` generation params and goes through the exact-match prompt cache
+(`ai_agents.prompt_cache`) when those params are deterministic (temperature 0); concurrent
+identical deterministic calls are coalesced into one upstream request
+(`ai_agents.singleflight`); so are identical deterministic streams, whose chunks are fanned
+out to every caller.
+
+`gateway_stats()` reports, per model, upstream time against time spent in the gateway
+itself, so per-call overhead outside the network round-trip stays measurable.
+"""
+
+import asyncio
+import contextlib
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from ai_agents.config import get_config, subscribe
+from ai_agents.llm_backends import GeminiBackend, LLMBackend, build_backend
+from ai_agents.prompt_cache import get_prompt_cache, is_bypassed, prompt_key
+from ai_agents.resilience import get_guard
+from ai_agents.runtime import limit, shared_limit
+from ai_agents.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+_MODELS: Dict[str, Any] = {}
+_MODELS_LOCK = threading.Lock()
+_BACKEND: Optional[LLMBackend] = None
+_STATS: Dict[str, Dict[str, float]] = {}
+_STATS_LOCK = threading.Lock()
+# identical deterministic calls in flight at the same time share one upstream request
+_FLIGHTS = SingleFlight("llm")
+
+
+def model_name(agent_key: str) -> str:
+    return get_config().model_for(agent_key)
+
+
+@subscribe
+def _on_config_change(old, new):
+    global _BACKEND
+    if old.llm_backend != new.llm_backend:
+        logger.info("🔄 LLM backend changed to %s", new.llm_backend.kind)
+        with _MODELS_LOCK:
+            _BACKEND = None
+            _MODELS.clear()
+    elif old.llm_mapping != new.llm_mapping:
+        moved = {k: v for k, v in new.llm_mapping.items() if old.llm_mapping.get(k) != v}
+        logger.info("🔄 Model mapping changed: %s", moved)
+        with _MODELS_LOCK:
+            # models no agent maps to any more are dropped; the rest stay warm
+            for name in set(_MODELS) - set(new.llm_mapping.values()):
+                _MODELS.pop(name, None)
+
+
+def api_key() -> Optional[str]:
+    return GeminiBackend.api_key()
+
+
+def get_backend() -> LLMBackend:
+    """The backend selected by `llm_backend` in config (built once, rebuilt on change)."""
+    global _BACKEND
+    with _MODELS_LOCK:
+        if _BACKEND is None:
+            _BACKEND = build_backend(get_config().llm_backend)
+            logger.info("🔌 LLM backend: %s", _BACKEND.name)
+        return _BACKEND
+
+
+def configure_client() -> bool:
+    """Prepare the backend once per process; False when it can't serve calls (no API key)."""
+    return get_backend().ready()
+
+
+def model_handle(name: str):
+    """Shared model handle for a model name, from the configured backend."""
+    backend = get_backend()
+    with _MODELS_LOCK:
+        model = _MODELS.get(name)
+        if model is None:
+            model = _MODELS[name] = backend.model(name)
+        return model
+
+
+def get_model(agent_key: str):
+    """Model handle for an `llm_mapping` key, shared across calls."""
+    return model_handle(model_name(agent_key))
+
+
+def _name_of(model) -> str:
+    name = getattr(model, "model_name", None) or type(model).__name__
+    return name[len("models/"):] if name.startswith("models/") else name
+
+
+def _record(name: str, timing: Dict[str, float], total_s: float):
+    """`timing`: slot "wait" and "upstream" time summed over attempts, and "guarded" — the
+    whole rate-limited/retried section, so throttling and backoff = guarded - wait - upstream."""
+    with _STATS_LOCK:
+        stats = _STATS.get(name)
+        if stats is None:
+            stats = _STATS[name] = {"calls": 0, "wait_s": 0.0, "upstream_s": 0.0, "throttled_s": 0.0,
+                                    "overhead_s": 0.0}
+        stats["calls"] += 1
+        stats["wait_s"] += timing["wait"]
+        stats["upstream_s"] += timing["upstream"]
+        stats["throttled_s"] += max(timing["guarded"] - timing["wait"] - timing["upstream"], 0.0)
+        stats["overhead_s"] += max(total_s - timing["guarded"], 0.0)
+
+
+def gateway_stats() -> Dict[str, Dict[str, float]]:
+    """Per model: upstream calls; mean slot wait, upstream time and rate-limit/backoff sleeps
+    (ms); and mean time spent in the gateway itself (µs; params, cache lookup/store,
+    bookkeeping)."""
+    with _STATS_LOCK:
+        snapshot = {name: dict(stats) for name, stats in _STATS.items()}
+    report = {}
+    for name, stats in snapshot.items():
+        calls = max(stats["calls"], 1)
+        report[name] = {
+            "calls": stats["calls"],
+            "wait_ms": round(stats["wait_s"] * 1000 / calls, 3),
+            "upstream_ms": round(stats["upstream_s"] * 1000 / calls, 3),
+            "throttled_ms": round(stats["throttled_s"] * 1000 / calls, 3),
+            "overhead_us": round(stats["overhead_s"] * 1e6 / calls, 1),
+        }
+    return report
+
+
+def reset_gateway_stats():
+    with _STATS_LOCK:
+        _STATS.clear()
+
+
+def _timing() -> Dict[str, float]:
+    return {"wait": 0.0, "upstream": 0.0, "guarded": 0.0}
+
+
+@contextlib.contextmanager
+def _model_slot(name: str, timing: Dict[str, float]):
+    """Hold one of the model's in-flight slots; the wait is added to `timing["wait"]`."""
+    t0 = time.perf_counter()
+    with shared_limit(f"model:{name}"):
+        timing["wait"] += time.perf_counter() - t0
+        yield
+
+
+def generation_params(params: Optional[Dict] = None) -> Dict:
+    """`llm_defaults` from config overlaid with per-call params."""
+    merged = dict(get_config().llm_defaults)
+    merged.update(params or {})
+    return merged
+
+
+def _cache_for(model, prompt: str, params: Dict, cache: bool):
+    """(prompt cache or None, key). Sampled calls (temperature != 0) get (None, None): they
+    are neither cached nor coalesced."""
+    if params.get("temperature", 1.0) != 0:
+        return None, None
+    ident = getattr(model, "model_name", type(model).__name__)
+    if getattr(model, "backend", None):
+        # non-Gemini backends (stand-in, http) never share entries with the real model
+        ident = f"{model.backend}:{ident}"
+    key = prompt_key(ident, prompt, params)
+    settings = get_config().prompt_cache
+    if not cache or not settings.enabled:
+        return None, key
+    return get_prompt_cache(settings.path, ttl_s=settings.ttl_hours * 3600, max_entries=settings.max_entries), key
+
+
+def _lookup(store, key) -> Optional[str]:
+    if store is None or is_bypassed():
+        return None
+    text = store.get(key)
+    if text is not None:
+        logger.info("♻️ Prompt cache hit %s", key[:12])
+    return text
+
+
+def generate(model, prompt: str, params: Optional[Dict] = None, cache: bool = True) -> str:
+    """Full response text for `prompt`, served from the prompt cache when possible. Identical
+    deterministic calls already in flight are joined instead of sent again."""
+    t0 = time.perf_counter()
+    params = generation_params(params)
+    store, key = _cache_for(model, prompt, params, cache)
+    text = _lookup(store, key)
+    if text is not None:
+        return text
+    if key is None:
+        return _generate_upstream(model, prompt, params, store, key, t0)
+    return _FLIGHTS.do(key, _generate_upstream, model, prompt, params, store, key, t0)
+
+
+def _generate_upstream(model, prompt: str, params: Dict, store, key: Optional[str], t0: float) -> str:
+    name, timing = _name_of(model), _timing()
+    guard = get_guard(name)
+
+    def call():
+        # the slot is only held while the request is upstream, not during throttle/backoff
+        with _model_slot(name, timing):
+            t_up = time.perf_counter()
+            try:
+                return model.generate_content(prompt, generation_config=params or None)
+            finally:
+                timing["upstream"] += time.perf_counter() - t_up
+
+    t_guard = time.perf_counter()
+    resp = guard.call(call, prompt)
+    timing["guarded"] = time.perf_counter() - t_guard
+    text = resp.text if resp else ""
+    guard.charge_output(text)
+    if store is not None and text:
+        store.put(key, getattr(model, "model_name", ""), text)
+    _record(name, timing, time.perf_counter() - t0)
+    return text
+
+
+def stream_text(model, prompt: str, params: Optional[Dict] = None, cache: bool = True) -> Iterator[str]:
+    """Yield the text of each streamed response chunk (empty/blocked chunks are skipped).
+    A cached response comes back as a single chunk; a completed stream is cached. Opening the
+    stream is rate limited and retried like `generate`; a stream that fails part-way is not.
+    The model slot is held until the stream ends (or the caller stops iterating). Callers
+    streaming an identical deterministic prompt at the same time share one upstream stream.
+    In the gateway stats a stream counts as upstream until its last chunk."""
+    t0 = time.perf_counter()
+    params = generation_params(params)
+    store, key = _cache_for(model, prompt, params, cache)
+    text = _lookup(store, key)
+    if text is not None:
+        yield text
+        return
+    if key is None:
+        yield from _stream_upstream(model, prompt, params, store, key, t0)
+    else:
+        yield from _FLIGHTS.stream(key, lambda: _stream_upstream(model, prompt, params, store, key, t0))
+
+
+def _stream_upstream(model, prompt: str, params: Dict, store, key: Optional[str], t0: float) -> Iterator[str]:
+    name, timing = _name_of(model), _timing()
+    guard = get_guard(name)
+    slot = shared_limit(f"model:{name}")
+
+    def open_stream():
+        # the SDK sends the request (and fetches the first chunk) here; on success the slot
+        # stays held for the rest of the stream
+        t_wait = time.perf_counter()
+        slot.acquire()
+        t_up = time.perf_counter()
+        timing["wait"] += t_up - t_wait
+        try:
+            return model.generate_content(prompt, stream=True, generation_config=params or None)
+        except BaseException:
+            slot.release()
+            raise
+        finally:
+            timing["upstream"] += time.perf_counter() - t_up
+
+    t_guard = time.perf_counter()
+    chunks = guard.call(open_stream, prompt)
+    t_stream = time.perf_counter()
+    parts = []
+    try:
+        for chunk in chunks:
+            try:
+                text = chunk.text
+            except ValueError:
+                # chunk without text parts (e.g. safety metadata only)
+                continue
+            if text:
+                parts.append(text)
+                yield text
+    finally:
+        slot.release()
+        streamed = time.perf_counter() - t_stream
+        timing["upstream"] += streamed
+        timing["guarded"] = t_stream - t_guard + streamed
+        _record(name, timing, time.perf_counter() - t0)
+    guard.charge_output("".join(parts))
+    if store is not None and parts:
+        store.put(key, getattr(model, "model_name", ""), "".join(parts))
+
+
+async def agenerate(model, prompt: str, params: Optional[Dict] = None, cache: bool = True) -> str:
+    """Full response text via the async client; waits for a free "llm" slot and a slot for
+    the model first (cache hits and calls joining an identical in-flight one don't)."""
+    t0 = time.perf_counter()
+    params = generation_params(params)
+    store, key = _cache_for(model, prompt, params, cache)
+    # the SQLite lookup runs off the shared event loop, so a slow disk stalls only this call
+    text = await asyncio.to_thread(_lookup, store, key) if store is not None else None
+    if text is not None:
+        return text
+    if key is None:
+        return await _agenerate_upstream(model, prompt, params, store, key, t0)
+    return await _FLIGHTS.ado(key, lambda: _agenerate_upstream(model, prompt, params, store, key, t0))
+
+
+async def _agenerate_upstream(model, prompt: str, params: Dict, store, key: Optional[str], t0: float) -> str:
+    name, timing = _name_of(model), _timing()
+    guard = get_guard(name)
+
+    async def call():
+        t_wait = time.perf_counter()
+        async with limit("llm"), shared_limit(f"model:{name}"):
+            t_up = time.perf_counter()
+            timing["wait"] += t_up - t_wait
+            try:
+                return await model.generate_content_async(prompt, generation_config=params or None)
+            finally:
+                timing["upstream"] += time.perf_counter() - t_up
+
+    t_guard = time.perf_counter()
+    resp = await guard.acall(call, prompt)
+    timing["guarded"] = time.perf_counter() - t_guard
+    text = resp.text if resp else ""
+    guard.charge_output(text)
+    if store is not None and text:
+        await asyncio.to_thread(store.put, key, getattr(model, "model_name", ""), text)
+    _record(name, timing, time.perf_counter() - t0)
+    return text
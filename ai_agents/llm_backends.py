@@ -0,0 +1,172 @@
+# ai_agents/llm_backends.py
+"""
+Pluggable model backends behind the LLM gateway (`ai_agents.llm`).
+
+A backend turns a model name into a model handle with the GenerativeModel surface the
+gateway calls: `generate_content(prompt, generation_config=None, stream=False)` and
+`generate_content_async(prompt, generation_config=None)`, returning objects with `.text`.
+`llm_backend.kind` in config.yaml selects one:
+
+- "gemini": Google's SDK (the default);
+- "standin": the deterministic in-process stand-in (`ai_agents.standin`), for offline runs,
+  load tests and benchmarks without spending quota;
+- "http": a Gemini-REST-shaped server at `llm_backend.url`, e.g. the stand-in started with
+  `python -m ai_agents.standin`. Connections are kept alive per thread.
+
+Rate limits, retries, circuit breaking, caching and coalescing stay in the gateway, so they
+behave the same whichever backend answers.
+"""
+
+import asyncio
+import http.client
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBackend:
+    name = "base"
+
+    def ready(self) -> bool:
+        """Prepare the backend (once); False when it can't serve calls (e.g. no API key)."""
+        return True
+
+    def model(self, name: str):
+        raise NotImplementedError
+
+
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+
+    def __init__(self):
+        self._configured = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def api_key() -> Optional[str]:
+        return os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+
+    def _sdk(self):
+        # the SDK is slow to import; load it with the first model. Configuring again would
+        # drop the SDK's cached clients and their open connections, so it happens once.
+        import google.generativeai as genai
+        with self._lock:
+            if not self._configured:
+                genai.configure(api_key=self.api_key())
+                self._configured = True
+                logger.info("🔌 Gemini client configured")
+        return genai
+
+    def ready(self) -> bool:
+        self._sdk()
+        return bool(self.api_key())
+
+    def model(self, name: str):
+        return self._sdk().GenerativeModel(name)
+
+
+class StandInBackend(LLMBackend):
+    name = "standin"
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        self.settings = settings or {}
+
+    def model(self, name: str):
+        from ai_agents.standin import StandInModel
+        return StandInModel(name, self.settings)
+
+
+class HTTPError(Exception):
+    """Non-2xx answer from an HTTP backend; `code` is the HTTP status (drives retries)."""
+
+    def __init__(self, code: int, message: str = ""):
+        super().__init__(f"HTTP {code}: {message}")
+        self.code = code
+
+
+class _HTTPResponse:
+    def __init__(self, payload: Dict[str, Any]):
+        parts = [p.get("text", "") for c in payload.get("candidates", [])
+                 for p in (c.get("content") or {}).get("parts", [])]
+        self.text = "".join(parts)
+        self.usage_metadata = payload.get("usageMetadata")
+
+
+class HTTPModel:
+    backend = "http"
+
+    def __init__(self, base_url: str, name: str, timeout: float = 120.0):
+        self.model_name = f"models/{name}"
+        self._name = name
+        url = urlsplit(base_url)
+        self._https = url.scheme == "https"
+        self._host = url.netloc
+        self._prefix = url.path.rstrip("/")
+        self._timeout = timeout
+        self._local = threading.local()
+
+    def _conn(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+            conn = self._local.conn = cls(self._host, timeout=self._timeout)
+        return conn
+
+    def _post(self, method: str, prompt: str, generation_config=None):
+        body = json.dumps({"contents": [{"role": "user", "parts": [{"text": prompt}]}],
+                           "generationConfig": generation_config or {}}).encode("utf-8")
+        path = f"{self._prefix}/v1beta/models/{self._name}:{method}"
+        for attempt in range(2):
+            conn = self._conn()
+            try:
+                conn.request("POST", path, body, {"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                data = resp.read()
+                break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # the server closed an idle keep-alive connection; reconnect once
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+        payload = json.loads(data or b"{}")
+        if resp.status >= 300:
+            raise HTTPError(resp.status, (payload.get("error") or {}).get("message", "") if isinstance(payload, dict) else "")
+        return payload
+
+    def generate_content(self, prompt: str, generation_config=None, stream: bool = False):
+        if stream:
+            chunks: List[Dict[str, Any]] = self._post("streamGenerateContent", prompt, generation_config)
+            return iter([_HTTPResponse(c) for c in chunks])
+        return _HTTPResponse(self._post("generateContent", prompt, generation_config))
+
+    async def generate_content_async(self, prompt: str, generation_config=None):
+        return await asyncio.to_thread(self.generate_content, prompt, generation_config)
+
+
+class HTTPBackend(LLMBackend):
+    name = "http"
+
+    def __init__(self, url: str, timeout: float = 120.0):
+        self.url = url
+        self.timeout = timeout
+
+    def model(self, name: str):
+        return HTTPModel(self.url, name, self.timeout)
+
+
+def build_backend(settings) -> LLMBackend:
+    """Backend for an `llm_backend` settings section."""
+    kind = settings.kind
+    if kind == "gemini":
+        return GeminiBackend()
+    if kind == "standin":
+        return StandInBackend(settings.standin)
+    if kind == "http":
+        return HTTPBackend(settings.url, settings.timeout_s)
+    raise ValueError(f"Unknown llm_backend.kind: {kind!r} (expected gemini, standin or http)")
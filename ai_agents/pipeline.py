@@ -0,0 +1,186 @@
+# ai_agents/pipeline.py
+"""
+Declarative DAG pipelines of agent stages.
+
+A pipeline is a list of `Stage`s with explicit dependencies. Every stage whose
+dependencies have finished is submitted to one shared, bounded executor, so independent
+agents run in parallel and dependent ones start as soon as their inputs exist. A stage is
+called as `fn(user_input, context)` where `context` is the RAG context plus the outputs of
+its upstream stages.
+
+Failures are contained: a stage that raises or exceeds its timeout is reported in
+`PipelineResult.errors`, stages downstream of it are skipped, and every other branch still
+completes (partial results). Setting the `cancel` event stops scheduling and cancels
+queued stages.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = min(8, (os.cpu_count() or 2) * 2)
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_LOCK = threading.Lock()
+
+
+def get_pipeline_executor(max_workers: Optional[int] = None) -> ThreadPoolExecutor:
+    """Process-wide agent pool; `max_workers` only applies when the pool is first created."""
+    global _EXECUTOR
+    with _LOCK:
+        if _EXECUTOR is None:
+            workers = max_workers or DEFAULT_MAX_WORKERS
+            _EXECUTOR = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline")
+            logger.info("🧵 Pipeline executor started with %d workers", workers)
+        return _EXECUTOR
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[str, str], str]
+    deps: Tuple[str, ...] = ()
+    timeout: Optional[float] = None  # seconds from the moment the stage is submitted
+
+
+@dataclass
+class PipelineResult:
+    outputs: Dict[str, str] = field(default_factory=dict)   # finished stages, in completion order
+    errors: Dict[str, str] = field(default_factory=dict)    # failed / timed out stages
+    skipped: List[str] = field(default_factory=list)        # upstream failed or pipeline cancelled
+    timings: Dict[str, float] = field(default_factory=dict)  # ms per finished stage
+
+    @property
+    def complete(self) -> bool:
+        return not self.errors and not self.skipped
+
+
+def validate(stages: Sequence[Stage]):
+    """Raise ValueError on duplicate names, unknown dependencies or cycles."""
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f"duplicate stage names in {names}")
+    by_name = {s.name: s for s in stages}
+    for s in stages:
+        missing = [d for d in s.deps if d not in by_name]
+        if missing:
+            raise ValueError(f"stage {s.name!r} depends on unknown {missing}")
+    state: Dict[str, int] = {}
+
+    def visit(name, path):
+        if state.get(name) == 1:
+            raise ValueError(f"dependency cycle: {' -> '.join(path + [name])}")
+        if state.get(name) == 2:
+            return
+        state[name] = 1
+        for d in by_name[name].deps:
+            visit(d, path + [name])
+        state[name] = 2
+
+    for n in names:
+        visit(n, [])
+
+
+def _stage_context(context: str, stage: Stage, outputs: Dict[str, str]) -> str:
+    if not stage.deps:
+        return context
+    upstream = "\n\n".join(f"=={d}==\n{outputs[d]}" for d in stage.deps)
+    return f"{context}\n\nUpstream agent outputs:\n{upstream}"
+
+
+def _timed_call(fn, user_input, context):
+    t0 = time.perf_counter()
+    out = fn(user_input, context)
+    return out, (time.perf_counter() - t0) * 1000
+
+
+def run_pipeline(stages: Sequence[Stage], user_input: str, context: str,
+                 executor: Optional[ThreadPoolExecutor] = None,
+                 cancel: Optional[threading.Event] = None,
+                 on_event: Optional[Callable[[str, str, str], None]] = None,
+                 poll_interval: float = 0.05) -> PipelineResult:
+    """Run the DAG and return whatever finished. `on_event(stage, status, detail)` is called
+    with status pending / running / done / error / timeout / skipped / cancelled."""
+    validate(stages)
+    executor = executor or get_pipeline_executor()
+    result = PipelineResult()
+
+    def emit(name, status, detail=""):
+        if on_event is not None:
+            try:
+                on_event(name, status, detail)
+            except Exception:
+                logger.exception("Pipeline status callback failed")
+
+    waiting = {s.name: s for s in stages}
+    running: Dict[Future, Tuple[Stage, Optional[float]]] = {}
+    for s in stages:
+        emit(s.name, "pending")
+
+    def settle_blocked():
+        # anything downstream of a failure or skip can never run
+        changed = True
+        while changed:
+            changed = False
+            for name, s in list(waiting.items()):
+                if any(d in result.errors or d in result.skipped for d in s.deps):
+                    del waiting[name]
+                    result.skipped.append(name)
+                    emit(name, "skipped", "upstream stage failed")
+                    changed = True
+
+    while waiting or running:
+        if cancel is not None and cancel.is_set():
+            for fut, (s, _) in running.items():
+                fut.cancel()
+                result.skipped.append(s.name)
+                emit(s.name, "cancelled")
+            for name in waiting:
+                result.skipped.append(name)
+                emit(name, "cancelled")
+            logger.info("🛑 Pipeline cancelled; kept %d finished stages", len(result.outputs))
+            break
+
+        for name, s in list(waiting.items()):
+            if all(d in result.outputs for d in s.deps):
+                del waiting[name]
+                deadline = time.monotonic() + s.timeout if s.timeout else None
+                fut = executor.submit(_timed_call, s.fn, user_input, _stage_context(context, s, result.outputs))
+                running[fut] = (s, deadline)
+                emit(name, "running")
+
+        if not running:
+            settle_blocked()
+            if waiting and not running:
+                break
+            continue
+
+        done, _ = wait(list(running), timeout=poll_interval, return_when=FIRST_COMPLETED)
+        for fut in done:
+            s, _ = running.pop(fut)
+            try:
+                out, ms = fut.result()
+                result.outputs[s.name] = out if isinstance(out, str) else str(out)
+                result.timings[s.name] = round(ms, 1)
+                emit(s.name, "done", result.outputs[s.name][:400])
+            except Exception as e:
+                logger.exception("Stage %s failed: %s", s.name, e)
+                result.errors[s.name] = f"{type(e).__name__}: {e}"
+                emit(s.name, "error", str(e))
+        now = time.monotonic()
+        for fut, (s, deadline) in list(running.items()):
+            if deadline is not None and now > deadline:
+                # a running thread can't be interrupted; its late result is ignored
+                fut.cancel()
+                running.pop(fut)
+                result.errors[s.name] = f"timed out after {s.timeout}s"
+                emit(s.name, "timeout", result.errors[s.name])
+        settle_blocked()
+
+    return result
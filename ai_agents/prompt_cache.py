@@ -0,0 +1,143 @@
+# ai_agents/prompt_cache.py
+"""
+Exact-match cache of LLM responses keyed by (model, prompt, generation params).
+
+Agents call Gemini at temperature 0, so resending an identical prompt (retries, refined
+pipelines, the same question asked twice) buys nothing. Entries live in SQLite (WAL) with a
+TTL and a size bound, fronted by a small in-memory LRU so repeated hits cost a hash and a
+dict lookup. `bypass_prompt_cache()` turns the cache off for the current request (context);
+the fresh answer still replaces the stored one.
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_S = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 20000
+DEFAULT_MEMORY_ENTRIES = 512
+
+_BYPASS: contextvars.ContextVar = contextvars.ContextVar("prompt_cache_bypass", default=False)
+
+
+@contextlib.contextmanager
+def bypass_prompt_cache(enabled: bool = True):
+    """Skip cache lookups for LLM calls made in this context (e.g. a user asking for a fresh
+    answer); `enabled=False` leaves the current setting alone."""
+    token = _BYPASS.set(enabled or _BYPASS.get())
+    try:
+        yield
+    finally:
+        _BYPASS.reset(token)
+
+
+def is_bypassed() -> bool:
+    return _BYPASS.get()
+
+
+def prompt_key(model: str, prompt: str, params: Optional[Dict] = None) -> str:
+    payload = json.dumps([model, params or {}], sort_keys=True).encode("utf-8")
+    h = hashlib.sha256(payload)
+    h.update(b"\0")
+    h.update(prompt.encode("utf-8"))
+    return h.hexdigest()
+
+
+class PromptCache:
+    def __init__(self, path: str, ttl_s: float = DEFAULT_TTL_S, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 memory_entries: int = DEFAULT_MEMORY_ENTRIES):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, text)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS prompts (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT,
+                created REAL,
+                expires REAL
+            )
+            """
+        )
+        self._conn.commit()
+        self.stats: Dict[str, int] = {"hits": 0, "memory_hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM prompts").fetchone()[0]
+
+    def _remember(self, key: str, expires: float, text: str):
+        self._memory[key] = (expires, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > now:
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                self.stats["memory_hits"] += 1
+                return entry[1]
+            row = self._conn.execute("SELECT response, expires FROM prompts WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] <= now:
+                self._memory.pop(key, None)
+                self.stats["misses"] += 1
+                return None
+            self._remember(key, row[1], row[0])
+            self.stats["hits"] += 1
+            return row[0]
+
+    def put(self, key: str, model: str, text: str):
+        now = time.time()
+        expires = now + self.ttl_s
+        with self._lock:
+            self._remember(key, expires, text)
+            self._conn.execute("INSERT OR REPLACE INTO prompts VALUES (?, ?, ?, ?, ?)", (key, model, text, now, expires))
+            self._conn.execute("DELETE FROM prompts WHERE expires <= ?", (now,))
+            cur = self._conn.execute(
+                "DELETE FROM prompts WHERE key IN (SELECT key FROM prompts ORDER BY created DESC "
+                "LIMIT -1 OFFSET ?)", (self.max_entries,))
+            self.stats["evictions"] += max(cur.rowcount, 0)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_CACHE: Optional[PromptCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_prompt_cache(path: str = "prompt_cache.sqlite", ttl_s: float = DEFAULT_TTL_S,
+                     max_entries: int = DEFAULT_MAX_ENTRIES) -> PromptCache:
+    """Process-wide prompt cache. `path` only applies when it is first opened; TTL and size
+    bound follow the latest call (new entries / the next eviction)."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            _CACHE = PromptCache(path, ttl_s=ttl_s, max_entries=max_entries)
+            logger.info("🗄️ Prompt cache at %s (ttl %ss, max %d entries)", path, ttl_s, max_entries)
+        _CACHE.ttl_s, _CACHE.max_entries = ttl_s, max_entries
+        return _CACHE
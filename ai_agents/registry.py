@@ -0,0 +1,63 @@
+# ai_agents/registry.py
+"""
+Lazy registry of the orchestrator's agents.
+
+Agent modules pull in the Gemini SDK, so importing them all up front made every entry
+point (Streamlit, tests, scripts) pay for agents it may never call. `get_agent(name)`
+imports and builds an agent on first use and returns the same instance afterwards;
+`register` swaps in another factory (e.g. a stub in tests).
+"""
+
+import importlib
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# name -> (module, class); classes are built with no arguments
+AGENTS = {
+    "requirements": ("ai_agents.requirements_agent", "RequirementsAnalyzer"),
+    "understanding": ("ai_agents.understanding_agent", "UnderstandingAgent"),
+    "impact": ("ai_agents.impact_agent", "ImpactAnalyzerAgent"),
+    "blueprint": ("ai_agents.blueprint_agent", "BlueprintGeneratorAgent"),
+    "documentation": ("ai_agents.doc_generator_agent", "DocGeneratorAgent"),
+}
+
+_FACTORIES: Dict[str, Callable[[], Any]] = {}
+_INSTANCES: Dict[str, Any] = {}
+_LOCK = threading.Lock()
+
+
+def _import_factory(module: str, cls: str) -> Callable[[], Any]:
+    def build():
+        return getattr(importlib.import_module(module), cls)()
+    return build
+
+
+def register(name: str, factory: Callable[[], Any]):
+    """Use `factory` for `name` from now on (drops an already built instance)."""
+    with _LOCK:
+        _FACTORIES[name] = factory
+        _INSTANCES.pop(name, None)
+
+
+def get_agent(name: str) -> Any:
+    with _LOCK:
+        agent = _INSTANCES.get(name)
+        if agent is None:
+            factory = _FACTORIES.get(name)
+            if factory is None:
+                if name not in AGENTS:
+                    raise KeyError(f"Agent not found: {name}")
+                factory = _import_factory(*AGENTS[name])
+            agent = _INSTANCES[name] = factory()
+            logger.info("🤖 Agent %s ready", name)
+        return agent
+
+
+def reset_agents():
+    """Forget built instances and registered overrides."""
+    with _LOCK:
+        _FACTORIES.clear()
+        _INSTANCES.clear()
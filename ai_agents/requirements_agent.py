@@ -1,17 +1,10 @@
 # agents/requirements_agent.py
-import google.generativeai as genai
 import os
-import logging, yaml
+import logging
 from ai_agents.sdk_tools import search_vector
+from ai_agents.llm import agenerate, generate, get_model
 
-# Load config
-with open("config.yaml", "r") as fh:
-    CONFIG = yaml.safe_load(fh)
-    
 logger = logging.getLogger(__name__)
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
 
 PROMPT = """
 You are a requirements intent detector and short analyzer. Given the user's request and supporting context (from code/docs), produce the intent classification and a 1-line summary.
@@ -27,24 +20,33 @@ Be strict JSON only.
 """
 
 class RequirementsAnalyzer:
+    def build_prompt(self, query: str, context: str = "") -> str:
+        return PROMPT.format(query=query, context=context)
+
     def get_intent(self, query: str, context: str = "") -> dict:
-        prompt = PROMPT.format(query=query, context=context)
+        prompt = self.build_prompt(query, context)
         logger.info("✅ RequirementsAnalyzer Agent prompt: %s", prompt)
         try:
-            #resp = genai.generate_text(model="gemini-2.5-flash", input=prompt) if GEMINI_API_KEY else None
-            # Configure the API key
-            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-            # Load the model
-            model = genai.GenerativeModel(CONFIG["llm_mapping"]["requirement_agent"])
-            # Generate content from the model
-            resp = model.generate_content(prompt)
-            # Access the generated text
-            #resp = response.text
+            resp = generate(get_model("requirement_agent"), prompt)
             logger.info("✅ RequirementsAnalyzer Agent resp: %s", resp)
-            text = resp.text if resp else '{"intent":"generic","summary":"(simulated)"}'
+            text = resp or '{"intent":"generic","summary":"(simulated)"}'
         except Exception as e:
             logger.exception("Gemini error: %s", e)
             text = '{"intent":"generic","summary":"(failed to call LLM)"}'
+        return self.parse(query, text)
+
+    async def aget_intent(self, query: str, context: str = "") -> dict:
+        """`get_intent` on Gemini's async client."""
+        prompt = self.build_prompt(query, context)
+        logger.info("✅ RequirementsAnalyzer Agent async prompt: %s", prompt)
+        try:
+            text = await agenerate(get_model("requirement_agent"), prompt) or '{"intent":"generic","summary":"(simulated)"}'
+        except Exception as e:
+            logger.exception("Gemini error: %s", e)
+            text = '{"intent":"generic","summary":"(failed to call LLM)"}'
+        return self.parse(query, text)
+
+    def parse(self, query: str, text: str) -> dict:
         import json
         try:
             return json.loads(text)
@@ -0,0 +1,274 @@
+# ai_agents/resilience.py
+"""
+Quota-aware admission, retries and circuit breaking for LLM calls.
+
+Each model gets a `ModelGuard` (see `get_guard`) built from the `resilience` section of
+config.yaml:
+
+- two token buckets, requests/min and tokens/min. Callers *reserve* capacity and sleep until
+  their reservation is due, so under pressure calls are spaced at the quota rate instead of
+  bursting into 429s and retrying;
+- exponential backoff with full jitter for retryable upstream errors (429, 5xx, timeouts,
+  dropped connections); other errors are raised immediately;
+- a circuit breaker: after `breaker_failures` consecutive upstream failures the model is
+  considered unhealthy and calls fail fast with `LLMUnavailable` for `breaker_reset_s`,
+  after which a single trial call decides whether it closes again.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from ai_agents.config import get_config, subscribe
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying (google.api_core exceptions carry them in `.code`)
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_NAMES = {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+                   "DeadlineExceeded", "GatewayTimeout", "BadGateway", "RetryError"}
+
+
+class LLMUnavailable(RuntimeError):
+    """The model's circuit is open; the call was not sent upstream."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    if type(exc).__name__ in RETRYABLE_NAMES:
+        return True
+    code = getattr(exc, "code", None)
+    return isinstance(code, int) and code in RETRYABLE_CODES
+
+
+def backoff_delay(attempt: int, base_s: float, cap_s: float, rng: Callable[[], float] = random.random) -> float:
+    """Full-jitter backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return rng() * min(cap_s, base_s * (2 ** attempt))
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 chars/token; quota accounting needs an estimate, not the tokenizer's exact count
+    return max(1, len(text or "") // 4)
+
+
+class TokenBucket:
+    """`rate_per_min` units refilled continuously, holding at most `capacity` (default one
+    minute's worth). A rate of 0 means unlimited."""
+
+    def __init__(self, rate_per_min: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate_per_min / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_min
+        self._clock = clock
+        self._tokens = self.capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def reserve(self, n: float = 1.0) -> float:
+        """Take `n` units (going into debt if need be); returns the seconds to wait before the
+        reservation is covered."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(self._clock())
+            # a single request larger than the bucket still goes through, after a full refill
+            self._tokens -= min(n, self.capacity)
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def charge(self, n: float):
+        """Take `n` more units after the fact (e.g. output tokens); never waits."""
+        if self.rate <= 0 or n <= 0:
+            return
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens -= n
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill(self._clock())
+            return self._tokens
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int = 5, reset_s: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failures = failures
+        self.reset_s = reset_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._count = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if self._clock() - self._opened_at >= self.reset_s else "open"
+
+    def enter(self) -> Optional[bool]:
+        """None when the call is rejected, True when it is the half-open trial call, else False.
+
+        A granted trial is settled by `record_success` / `record_failure`, or handed back with
+        `release_trial` when the call ends without an answer (e.g. it was cancelled)."""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if self._clock() - self._opened_at < self.reset_s or self._trial:
+                return None
+            self._trial = True
+            return True
+
+    def allow(self) -> bool:
+        """True when a call may go upstream; in half-open state only one trial call at a time."""
+        return self.enter() is not None
+
+    def release_trial(self):
+        """Give the trial slot back without judging the upstream; the next call becomes the trial."""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("✅ Circuit closed again")
+            self._count, self._opened_at, self._trial = 0, None, False
+
+    def record_failure(self):
+        with self._lock:
+            self._count += 1
+            if self._trial or self._count >= self.failures:
+                if self._opened_at is None or self._trial:
+                    logger.warning("⛔ Circuit open after %d failures; failing fast for %.0fs",
+                                   self._count, self.reset_s)
+                self._opened_at, self._trial = self._clock(), False
+
+
+class ModelGuard:
+    def __init__(self, name: str, rpm: float = 0, tpm: float = 0, retries: int = 4,
+                 backoff_base_s: float = 0.5, backoff_cap_s: float = 20.0,
+                 breaker_failures: int = 5, breaker_reset_s: float = 30.0):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset_s)
+        self.retries = retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_cap_s = backoff_cap_s
+        self.stats: Dict[str, float] = {"calls": 0, "retries": 0, "rejected": 0, "throttled_s": 0.0}
+
+    def _admit(self, prompt_tokens: int) -> Tuple[float, bool]:
+        """Breaker check plus bucket reservations; returns (seconds to wait, half-open trial?)."""
+        trial = self.breaker.enter()
+        if trial is None:
+            self.stats["rejected"] += 1
+            raise LLMUnavailable(f"{self.name} circuit is open; upstream unhealthy")
+        delay = max(self.requests.reserve(1), self.tokens.reserve(prompt_tokens))
+        self.stats["calls"] += 1
+        self.stats["throttled_s"] += delay
+        return delay, trial
+
+    def _failed(self, exc: BaseException, attempt: int) -> Optional[float]:
+        """Backoff before the next attempt, or None when `exc` should be raised."""
+        if not is_retryable(exc):
+            # the upstream answered (e.g. 400 invalid argument); it is not unhealthy
+            self.breaker.record_success()
+            return None
+        self.breaker.record_failure()
+        if attempt >= self.retries or self.breaker.state == "open":
+            return None
+        self.stats["retries"] += 1
+        delay = backoff_delay(attempt, self.backoff_base_s, self.backoff_cap_s)
+        logger.warning("🔁 %s: %s; retry %d/%d in %.2fs", self.name, type(exc).__name__,
+                       attempt + 1, self.retries, delay)
+        return delay
+
+    def call(self, fn: Callable[[], object], prompt: str):
+        """Run `fn()` (one upstream request) under the model's quota, retries and breaker."""
+        prompt_tokens = estimate_tokens(prompt)
+        attempt = 0
+        while True:
+            delay, trial = self._admit(prompt_tokens)
+            try:
+                if delay:
+                    time.sleep(delay)
+                try:
+                    result = fn()
+                except Exception as e:
+                    backoff = self._failed(e, attempt)
+                    if backoff is None:
+                        raise
+                else:
+                    self.breaker.record_success()
+                    return result
+            except BaseException:
+                if trial:
+                    # interrupted or failed trial: never leave the breaker waiting on it forever
+                    self.breaker.release_trial()
+                raise
+            time.sleep(backoff)
+            attempt += 1
+
+    async def acall(self, fn: Callable[[], "asyncio.Future"], prompt: str):
+        """`call` for a coroutine function."""
+        prompt_tokens = estimate_tokens(prompt)
+        attempt = 0
+        while True:
+            delay, trial = self._admit(prompt_tokens)
+            try:
+                if delay:
+                    await asyncio.sleep(delay)
+                try:
+                    result = await fn()
+                except Exception as e:
+                    backoff = self._failed(e, attempt)
+                    if backoff is None:
+                        raise
+                else:
+                    self.breaker.record_success()
+                    return result
+            except BaseException:  # includes asyncio.CancelledError
+                if trial:
+                    self.breaker.release_trial()
+                raise
+            await asyncio.sleep(backoff)
+            attempt += 1
+
+    def charge_output(self, text: str):
+        self.tokens.charge(estimate_tokens(text))
+
+
+_GUARDS: Dict[str, ModelGuard] = {}
+_GUARDS_LOCK = threading.Lock()
+
+
+@subscribe
+def _on_config_change(old, new):
+    if old.resilience != new.resilience:
+        # fresh buckets and breakers with the new limits for the next calls
+        with _GUARDS_LOCK:
+            _GUARDS.clear()
+        logger.info("🔁 LLM rate limits now %s", new.resilience.rate_limits)
+
+
+def get_guard(model: str) -> ModelGuard:
+    """Process-wide guard for a Gemini model name."""
+    with _GUARDS_LOCK:
+        guard = _GUARDS.get(model)
+        if guard is None:
+            settings = get_config().resilience
+            limits = settings.limits_for(model)
+            guard = _GUARDS[model] = ModelGuard(
+                model, rpm=limits.get("rpm", 0), tpm=limits.get("tpm", 0), retries=settings.retries,
+                backoff_base_s=settings.backoff_base_s, backoff_cap_s=settings.backoff_cap_s,
+                breaker_failures=settings.breaker_failures, breaker_reset_s=settings.breaker_reset_s)
+        return guard
@@ -0,0 +1,196 @@
+# ai_agents/runtime.py
+"""
+Shared asyncio runtime for the orchestrator.
+
+One background event loop serves every conversation in the process (Streamlit's script
+threads hand their work to it through `run_coroutine`), and named semaphores bound how many
+LLM and retrieval calls are in flight at once (`concurrency` in config.yaml). Semaphores
+are kept per event loop, so async callers running their own loop get their own bounds.
+`shared_limit` is one process-wide bound that threads and coroutines on any loop draw from
+together; it backs the per-model caps, names of the form "model:<name>" sized by
+`concurrency.models` (per Gemini model).
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import logging
+import threading
+import weakref
+from typing import Deque, Dict, Optional, Tuple, Union
+
+from ai_agents.config import get_config, subscribe
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMITS = {"llm": 16, "retrieval": 8}
+DEFAULT_MODEL_LIMIT = 8
+
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = threading.Lock()
+_SEMAPHORES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+_SEMAPHORES_LOCK = threading.Lock()  # config reloads clear _SEMAPHORES from another thread
+_SHARED_LIMITS: Dict[str, "SharedLimit"] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def concurrency_limit(name: str) -> int:
+    settings = get_config().concurrency
+    if name.startswith("model:"):
+        models = settings.models
+        return int(models.get(name[len("model:"):], models.get("default", DEFAULT_MODEL_LIMIT)))
+    return int(getattr(settings, name, DEFAULT_LIMITS.get(name, 8)))
+
+
+@subscribe
+def _on_config_change(old, new):
+    if old.concurrency != new.concurrency:
+        # new acquisitions use semaphores sized by the new limits; calls holding an old
+        # semaphore finish normally
+        with _SEMAPHORES_LOCK:
+            _SEMAPHORES.clear()
+        with _SHARED_LOCK:
+            _SHARED_LIMITS.clear()
+        logger.info("🔁 Concurrency limits now %s", new.concurrency.model_dump())
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """The process-wide orchestrator loop, running on a daemon thread."""
+    global _LOOP
+    with _LOOP_LOCK:
+        if _LOOP is None or _LOOP.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="orchestrator-loop", daemon=True).start()
+            _LOOP = loop
+            logger.info("🔁 Orchestrator event loop started")
+        return _LOOP
+
+
+def run_coroutine(coro, timeout: Optional[float] = None):
+    """Sync shim: run `coro` on the shared loop and block until it finishes. On timeout the
+    coroutine is cancelled (releasing the slots it holds) before TimeoutError is raised."""
+    loop = get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_coroutine called from the orchestrator loop; await the coroutine instead")
+    fut = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return fut.result(timeout)
+    except concurrent.futures.TimeoutError:
+        fut.cancel()
+        logger.warning("⏱️ Request timed out after %s s; cancelled", timeout)
+        raise
+
+
+def limit(name: str) -> asyncio.Semaphore:
+    """Semaphore bounding concurrent `name` calls ("llm", "retrieval") on the current loop."""
+    loop = asyncio.get_running_loop()
+    with _SEMAPHORES_LOCK:
+        per_loop = _SEMAPHORES.get(loop)
+        if per_loop is None:
+            per_loop = _SEMAPHORES[loop] = {}
+        sem = per_loop.get(name)
+        if sem is None:
+            sem = per_loop[name] = asyncio.Semaphore(concurrency_limit(name))
+        return sem
+
+
+class SharedLimit:
+    """Counting semaphore shared by blocking callers and coroutines on any event loop.
+
+    `with` / `acquire()` block the calling thread; `async with` / `aacquire()` suspend the
+    coroutine. Waiters of both kinds queue in one FIFO and a released slot is handed straight
+    to the next one, so the bound holds across sync and async traffic combined."""
+
+    def __init__(self, value: int):
+        self.value = int(value)
+        self._free = int(value)
+        self._lock = threading.Lock()
+        self._waiters: Deque[Union[threading.Event, Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = collections.deque()
+
+    @property
+    def in_use(self) -> int:
+        with self._lock:
+            return self.value - self._free
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return True
+            granted = threading.Event()
+            self._waiters.append(granted)
+        granted.wait()
+        return True
+
+    async def aacquire(self) -> bool:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return True
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = waiter in self._waiters
+                if queued:
+                    self._waiters.remove(waiter)
+            if not queued and waiter[1].done() and not waiter[1].cancelled():
+                # the slot was handed over just as we were cancelled; pass it on
+                self.release()
+            raise
+        return True
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self._free = min(self._free + 1, self.value)
+                return
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+            return
+        loop, fut = waiter
+        try:
+            loop.call_soon_threadsafe(self._grant, fut)
+        except RuntimeError:
+            # that loop is closed; the slot goes to the next waiter
+            self.release()
+
+    def _grant(self, fut: asyncio.Future):
+        if fut.cancelled():
+            self.release()
+        else:
+            fut.set_result(True)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+    async def __aenter__(self):
+        await self.aacquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+        return False
+
+
+def shared_limit(name: str) -> SharedLimit:
+    """Process-wide bound for `name`, shared by threads and every event loop."""
+    with _SHARED_LOCK:
+        sem = _SHARED_LIMITS.get(name)
+        if sem is None:
+            sem = _SHARED_LIMITS[name] = SharedLimit(concurrency_limit(name))
+        return sem
@@ -1,12 +1,99 @@
 # agents/sdk_tools.py
 import logging
-from typing import Tuple, List, Dict, Any
-from tools.vector_store import VectorStore
+import threading
+from typing import TYPE_CHECKING, Tuple, List, Dict, Any
+from tools.doc_store import RetrievalHit, materialize
+from tools.reranker import get_reranker, DEFAULT_RERANK_MODEL
+from tools.retrieval_executor import run_retrieval
+
+if TYPE_CHECKING:
+    from tools.vector_store import VectorStore
 
 logger = logging.getLogger(__name__)
 
+_VECTOR_STORES: Dict[Tuple[str, int], "VectorStore"] = {}
+_VECTOR_STORES_LOCK = threading.Lock()
+
+
+def get_vector_store(persist_dir: str = "chroma_db", nprobe: int = 8) -> "VectorStore":
+    """Process-wide VectorStore per (persist_dir, nprobe); opening Chroma per search is expensive."""
+    key = (persist_dir, nprobe)
+    with _VECTOR_STORES_LOCK:
+        vs = _VECTOR_STORES.get(key)
+        if vs is None:
+            # chromadb is slow to import; only pay for it once retrieval is actually used
+            from tools.vector_store import VectorStore
+            vs = VectorStore(persist_directory=persist_dir, nprobe=nprobe)
+            _VECTOR_STORES[key] = vs
+        return vs
+
+
+def _rerank_hits(query: str, hits: List[RetrievalHit], top_k: int, n_fetch: int,
+                 rerank_model: str) -> List[RetrievalHit]:
+    """Re-score candidates with the local cross-encoder and keep the best `top_k`."""
+    if not hits:
+        return hits
+    try:
+        materialize(hits)
+        ranked = get_reranker(rerank_model, max_candidates=n_fetch).rerank(query, [h.text for h in hits], top_n=top_k)
+        out = []
+        for i, score in ranked:
+            hits[i].rerank_score = score
+            out.append(hits[i])
+        return out
+    except Exception:
+        # reranking is an optimisation; fall back to raw vector order
+        logger.exception("Reranking failed; using raw vector order")
+        return hits[:top_k]
+
+
+def _as_docs_dict(hits: List[RetrievalHit]) -> Tuple[str, Dict[str, Any]]:
+    """Materialize hits into the legacy (context_text, docs_dict) shape."""
+    materialize(hits)
+    documents = [h.text for h in hits]
+    docs_dict = {"ids": [h.id for h in hits], "documents": documents,
+                 "metadatas": [h.metadata for h in hits], "scores": [h.score for h in hits]}
+    if hits and all(h.rerank_score is not None for h in hits):
+        docs_dict["rerank_scores"] = [h.rerank_score for h in hits]
+    # join into a single context string (agents expect plain text context)
+    context = "\n\n".join([d for d in documents if d])
+    return context, docs_dict
+
+
+def retrieve_batch(queries: List[str], top_k: int = 5, persist_dir: str = "chroma_db",
+                   rerank: bool = False, candidates: int = 30,
+                   rerank_model: str = DEFAULT_RERANK_MODEL,
+                   mode: str = "similarity", lambda_mult: float = 0.5,
+                   nprobe: int = 8) -> List[List[RetrievalHit]]:
+    """Typed vector search: one list of lazily-loaded `RetrievalHit`s per query, best first.
+
+    Same options as `search_vector`. Chunk text is only read when a hit's `.text` is used
+    (or `tools.doc_store.materialize` is called), except for rerank candidates, which the
+    cross-encoder has to read anyway.
+    """
+    if not queries:
+        return []
+    vs = get_vector_store(persist_dir, nprobe)
+    n_fetch = max(top_k, candidates) if rerank else top_k
+    results = vs.search(list(queries), n_results=n_fetch, mode=mode, lambda_mult=lambda_mult)
+    out = []
+    for i, q in enumerate(queries):
+        hits = results[i] if i < len(results) else []
+        out.append(_rerank_hits(q, hits, top_k, n_fetch, rerank_model) if rerank else hits[:top_k])
+    return out
+
+
+def retrieve(query: str, **kwargs) -> List[RetrievalHit]:
+    """`retrieve_batch` for a single query."""
+    return retrieve_batch([query], **kwargs)[0]
+
+
 # Thin wrapper for RAG search
-def search_vector(query: str, top_k: int = 5, topk: int = None, persist_dir: str = "chroma_db") -> Tuple[str, Dict[str, Any]]:
+def search_vector(query: str, top_k: int = 5, topk: int = None, persist_dir: str = "chroma_db",
+                  rerank: bool = False, candidates: int = 30,
+                  rerank_model: str = DEFAULT_RERANK_MODEL,
+                  mode: str = "similarity", lambda_mult: float = 0.5,
+                  nprobe: int = 8) -> Tuple[str, Dict[str, Any]]:
     """Run a vector search and return (context_text, docs_dict).
 
     Returns:
@@ -14,25 +101,40 @@ def search_vector(query: str, top_k: int = 5, topk: int = None, persist_dir: str
       - docs_dict: raw documents+metadatas dict for callers that need sources
 
     Accepts either `top_k` or `topk` (legacy callers).
+    With `rerank=True` the store is over-fetched to `candidates` hits which are re-scored
+    by a local cross-encoder; only the best `top_k` are kept (scores in `rerank_scores`).
+    `mode="mmr"` diversifies the hits with maximal marginal relevance (`lambda_mult`).
+    `docs_dict["scores"]` holds each hit's similarity to the query and `docs_dict["ids"]` the
+    chunk ids; chunk byte spans are in each metadata's `start_byte` / `end_byte`.
+    `nprobe` only matters when an IVF-PQ index has been built for the store.
     """
     if topk is not None:
         top_k = topk
-    vs = VectorStore(persist_directory=persist_dir)
-    res = vs.query([query], n_results=top_k)
+    return search_vector_batch([query], top_k=top_k, persist_dir=persist_dir, rerank=rerank,
+                               candidates=candidates, rerank_model=rerank_model, mode=mode,
+                               lambda_mult=lambda_mult, nprobe=nprobe)[0]
 
-    # chroma returns nested lists per-query; we expect a single-query call so we take first element
-    documents = []
-    metadatas = []
-    try:
-        documents = res.get("documents", [[]])[0] if isinstance(res.get("documents", None), list) else res.get("documents", [])
-        metadatas = res.get("metadatas", [[]])[0] if isinstance(res.get("metadatas", None), list) else res.get("metadatas", [])
-    except Exception:
-        logger.exception("Failed to normalize vector store response")
 
-    # join into a single context string (agents expect plain text context)
-    context = "\n\n".join([d for d in documents if d])
-    docs_dict = {"documents": documents, "metadatas": metadatas}
-    return context, docs_dict
+def search_vector_batch(queries: List[str], top_k: int = 5, persist_dir: str = "chroma_db",
+                        rerank: bool = False, candidates: int = 30,
+                        rerank_model: str = DEFAULT_RERANK_MODEL,
+                        mode: str = "similarity", lambda_mult: float = 0.5,
+                        nprobe: int = 8) -> List[Tuple[str, Dict[str, Any]]]:
+    """`search_vector` for several queries at once: one store round-trip (and one embedding
+    batch) for all of them. Returns one (context_text, docs_dict) per query, in order."""
+    return [_as_docs_dict(hits) for hits in retrieve_batch(
+        queries, top_k=top_k, persist_dir=persist_dir, rerank=rerank, candidates=candidates,
+        rerank_model=rerank_model, mode=mode, lambda_mult=lambda_mult, nprobe=nprobe)]
+
+
+async def asearch_vector(query: str, **kwargs) -> Tuple[str, Dict[str, Any]]:
+    """Async `search_vector` on the shared bounded retrieval pool; cancellable while queued."""
+    return await run_retrieval(search_vector, query, **kwargs)
+
+
+async def asearch_vector_batch(queries: List[str], **kwargs) -> List[Tuple[str, Dict[str, Any]]]:
+    """Async `search_vector_batch` on the shared bounded retrieval pool."""
+    return await run_retrieval(search_vector_batch, queries, **kwargs)
 
 
 def detect_intent(query: str) -> str:
@@ -0,0 +1,176 @@
+# ai_agents/singleflight.py
+"""
+Single-flight coalescing of identical in-flight work.
+
+When several callers ask for the same thing at once (a question pasted by a whole meeting,
+the same prompt from two requests), only the first — the leader — does the work; the
+others wait for it and get the same result or exception. Nothing is remembered once the
+call finishes: this is deduplication of concurrent work, not a cache.
+
+`do` serves blocking callers (threads). `ado` serves coroutines: the shared work runs as a
+task, so a caller that is cancelled doesn't cancel it for the others; the task is only
+cancelled when every caller waiting on it has gone. Async flights are tracked per event
+loop. `stream` serves iterators (streamed answers): one pump thread drains the upstream
+iterator and every caller replays its items from the start as they arrive; the upstream is
+closed early only once every caller has stopped iterating.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import logging
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class _Broadcast:
+    __slots__ = ("items", "done", "error", "subscribers", "cond")
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.cond = threading.Condition()
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self._streams: Dict[Hashable, _Broadcast] = {}
+        self._flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, _Flight]]" = weakref.WeakKeyDictionary()
+        self.stats: Dict[str, int] = {"leaders": 0, "shared": 0}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """`fn(*args, **kwargs)`, or the result of an identical call already in flight."""
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._calls[key] = Future()
+                self.stats["leaders"] += 1
+            else:
+                self.stats["shared"] += 1
+        if not leader:
+            logger.info("🔗 %s: joined in-flight call", self.name)
+            return fut.result()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key)
+            fut.set_exception(e)
+            raise
+        self._finish(key)
+        fut.set_result(result)
+        return result
+
+    def _finish(self, key: Hashable):
+        with self._lock:
+            self._calls.pop(key, None)
+
+    async def ado(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Await `factory()`, or an identical coroutine already in flight on this loop."""
+        loop = asyncio.get_running_loop()
+        flights = self._flights.get(loop)
+        if flights is None:
+            flights = self._flights[loop] = {}
+        flight = flights.get(key)
+        if flight is None:
+            flight = flights[key] = _Flight(loop.create_task(factory()))
+            flight.task.add_done_callback(lambda _t: flights.pop(key, None) if flights.get(key) is flight else None)
+            self.stats["leaders"] += 1
+        else:
+            self.stats["shared"] += 1
+            logger.info("🔗 %s: joined in-flight call", self.name)
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                # nobody else wants the result any more
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def stream(self, key: Hashable, factory: Callable[[], Iterable[Any]]) -> Iterator[Any]:
+        """Items of `factory()`, or of an identical stream already in flight (replayed from its
+        first item). The upstream iterator runs on a pump thread in the leader's context."""
+        with self._lock:
+            flight = self._streams.get(key)
+            with flight.cond if flight else contextlib.nullcontext():
+                # a stream every caller has abandoned is winding down; start afresh
+                leader = flight is None or (flight.subscribers == 0 and not flight.done)
+                if leader:
+                    flight = self._streams[key] = _Broadcast()
+                    self.stats["leaders"] += 1
+                else:
+                    self.stats["shared"] += 1
+                flight.subscribers += 1
+        if leader:
+            ctx = contextvars.copy_context()
+            threading.Thread(target=ctx.run, args=(self._pump, key, flight, factory),
+                             name=f"{self.name}-stream", daemon=True).start()
+        else:
+            logger.info("🔗 %s: joined in-flight stream", self.name)
+        return self._follow(flight)
+
+    def _pump(self, key: Hashable, flight: _Broadcast, factory: Callable[[], Iterable[Any]]):
+        upstream = None
+        try:
+            upstream = iter(factory())
+            for item in upstream:
+                with flight.cond:
+                    flight.items.append(item)
+                    flight.cond.notify_all()
+                    if flight.subscribers == 0:
+                        break
+        except BaseException as e:
+            flight.error = e
+        finally:
+            close = getattr(upstream, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception:
+                    logger.exception("%s: closing an abandoned stream failed", self.name)
+            with self._lock:
+                if self._streams.get(key) is flight:
+                    del self._streams[key]
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    @staticmethod
+    def _follow(flight: _Broadcast) -> Iterator[Any]:
+        i = 0
+        try:
+            while True:
+                with flight.cond:
+                    while i >= len(flight.items) and not flight.done:
+                        flight.cond.wait()
+                    if i < len(flight.items):
+                        item = flight.items[i]
+                    elif flight.error is not None:
+                        raise flight.error
+                    else:
+                        return
+                i += 1
+                yield item
+        finally:
+            with flight.cond:
+                flight.subscribers -= 1
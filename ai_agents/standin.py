@@ -0,0 +1,300 @@
+# ai_agents/standin.py
+"""
+Deterministic local stand-in for Gemini, for load tests, benchmarks and offline runs.
+
+`StandInModel` has the GenerativeModel surface the gateway uses (`generate_content`, with
+`stream=True`, and `generate_content_async`) and answers each agent's prompt with a response
+that fits that agent's schema: intent JSON for the requirements analyzer, an impact array,
+a blueprint object, markdown docs or bullet-point explanations. Content is derived from the
+prompt alone (same prompt, same answer); sources are taken from the prompt's
+"Source: <path>" context headers.
+
+Latency (fixed, uniform or lognormal with a given median/p99), output length in tokens and
+the rate of upstream errors (raised as `StandInError` carrying an HTTP `code`, so the
+gateway retries and circuit-breaks them like real ones) come from `llm_backend.standin` in
+config.yaml and are drawn from a seeded RNG, so a run is reproducible.
+
+`serve()` exposes the same model over HTTP (Gemini REST shapes:
+POST /v1beta/models/<model>:generateContent and :streamGenerateContent) for the "http"
+backend or other processes:
+
+    python -m ai_agents.standin --port 8765
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+from ai_agents.resilience import estimate_tokens
+from ai_agents.sdk_tools import detect_intent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    "seed": 0,
+    "latency_ms": {"dist": "lognormal", "median": 800, "p99": 3000},
+    "output_tokens": 250,
+    "error_rate": 0.0,
+    "error_codes": [429, 503],
+    "stream_chunks": 8,
+}
+
+_QUERY_HEADERS = ("Change request:", "User request:", "User query:", "Request:")
+_WORDS = ("service", "handler", "request", "cache", "queue", "client", "schema", "endpoint", "latency",
+          "retry", "module", "contract", "config", "event", "storage", "auth", "payload", "timeout")
+
+
+class StandInError(Exception):
+    """Simulated upstream failure; `code` is the HTTP status (429, 503, ...)."""
+
+    def __init__(self, code: int, message: str = ""):
+        super().__init__(message or f"stand-in upstream error {code}")
+        self.code = code
+
+
+class StandInResponse:
+    """`text` plus Gemini-style `usage_metadata`."""
+
+    def __init__(self, text: str, prompt_tokens: int):
+        self.text = text
+        out = estimate_tokens(text) if text else 0
+        self.usage_metadata = SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=out,
+                                              total_token_count=prompt_tokens + out)
+
+
+def _query_of(prompt: str) -> str:
+    for header in _QUERY_HEADERS:
+        m = re.search(re.escape(header) + r"\s*\n(.+?)(?:\n\s*\n|\Z)", prompt, re.S)
+        if m and m.group(1).strip():
+            return m.group(1).strip()
+    return prompt.strip().splitlines()[-1] if prompt.strip() else ""
+
+
+def _sources_of(prompt: str) -> List[str]:
+    return list(dict.fromkeys(re.findall(r"Source: (\S+)", prompt)))[:5]
+
+
+def _filler(rng: random.Random, tokens: int) -> str:
+    # ~1.3 tokens per word
+    return " ".join(rng.choice(_WORDS) for _ in range(max(0, int(tokens / 1.3))))
+
+
+def render(prompt: str, output_tokens: int = 250) -> str:
+    """The stand-in answer for `prompt`: schema-valid for the agent that built it and a
+    deterministic function of the prompt."""
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+    query = _query_of(prompt)
+    sources = _sources_of(prompt)
+    short = query[:120]
+
+    if "requirements intent detector" in prompt:
+        return json.dumps({"intent": detect_intent(query), "summary": f"(stand-in) {short}"})
+    if "Output STRICT JSON array of objects" in prompt:
+        n = 1 + rng.randrange(3)
+        per = max(output_tokens // n - 30, 0)
+        return json.dumps([{
+            "name": (sources[i].split("/")[-1] if i < len(sources) else f"module-{i + 1}"),
+            "nature": f"(stand-in) update for: {short}",
+            "level": rng.choice(["minor", "medium", "major"]),
+            "tshirt": rng.choice(["XS", "S", "M", "L", "XL", "XXL"]),
+            "justification": _filler(rng, per),
+            "sources": sources[i:i + 1],
+        } for i in range(n)], indent=2)
+    if "JSON blueprint" in prompt:
+        n = 1 + rng.randrange(3)
+        per = max(output_tokens // n - 40, 0)
+        return json.dumps({
+            "title": f"(stand-in) {short[:60]}",
+            "originalRequirement": query,
+            "components": [{
+                "name": f"component-{i + 1}",
+                "solution_description": _filler(rng, per),
+                "interfaces": [f"/api/{rng.choice(_WORDS)}"],
+                "notes": "",
+                "estimated_effort": rng.choice(["S", "M", "L"]),
+            } for i in range(n)],
+            "patterns": rng.sample(["event-driven", "cqrs", "saga", "api-gateway", "cache-aside"], 2),
+            "risks": [_filler(rng, 12)],
+            "estimated_overall_effort": rng.choice(["M", "L", "XL"]),
+        }, indent=2)
+    if "technical writer" in prompt:
+        sections = ["Overview", "Components or Modules", "APIs or Interfaces", "Dependencies / Integrations",
+                    "Example / Usage", "Recommendations"]
+        per = max(output_tokens // len(sections) - 4, 0)
+        body = "\n\n".join(f"## {s}\n{_filler(rng, per)}" for s in sections)
+        return f"# (stand-in) {short}\n\n{body}\n"
+    bullets = max(1, output_tokens // 25)
+    lines = [f"- (stand-in) {short}"] + [f"- {_filler(rng, 22)}" for _ in range(bullets - 1)]
+    if sources:
+        lines.append("Sources: " + ", ".join(sources))
+    return "\n".join(lines)
+
+
+class LatencyModel:
+    """Latency in seconds drawn from `{"dist": "fixed"|"uniform"|"lognormal", ...}` (ms)."""
+
+    def __init__(self, spec: Dict[str, Any], rng: random.Random):
+        self.spec = spec or {"dist": "fixed", "ms": 0}
+        self.rng = rng
+
+    def sample(self) -> float:
+        dist = self.spec.get("dist", "fixed")
+        if dist == "uniform":
+            ms = self.rng.uniform(self.spec.get("low", 0), self.spec.get("high", 0))
+        elif dist == "lognormal":
+            median = float(self.spec.get("median", 800))
+            p99 = float(self.spec.get("p99", median * 3))
+            sigma = math.log(max(p99, median) / median) / 2.326 if median > 0 else 0.0
+            ms = median * math.exp(sigma * self.rng.gauss(0, 1)) if median > 0 else 0.0
+        else:
+            ms = self.spec.get("ms", 0)
+        return max(float(ms), 0.0) / 1000.0
+
+
+class StandInModel:
+    backend = "standin"  # keeps stand-in answers out of the real model's prompt-cache entries
+
+    def __init__(self, name: str, settings: Optional[Dict[str, Any]] = None):
+        self.model_name = f"models/{name}"
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self._rng = random.Random(self.settings["seed"])
+        self._lock = threading.Lock()
+        self.latency = LatencyModel(self.settings["latency_ms"], self._rng)
+        self.calls = 0
+
+    def _draw(self):
+        """(latency seconds, error or None) for the next call, from the seeded RNG."""
+        with self._lock:
+            self.calls += 1
+            latency = self.latency.sample()
+            failed = self._rng.random() < self.settings["error_rate"]
+            code = self._rng.choice(self.settings["error_codes"]) if failed else None
+        return latency, (StandInError(code) if code else None)
+
+    def _answer(self, prompt: str) -> str:
+        return render(prompt, int(self.settings["output_tokens"]))
+
+    def _chunks(self, text: str) -> List[str]:
+        n = max(1, int(self.settings["stream_chunks"]))
+        size = max(1, math.ceil(len(text) / n))
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def generate_content(self, prompt: str, generation_config=None, stream: bool = False):
+        latency, error = self._draw()
+        if not stream:
+            time.sleep(latency)
+            if error:
+                raise error
+            return StandInResponse(self._answer(prompt), estimate_tokens(prompt))
+        # like the SDK, the first chunk (or the error) arrives before this returns
+        chunks = self._chunks(self._answer(prompt))
+        time.sleep(latency / (len(chunks) + 1))
+        if error:
+            raise error
+        return self._stream(chunks, latency / (len(chunks) + 1), estimate_tokens(prompt))
+
+    @staticmethod
+    def _stream(chunks: List[str], gap: float, prompt_tokens: int) -> Iterator[StandInResponse]:
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(gap)
+            yield StandInResponse(chunk, prompt_tokens)
+
+    async def generate_content_async(self, prompt: str, generation_config=None):
+        latency, error = self._draw()
+        await asyncio.sleep(latency)
+        if error:
+            raise error
+        return StandInResponse(self._answer(prompt), estimate_tokens(prompt))
+
+
+def _handler(settings: Dict[str, Any]):
+    models: Dict[str, StandInModel] = {}
+    lock = threading.Lock()
+
+    def model_for(name: str) -> StandInModel:
+        with lock:
+            if name not in models:
+                models[name] = StandInModel(name, settings)
+            return models[name]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so clients reuse connections
+
+        def log_message(self, fmt, *args):
+            logger.debug("stand-in %s", fmt % args)
+
+        def _send(self, code: int, payload: Any):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            m = re.match(r"^/v1(?:beta)?/models/([^:/]+):(generateContent|streamGenerateContent)", self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return self._send(400, {"error": {"code": 400, "message": "invalid JSON"}})
+            if not m:
+                return self._send(404, {"error": {"code": 404, "message": f"no route for {self.path}"}})
+            prompt = "".join(p.get("text", "") for c in request.get("contents", []) for p in c.get("parts", []))
+            model = model_for(m.group(1))
+            try:
+                if m.group(2) == "generateContent":
+                    chunks = [model.generate_content(prompt)]
+                else:
+                    chunks = list(model.generate_content(prompt, stream=True))
+            except StandInError as e:
+                return self._send(e.code, {"error": {"code": e.code, "message": str(e)}})
+            payload = [{
+                "candidates": [{"content": {"parts": [{"text": c.text}], "role": "model"}}],
+                "usageMetadata": {"promptTokenCount": c.usage_metadata.prompt_token_count,
+                                  "candidatesTokenCount": c.usage_metadata.candidates_token_count,
+                                  "totalTokenCount": c.usage_metadata.total_token_count},
+            } for c in chunks]
+            self._send(200, payload[0] if m.group(2) == "generateContent" else payload)
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, settings: Optional[Dict[str, Any]] = None) -> ThreadingHTTPServer:
+    """Start the stand-in HTTP server on a daemon thread (port 0 picks a free port)."""
+    server = ThreadingHTTPServer((host, port), _handler(settings or {}))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="standin-server", daemon=True).start()
+    logger.info("🧪 Stand-in LLM serving on http://%s:%d", *server.server_address[:2])
+    return server
+
+
+def main():
+    from ai_agents.config import get_config
+
+    ap = argparse.ArgumentParser(description="Serve the deterministic stand-in LLM over HTTP.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = serve(args.host, args.port, get_config().llm_backend.standin)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
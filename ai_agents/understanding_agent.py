@@ -1,16 +1,10 @@
 # agents/understanding_agent.py
-import google.generativeai as genai
-import os, logging, yaml
+import os, logging, threading
+from typing import Iterator
 from ai_agents.sdk_tools import search_vector
-
-# Load config
-with open("config.yaml", "r") as fh:
-    CONFIG = yaml.safe_load(fh)
+from ai_agents.llm import agenerate, generate, get_model, stream_text
 
 logger = logging.getLogger(__name__)
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
 
 PROMPT = """
 You are an expert software architect. Use the context and relevant all files in the main repo and service specific folders to explain the module/service.
@@ -34,21 +28,51 @@ Return as plain text.
 """
 
 class UnderstandingAgent:
+    def __init__(self):
+        # per-thread: the agent instance is shared and `stream` runs on the requesting thread
+        self._stream_state = threading.local()
+
+    def build_prompt(self, query: str, context: str = "") -> str:
+        return PROMPT.format(context=context or "No context", query=query)
+
     def analyze(self, query: str, context: str = "") -> str:
-        prompt = PROMPT.format(context=context or "No context", query=query)
+        prompt = self.build_prompt(query, context)
         logger.info("✅ Understanding Agent prompt: %s", prompt)
         try:
-            #resp = genai.generate_text(model="gemini-2.5-flash", input=prompt) if GEMINI_API_KEY else None
-            # Configure the API key
-            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-            # Load the model
-            model = genai.GenerativeModel(CONFIG["llm_mapping"]["understanding_agent"])
-            # Generate content from the model
-            resp = model.generate_content(prompt)
-            # Access the generated text
-            #resp = response.text
+            resp = generate(get_model("understanding_agent"), prompt)
             logger.info("✅ Understanding Agent resp: %s", resp)
-            return resp.text if resp else "(simulated) Understanding result"
+            return resp or "(simulated) Understanding result"
+        except Exception as e:
+            logger.exception("Gemini error: %s", e)
+            return f"Error generating understanding: {e}"
+
+    async def aanalyze(self, query: str, context: str = "") -> str:
+        """`analyze` on Gemini's async client."""
+        prompt = self.build_prompt(query, context)
+        logger.info("✅ Understanding Agent async prompt: %s", prompt)
+        try:
+            return await agenerate(get_model("understanding_agent"), prompt) or "(simulated) Understanding result"
         except Exception as e:
             logger.exception("Gemini error: %s", e)
             return f"Error generating understanding: {e}"
+
+    def stream(self, query: str, context: str = "") -> Iterator[str]:
+        """Yield the answer as Gemini streams it."""
+        prompt = self.build_prompt(query, context)
+        logger.info("✅ Understanding Agent streaming prompt: %s", prompt)
+        self._stream_state.failed = False
+        try:
+            yield from stream_text(get_model("understanding_agent"), prompt)
+        except Exception as e:
+            logger.exception("Gemini error: %s", e)
+            self._stream_state.failed = True
+            yield f"Error generating understanding: {e}"
+
+    @property
+    def stream_failed(self) -> bool:
+        """True when the last `stream` on this thread ended in an error, so its text is not an answer."""
+        return getattr(self._stream_state, "failed", False)
+
+    def finalize(self, text: str) -> str:
+        """Final response for a fully streamed answer."""
+        return text
@@ -0,0 +1,147 @@
+# benchmarks/bench_ivfpq.py
+"""
+Recall / latency / memory benchmark for the IVF-PQ index (tools/ivfpq_index.py) against exact
+brute-force search, on synthetic clustered unit vectors shaped like MiniLM embeddings (384-d).
+
+Vectors are generated chunk by chunk from a fixed seed, so the 5M run never holds the full
+float32 matrix (7.7 GB) in memory: the index is built from encoded chunks and the exact ground
+truth is computed by streaming the same chunks again.
+
+Usage:
+    python -m benchmarks.bench_ivfpq                          # 100k, 1M, 5M
+    python -m benchmarks.bench_ivfpq --sizes 100000 --nprobe 1 8 32 --out bench_ivfpq.json
+"""
+
+import argparse
+import json
+import logging
+import time
+
+import numpy as np
+
+from tools.ivfpq_index import IVFPQIndex
+
+logger = logging.getLogger(__name__)
+
+CHUNK = 100_000
+
+
+def _centers(dim: int, n_clusters: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n_clusters, dim)).astype(np.float32)
+
+
+def synthetic_chunk(start: int, size: int, centers: np.ndarray, seed: int, noise: float = 0.25) -> np.ndarray:
+    """Deterministic chunk [start, start + size) of the synthetic corpus (unit-normalised)."""
+    rng = np.random.default_rng((seed, start))
+    x = centers[rng.integers(0, len(centers), size)] + noise * rng.normal(size=(size, centers.shape[1])).astype(np.float32)
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    return x
+
+
+def iter_corpus(n: int, centers: np.ndarray, seed: int):
+    for start in range(0, n, CHUNK):
+        yield start, synthetic_chunk(start, min(CHUNK, n - start), centers, seed)
+
+
+def exact_topk(queries: np.ndarray, n: int, centers: np.ndarray, seed: int, k: int):
+    """Streaming exact top-k by squared L2; returns (ids, seconds per query)."""
+    best_d = np.full((len(queries), k), np.inf, dtype=np.float32)
+    best_i = np.zeros((len(queries), k), dtype=np.int64)
+    elapsed = 0.0
+    for start, x in iter_corpus(n, centers, seed):
+        t0 = time.perf_counter()
+        d = 2.0 - 2.0 * (queries @ x.T)
+        cand_d = np.concatenate([best_d, d], axis=1)
+        cand_i = np.concatenate([best_i, np.broadcast_to(np.arange(start, start + len(x)), d.shape)], axis=1)
+        top = np.argpartition(cand_d, k - 1, axis=1)[:, :k]
+        best_d = np.take_along_axis(cand_d, top, 1)
+        best_i = np.take_along_axis(cand_i, top, 1)
+        elapsed += time.perf_counter() - t0
+    order = np.argsort(best_d, axis=1)
+    return np.take_along_axis(best_i, order, 1), elapsed / len(queries)
+
+
+def bench_size(n: int, dim: int, nprobes, k: int, n_queries: int, sample_size: int, seed: int) -> dict:
+    centers = _centers(dim, max(64, n // 2000), seed)
+    nlist = int(4 * np.sqrt(n))
+    m = dim // 8
+    index = IVFPQIndex(dim, nlist=nlist, m=m)
+
+    sample_rng = np.random.default_rng(seed + 1)
+    sample = synthetic_chunk(0, min(n, CHUNK), centers, seed)
+    sample = sample[sample_rng.choice(len(sample), min(len(sample), sample_size), replace=False)]
+    t0 = time.perf_counter()
+    index.train(sample, iters=10, seed=seed)
+    train_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    lists, codes = [], []
+    for _, x in iter_corpus(n, centers, seed):
+        li, co = index.encode(x)
+        lists.append(li)
+        codes.append(co)
+    index.add_encoded(np.arange(n), np.concatenate(lists), np.concatenate(codes))
+    del lists, codes
+    add_s = time.perf_counter() - t0
+
+    q_rng = np.random.default_rng(seed + 2)
+    queries = synthetic_chunk(int(q_rng.integers(0, n - n_queries)), n_queries, centers, seed)
+    queries += 0.05 * q_rng.normal(size=queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth, exact_s = exact_topk(queries, n, centers, seed, k)
+
+    result = {
+        "n": n, "dim": dim, "nlist": nlist, "m": m, "k": k, "queries": n_queries,
+        "train_seconds": round(train_s, 2), "add_seconds": round(add_s, 2),
+        "index_mb": round(index.memory_bytes() / 1e6, 1),
+        "exact_float32_mb": round(n * dim * 4 / 1e6, 1),
+        "exact_ms_per_query": round(exact_s * 1000, 2),
+        "nprobe": [],
+    }
+    for nprobe in nprobes:
+        lat = []
+        recall = 0.0
+        nn_found = 0
+        for qi, q in enumerate(queries):
+            t0 = time.perf_counter()
+            ids, _ = index.search(q, k=k, nprobe=nprobe)
+            lat.append(time.perf_counter() - t0)
+            recall += len(set(ids[0]) & set(truth[qi].tolist())) / k
+            nn_found += int(truth[qi][0] in set(ids[0]))
+        lat_ms = np.asarray(lat) * 1000
+        result["nprobe"].append({
+            "nprobe": nprobe,
+            f"recall@{k}": round(recall / len(queries), 4),
+            # share of queries whose exact nearest neighbour is in the top k (the usual IVF-PQ metric)
+            f"1-recall@{k}": round(nn_found / len(queries), 4),
+            "p50_ms": round(float(np.percentile(lat_ms, 50)), 3),
+            "p95_ms": round(float(np.percentile(lat_ms, 95)), 3),
+        })
+    logger.info("n=%d done: %s", n, result)
+    return result
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--queries", type=int, default=100)
+    ap.add_argument("--sample-size", type=int, default=50_000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", help="write JSON results here as well as stdout")
+    args = ap.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    results = [bench_size(n, args.dim, args.nprobe, args.k, args.queries, args.sample_size, args.seed)
+               for n in args.sizes]
+    text = json.dumps({"benchmark": "ivfpq", "results": results}, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf8") as fh:
+            fh.write(text)
+
+
+if __name__ == "__main__":
+    main()
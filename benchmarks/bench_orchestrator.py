@@ -0,0 +1,405 @@
+# benchmarks/bench_orchestrator.py
+"""
+End-to-end benchmark for the orchestrator (`ai_agents.architect_agent.run_agent_sync`):
+intent detection, retrieval, context assembly, the agent's LLM call and the chat write.
+
+The sample codebase (`app.sample_codebase_dir`, or --codebase) is indexed into a throwaway
+vector store with a deterministic hashing embedder, so no model download is needed and two
+runs retrieve the same chunks. LLM calls go to the stand-in backend (`ai_agents.standin`)
+with the latency given by --llm-latency-ms; chats go to a throwaway database. Requests are
+spread evenly over the understanding, impact, blueprint and documentation intents and run
+at each --concurrency level from a thread pool, like concurrent Streamlit sessions.
+
+Per level it reports end-to-end and per-stage latency percentiles (overall and per intent),
+throughput, errors, which agent each intent was routed to, gateway stats and peak RSS.
+The response and prompt caches are off unless --cache (every request then does the full
+work), and the configured LLM rate limits are lifted unless --rate-limits, so the numbers
+describe the orchestrator rather than the quota.
+
+Usage:
+    python -m benchmarks.bench_orchestrator                              # concurrency 1, 4, 16
+    python -m benchmarks.bench_orchestrator --requests 200 --concurrency 8 32 --out after.json
+    python -m benchmarks.bench_orchestrator --llm-latency-ms 800 3000 --compare before.json
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import platform
+import random
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# indexed instead when the sample codebase is missing or empty (e.g. submodule not checked out)
+FALLBACK_DIRS = ("ai_agents", "tools")
+INDEX_EXTS = ["*.py", "*.java", "*.go", "*.js", "*.ts", "*.md", "*.txt", "*.yaml", "*.yml", "*.json"]
+
+TEMPLATES = {
+    "understanding": ["Explain how {s} works", "What does {s} do and who calls it?"],
+    "impact": ["What is the impact of changing the interface of {s}?",
+               "Which services are affected if we remove {s}?"],
+    "blueprint": ["Design a solution to add caching in front of {s}",
+                  "Propose an architecture for splitting {s} into its own service"],
+    "documentation": ["Generate documentation for {s}", "Write docs for the public functions in {s}"],
+}
+PERCENTILES = (50, 90, 95, 99)
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-identifiers embedder: tokens are feature-hashed (signed) into
+    `dim` buckets and the vector is unit-normalised. Serves both as the Embedder's model
+    (`encode`) and as the vector store's query embedding function (`__call__`)."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def name(self) -> str:
+        return f"hashing-{self.dim}"
+
+    def _embed(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token in re.findall(r"[a-z_][a-z0-9_]*", text.lower()):
+            h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        return np.stack([self._embed(t) for t in texts]) if texts else np.zeros((0, self.dim), np.float32)
+
+    def __call__(self, input: List[str]) -> List[np.ndarray]:
+        return [self._embed(t) for t in input]
+
+
+class RSSSampler:
+    """Peak resident set size while the block runs, sampled from /proc every `interval` s
+    (falls back to the process-lifetime ru_maxrss where /proc is unavailable)."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def current_kb() -> Optional[int]:
+        try:
+            with open("/proc/self/status", "r", encoding="ascii") as fh:
+                for line in fh:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except OSError:
+            return None
+        return None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, self.current_kb() or 0)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_kb = max(self.peak_kb, self.current_kb() or 0) or max_rss_kb()
+
+
+def max_rss_kb() -> int:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # bytes on macOS, KiB on Linux
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    arr = np.asarray(values, dtype=np.float64)
+    out = {f"p{p}": round(float(np.percentile(arr, p)), 1) for p in PERCENTILES}
+    out.update(mean=round(float(arr.mean()), 1), max=round(float(arr.max()), 1))
+    return out
+
+
+def _has_files(base_dir: str) -> bool:
+    for root, _, files in os.walk(base_dir):
+        if any(f.endswith(tuple(e[1:] for e in INDEX_EXTS)) for f in files):
+            return True
+    return False
+
+
+def index_corpus(codebase: str, persist_dir: str, embedder: HashingEmbedder) -> dict:
+    from tools.embedder import Embedder
+
+    dirs = [codebase] if os.path.isdir(codebase) and _has_files(codebase) else \
+        [os.path.join(ROOT, d) for d in FALLBACK_DIRS]
+    if dirs[0] != codebase:
+        logger.warning("⚠️ %s has no indexable files; indexing %s instead", codebase, ", ".join(FALLBACK_DIRS))
+    t0 = time.perf_counter()
+    indexer = Embedder(persist_dir=persist_dir, model=embedder)
+    for d in dirs:
+        indexer.embed_codebase(d, INDEX_EXTS)
+    chunks = indexer.vs.collection.count()
+    seconds = time.perf_counter() - t0
+    files = sorted({os.path.join(root, f) for d in dirs for root, _, fs in os.walk(d)
+                    for f in fs if f.endswith(tuple(e[1:] for e in INDEX_EXTS))})
+    return {"dirs": [os.path.relpath(d, ROOT) for d in dirs], "files": len(files), "chunks": chunks,
+            "seconds": round(seconds, 2), "subjects": _subjects(files)}
+
+
+def _subjects(files: List[str]) -> List[str]:
+    """Module names to ask about; names that would themselves trip the keyword intent
+    detector (e.g. "doc_agent") are left out so each template keeps its intent."""
+    from ai_agents.sdk_tools import detect_intent
+
+    stems = sorted({os.path.splitext(os.path.basename(f))[0] for f in files} - {"__init__", "README"})
+    return [s for s in stems if detect_intent(s) == "generic"]
+
+
+def build_queries(subjects: List[str], seed: int) -> Dict[str, List[str]]:
+    """Per intent, every template x subject, in a seeded order (distinct texts, so requests
+    don't coalesce or hit the query-embedding cache unless the pool wraps around)."""
+    rng = random.Random(seed)
+    pools = {}
+    for intent, templates in TEMPLATES.items():
+        pool = [t.format(s=s) for s in subjects for t in templates]
+        rng.shuffle(pool)
+        pools[intent] = pool
+    return pools
+
+
+class QueryStream:
+    """Hands out (intent, query) round-robin over intents, walking each intent's pool."""
+
+    def __init__(self, pools: Dict[str, List[str]]):
+        self.pools = pools
+        self.intents = list(pools)
+        self.pos = 0
+
+    def take(self, n: int):
+        out = []
+        for _ in range(n):
+            intent = self.intents[self.pos % len(self.intents)]
+            pool = self.pools[intent]
+            out.append((intent, pool[(self.pos // len(self.intents)) % len(pool)]))
+            self.pos += 1
+        return out
+
+
+def _one(query: str, persist_dir: str, use_cache: bool, timeout: float) -> dict:
+    from ai_agents.architect_agent import run_agent_sync
+
+    t0 = time.perf_counter()
+    try:
+        res = run_agent_sync(query, persist_dir, timeout=timeout, use_cache=use_cache)
+    except Exception as e:  # timeouts surface here; the orchestrator catches the rest itself
+        res = {"agent": "error", "response": f"{type(e).__name__}: {e}", "timings": {}}
+    res["wall_ms"] = (time.perf_counter() - t0) * 1000
+    return res
+
+
+def _stage_summary(results: List[dict]) -> Dict[str, Dict[str, float]]:
+    stages = defaultdict(list)
+    for res in results:
+        for stage, ms in (res.get("timings") or {}).items():
+            stages[stage].append(ms)
+    return {stage: summarize(v) for stage, v in sorted(stages.items())}
+
+
+def bench_level(concurrency: int, work, persist_dir: str, use_cache: bool, timeout: float) -> dict:
+    from ai_agents import llm
+
+    llm.reset_gateway_stats()
+    with RSSSampler() as rss, ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as pool:
+        t0 = time.perf_counter()
+        futures = [pool.submit(_one, q, persist_dir, use_cache, timeout) for _, q in work]
+        results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - t0
+
+    ok = [r for r in results if r.get("agent") != "error"]
+    by_intent = defaultdict(list)
+    for (intent, _), res in zip(work, results):
+        by_intent[intent].append(res)
+    level = {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "seconds": round(elapsed, 2),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": summarize([r["wall_ms"] for r in ok]),
+        "stages_ms": _stage_summary(ok),
+        "intents": {
+            intent: {
+                "requests": len(rs),
+                "routed": dict(Counter(r.get("agent") for r in rs)),
+                "latency_ms": summarize([r["wall_ms"] for r in rs if r.get("agent") != "error"]),
+                "stages_ms": _stage_summary([r for r in rs if r.get("agent") != "error"]),
+            } for intent, rs in by_intent.items()
+        },
+        "gateway": llm.gateway_stats(),
+        "peak_rss_mb": round(rss.peak_kb / 1024, 1),
+    }
+    failures = Counter(r["response"][:200] for r in results if r.get("agent") == "error")
+    if failures:
+        level["error_samples"] = [{"count": n, "response": text} for text, n in failures.most_common(5)]
+    logger.info("concurrency=%d: %.1f req/s, p50 %s ms, p99 %s ms, %d errors, peak RSS %.0f MB",
+                concurrency, level["throughput_rps"], level["latency_ms"].get("p50"),
+                level["latency_ms"].get("p99"), level["errors"], level["peak_rss_mb"])
+    return level
+
+
+def configure(args, workdir: str, persist_dir: str, embedder: HashingEmbedder):
+    """Point the app at the stand-in LLM, the deterministic query embedder and throwaway
+    chat DB / generated-docs directories under `workdir`. Settings are changed in memory
+    only; config.yaml is left alone."""
+    from ai_agents import architect_agent
+    from ai_agents.config import get_config
+    from ai_agents.db import ChatDB
+    from ai_agents.registry import get_agent
+    from ai_agents.sdk_tools import get_vector_store
+
+    cfg = get_config()
+    latency = ({"dist": "fixed", "ms": args.llm_latency_ms[0]} if len(args.llm_latency_ms) == 1 else
+               {"dist": "lognormal", "median": args.llm_latency_ms[0], "p99": args.llm_latency_ms[1]})
+    cfg.llm_backend.kind = "standin"
+    cfg.llm_backend.standin = {**cfg.llm_backend.standin, "seed": args.seed, "latency_ms": latency,
+                               "output_tokens": args.output_tokens, "error_rate": args.error_rate}
+    cfg.prompt_cache.enabled = args.cache and cfg.prompt_cache.enabled
+    cfg.response_cache.enabled = args.cache and cfg.response_cache.enabled
+    if not args.rate_limits:
+        cfg.resilience.rate_limits = {"default": {"rpm": 0, "tpm": 0}}
+
+    with architect_agent._CHAT_DB_LOCK:
+        architect_agent._CHAT_DB = ChatDB(os.path.join(workdir, "chats.db"))
+    docs = get_agent("documentation")
+    docs.output_dir = os.path.join(workdir, "generated_docs")
+    os.makedirs(docs.output_dir, exist_ok=True)
+    # queries must be embedded like the indexed chunks
+    get_vector_store(persist_dir, cfg.retrieval.nprobe).embedding_fn = embedder
+    return cfg
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def compare(baseline: dict, current: dict) -> List[dict]:
+    """Per concurrency level present in both runs: throughput and latency percentiles, with
+    the relative change (positive = larger now)."""
+    old = {r["concurrency"]: r for r in baseline.get("results", [])}
+    rows = []
+    for new in current["results"]:
+        prev = old.get(new["concurrency"])
+        if prev is None:
+            continue
+        row = {"concurrency": new["concurrency"]}
+        pairs = [("throughput_rps", prev["throughput_rps"], new["throughput_rps"]),
+                 ("peak_rss_mb", prev["peak_rss_mb"], new["peak_rss_mb"])]
+        pairs += [(f"{p}_ms", prev["latency_ms"].get(p), new["latency_ms"].get(p)) for p in ("p50", "p95", "p99")]
+        for name, a, b in pairs:
+            row[name] = {"before": a, "after": b,
+                         "change": round((b - a) / a, 3) if a and b is not None else None}
+        rows.append(row)
+    return rows
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--codebase", help="directory to index (default: app.sample_codebase_dir)")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    ap.add_argument("--requests", type=int, default=40, help="requests per concurrency level")
+    ap.add_argument("--warmup", type=int, default=4, help="untimed requests before the first level")
+    ap.add_argument("--llm-latency-ms", type=float, nargs="+", default=[50.0],
+                    help="fixed stand-in latency, or MEDIAN P99 for a lognormal one")
+    ap.add_argument("--output-tokens", type=int, default=250)
+    ap.add_argument("--error-rate", type=float, default=0.0, help="share of stand-in calls that fail (retried)")
+    ap.add_argument("--cache", action="store_true", help="keep the response and prompt caches as configured")
+    ap.add_argument("--rate-limits", action="store_true", help="keep the configured LLM rate limits")
+    ap.add_argument("--timeout", type=float, default=300.0, help="per-request timeout (s)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--keep", action="store_true", help="keep the temporary index and chat DB")
+    ap.add_argument("--out", help="write JSON results here as well as stdout")
+    ap.add_argument("--compare", metavar="BASELINE", help="JSON from an earlier run to diff against")
+    ap.add_argument("-v", "--verbose", action="store_true", help="show the app's own INFO logs")
+    args = ap.parse_args(argv)
+    if len(args.llm_latency_ms) > 2:
+        ap.error("--llm-latency-ms takes MS or MEDIAN P99")
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(asctime)s [%(levelname)s] %(message)s")
+    logger.setLevel(logging.INFO)
+
+    from ai_agents.config import get_config
+
+    codebase = args.codebase or os.path.join(ROOT, get_config().app.sample_codebase_dir)
+    workdir = tempfile.mkdtemp(prefix="bench_orchestrator_")
+    try:
+        persist_dir = os.path.join(workdir, "chroma")
+        embedder = HashingEmbedder()
+        index = index_corpus(codebase, persist_dir, embedder)
+        subjects = index.pop("subjects")
+        if not subjects:
+            raise SystemExit(f"nothing to ask about: no indexable files under {codebase}")
+        logger.info("📦 Indexed %d files (%d chunks) in %.1f s", index["files"], index["chunks"], index["seconds"])
+        cfg = configure(args, workdir, persist_dir, embedder)
+
+        stream = QueryStream(build_queries(subjects, args.seed))
+        for _, q in stream.take(args.warmup):
+            _one(q, persist_dir, args.cache, args.timeout)
+        results = [bench_level(c, stream.take(args.requests), persist_dir, args.cache, args.timeout)
+                   for c in args.concurrency]
+    finally:
+        if args.keep:
+            logger.info("Kept %s", workdir)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "benchmark": "orchestrator",
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare", "keep", "verbose")},
+            "llm_backend": cfg.llm_backend.standin,
+            "concurrency_limits": cfg.concurrency.model_dump(),
+        },
+        "index": index,
+        "results": results,
+        "max_rss_mb": round(max([max_rss_kb() / 1024] + [r["peak_rss_mb"] for r in results]), 1),
+    }
+    if args.compare:
+        with open(args.compare, "r", encoding="utf8") as fh:
+            report["comparison"] = compare(json.load(fh), report)
+    text = json.dumps(report, indent=2, default=str)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf8") as fh:
+            fh.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,8 @@ from ai_agents.db import ChatDB
 from tools.embedder import Embedder
 import ai_agents.architect_agent as architect_agent
 from ai_agents.architect_agent import run_agent_sync
-from concurrent.futures import ThreadPoolExecutor
 from ai_agents.sdk_tools import search_vector
 import json
-import time
 
 # Backwards-compatible rerun helper (some Streamlit versions lack experimental_rerun)
 def safe_rerun():
@@ -223,52 +221,53 @@ with center:
             st.session_state["pending_user_input"] = user_input
             st.session_state.setdefault("draft_messages", []).append(("user", user_input))
             try:
-                # Run orchestrator in background thread and show a progress bar + per-agent statuses
+                # Run orchestrator as a background job and show a progress bar + per-agent statuses
                 status_container = st.empty()
                 progress_bar = st.progress(0)
 
-                with ThreadPoolExecutor(max_workers=1) as ex:
-                    future = ex.submit(architect_agent.run_agent_sync, user_input, persist_dir)
-                    # poll structured status while task runs
-                    # prepare log expander once so it doesn't keep stacking
-                    log_expander = st.expander("Agent logs (live)", expanded=False)
-                    log_placeholder = log_expander.empty()
-                    while not future.done():
-                        status = architect_agent.get_status()
-                        # Support both legacy string and new dict status
-                        if isinstance(status, dict):
-                            phase = status.get("phase")
-                            agents = status.get("agents", [])
-                            # compute progress as fraction of agents done
-                            total = len(agents) if agents else 0
-                            done = sum(1 for a in agents if a.get("status") == "done")
-                            pct = int((done / total) * 100) if total else 0
-                            progress_bar.progress(min(max(pct, 0), 100))
-                            # render agent status list
-                            lines = [f"**Status:** {phase or 'Working...'}\n"]
-                            for a in agents:
-                                st_sym = "✅" if a.get("status") == "done" else ("🟢" if a.get("status") == "running" else "⚪️")
-                                lines.append(f"{st_sym} {a.get('name')}: {a.get('status')}")
-                            status_container.markdown("\n\n".join(lines))
-                            # Indicate that final answer is pending when agents are running
-                            if any(a.get("status") in ("pending", "running") for a in agents):
-                                status_container.info("Final answer: assembling — partial results may appear. This is not the final response.")
-                            # live logs in the right-hand area: show brief snippets
-                            logs = status.get("logs", [])
-                            if logs:
-                                rendered = []
-                                for l in logs[-10:]:
-                                    try:
-                                        log_text = l if isinstance(l, str) else json.dumps(l, ensure_ascii=False)
-                                    except Exception:
-                                        log_text = str(l)
-                                    rendered.append(f"<div style='font-family:monospace;background:#f8fafc;padding:6px;border-radius:6px;margin:4px 0'>{log_text}</div>")
-                                log_placeholder.markdown("\n".join(rendered), unsafe_allow_html=True)
-                        else:
-                            # legacy string
-                            status_container.info(str(status or "Agent working..."))
-                        time.sleep(0.25)
-                    res = future.result()
+                # each request runs as its own job; this session only ever sees its own progress
+                job = architect_agent.submit_agent_job(user_input, persist_dir)
+                # poll structured status while task runs
+                # prepare log expander once so it doesn't keep stacking
+                log_expander = st.expander("Agent logs (live)", expanded=False)
+                log_placeholder = log_expander.empty()
+                while not job.done:
+                    status = architect_agent.get_status(job.id)
+                    # Support both legacy string and new dict status
+                    if isinstance(status, dict):
+                        phase = status.get("phase")
+                        agents = status.get("agents", [])
+                        # compute progress as fraction of agents done
+                        total = len(agents) if agents else 0
+                        done = sum(1 for a in agents if a.get("status") == "done")
+                        pct = int((done / total) * 100) if total else 0
+                        progress_bar.progress(min(max(pct, 0), 100))
+                        # render agent status list
+                        lines = [f"**Status:** {phase or 'Working...'}\n"]
+                        for a in agents:
+                            st_sym = "✅" if a.get("status") == "done" else ("🟢" if a.get("status") == "running" else "⚪️")
+                            lines.append(f"{st_sym} {a.get('name')}: {a.get('status')}")
+                        status_container.markdown("\n\n".join(lines))
+                        # Indicate that final answer is pending when agents are running
+                        if any(a.get("status") in ("pending", "running") for a in agents):
+                            status_container.info("Final answer: assembling — partial results may appear. This is not the final response.")
+                        # live logs in the right-hand area: show brief snippets
+                        logs = status.get("logs", [])
+                        if logs:
+                            rendered = []
+                            for l in logs[-10:]:
+                                try:
+                                    log_text = l if isinstance(l, str) else json.dumps(l, ensure_ascii=False)
+                                except Exception:
+                                    log_text = str(l)
+                                rendered.append(f"<div style='font-family:monospace;background:#f8fafc;padding:6px;border-radius:6px;margin:4px 0'>{log_text}</div>")
+                            log_placeholder.markdown("\n".join(rendered), unsafe_allow_html=True)
+                    else:
+                        # legacy string
+                        status_container.info(str(status or "Agent working..."))
+                    # returns as soon as the job reports something new
+                    job.wait_events(status.get("seq", 0) if isinstance(status, dict) else 0, timeout=0.25)
+                res = job.result()
 
                 response_text = res.get("response", "")
                 progress_bar.progress(100)
@@ -1,30 +1,31 @@
 # main.py
 import os
-import yaml
+import itertools
 import streamlit as st
 import logging
 from datetime import datetime
 from dotenv import load_dotenv
 
 # your project modules (must exist as in your repo)
+from ai_agents.config import get_config
 from ai_agents.db import ChatDB
-from tools.embedder import Embedder
-from ai_agents.architect_agent import run_agent_sync  # agent must NOT write to DB
+from tools.code_analyzer import analyze_folder
+from tools.symbol_index import reset_symbol_index
+from ai_agents.architect_agent import run_agent_stream  # agent must NOT write to DB
 from logger import setup_logging
 
 load_dotenv()
 logger = setup_logging()  # your logger setup
 logger.info("Starting Agentic Architect AI (Streamlit UI)")
 
-# --- LOAD CONFIG (keep your original approach) ---
-with open("config.yaml", "r") as fh:
-    CONFIG = yaml.safe_load(fh)
+# --- LOAD CONFIG (cached; re-parsed only when config.yaml changes, not on every rerun) ---
+CONFIG = get_config()
 
 # Ensure directories from config exist (use same keys as your config.yaml)
-persist_dir = CONFIG["app"].get("persist_dir", "chroma_db")
-metadata_dir = CONFIG["app"].get("metadata_dir", "metadata")
-sample_codebase_dir = CONFIG["app"].get("sample_codebase_dir", "./sample_codebase")
-db_path = CONFIG["app"].get("db_path", "data/chats.db")
+persist_dir = CONFIG.app.persist_dir
+metadata_dir = CONFIG.app.metadata_dir
+sample_codebase_dir = CONFIG.app.sample_codebase_dir
+db_path = CONFIG.app.db_path
 
 os.makedirs(persist_dir, exist_ok=True)
 os.makedirs(metadata_dir, exist_ok=True)
@@ -34,10 +35,10 @@ os.makedirs(os.path.dirname(db_path), exist_ok=True)
 chat_db = ChatDB(db_path)
 
 # --- Streamlit page config ---
-st.set_page_config(page_title=CONFIG["ui"].get("title", "Agentic Architect AI"), layout="wide")
-st.title(CONFIG["ui"].get("title", "Agentic Architect AI"))
-if CONFIG["ui"].get("description"):
-    st.write(CONFIG["ui"].get("description"))
+st.set_page_config(page_title=CONFIG.ui.title, layout="wide")
+st.title(CONFIG.ui.title)
+if CONFIG.ui.description:
+    st.write(CONFIG.ui.description)
 
 # --- Sidebar settings (repo path, persist_dir) ---
 with st.sidebar:
@@ -51,9 +52,16 @@ with st.sidebar:
 if rebuild_index or not os.listdir(persist_dir):
     st.info("Indexing repository — this may take a while (SentenceTransformers loads first time).")
     try:
-        embedder = Embedder(model_name=CONFIG["app"].get("embed_model", "all-MiniLM-L6-v2"),
-                            persist_dir=persist_dir)
+        # sentence-transformers / torch load only when an index has to be built
+        from tools.embedder import Embedder
+        embedder = Embedder(model_name=CONFIG.app.embed_model,
+                            persist_dir=persist_dir,
+                            chunk_size=CONFIG.app.chunk_size,
+                            chunk_overlap=CONFIG.app.chunk_overlap)
         embedder.embed_codebase(repo_path)
+        # per-file metadata feeds the symbol index used for exact symbol lookups
+        analyze_folder(repo_path, metadata_dir)
+        reset_symbol_index(metadata_dir)
         st.success("Vector index created/updated.")
         logger.info("Vector index built at %s", persist_dir)
     except Exception as e:
@@ -154,23 +162,34 @@ with center:
             except Exception:
                 logger.debug("messages table not available or add_message missing, continuing")
 
-            # Call agent (agent should not write DB itself)
-            with st.spinner("Agent is analyzing (may call Gemini + RAG)..."):
-                try:
-                    agent_result = run_agent_sync(user_input, persist_dir=persist_dir)
-                    # agent_result expected to be a dict or string — standardize
-                    if isinstance(agent_result, dict):
-                        agent_resp = agent_result.get("response") or agent_result.get("agent_response") or str(agent_result)
-                        agent_name = agent_result.get("agent") or "ArchitectAgent"
-                        chat_id_returned = agent_result.get("chat_id", None)
-                    else:
-                        agent_resp = str(agent_result)
-                        agent_name = "ArchitectAgent"
-                        chat_id_returned = None
-                except Exception as e:
-                    agent_resp = f"Agent error: {e}"
-                    agent_name = "ArchitectAgent"
-                    logger.exception("Agent call failed")
+            # Call agent (agent should not write DB itself); render sources, then tokens as they stream
+            sources_box = st.empty()
+            answer_box = st.empty()
+            agent_resp, agent_name, chat_id_returned = "", "ArchitectAgent", None
+            try:
+                streamed = ""
+                events = run_agent_stream(user_input, persist_dir=persist_dir)
+                # the spinner covers intent + retrieval, until the sources event arrives
+                with st.spinner("Agent is analyzing (may call Gemini + RAG)..."):
+                    first = next(events, None)
+                for event in itertools.chain([first] if first else [], events):
+                    if event["type"] == "sources":
+                        sources_box.caption(f"{event['agent']} · sources: " + (", ".join(event["sources"]) or "none"))
+                    elif event["type"] == "token":
+                        streamed += event["text"]
+                        answer_box.markdown(streamed + "▌")
+                    elif event["type"] == "done":
+                        agent_resp = event.get("response") or streamed
+                        agent_name = event.get("agent") or "ArchitectAgent"
+                        chat_id_returned = event.get("chat_id")
+                        t = event.get("timings") or {}
+                        logger.info("⏱️ UI request: first token %s ms, total %s ms, cached %s",
+                                    t.get("first_token"), t.get("total"), event.get("cached"))
+                answer_box.empty()
+            except Exception as e:
+                agent_resp = f"Agent error: {e}"
+                agent_name = "ArchitectAgent"
+                logger.exception("Agent call failed")
 
             # Save agent response in messages table and update chats summary
             try:
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+
+from ai_agents import sdk_tools
+from tools import retrieval_executor
+from tools.doc_store import RetrievalHit
+
+
+class FakeStore:
+    def __init__(self):
+        self.calls = []
+
+    def search(self, query_texts, n_results=5, mode="similarity", lambda_mult=0.5):
+        self.calls.append(list(query_texts))
+        return [[RetrievalHit(f"{q}-{i}", 1.0 - i / 10, {"source": f"{q}.py"}, _text=f"doc about {q} #{i}")
+                 for i in range(n_results)] for q in query_texts]
+
+
+def test_batch_search_uses_one_store_call(monkeypatch):
+    store = FakeStore()
+    monkeypatch.setattr(sdk_tools, "get_vector_store", lambda persist_dir, nprobe=8: store)
+
+    results = asyncio.run(sdk_tools.asearch_vector_batch(["cart", "payment"], top_k=2))
+    assert store.calls == [["cart", "payment"]]
+    assert [r[1]["ids"] for r in results] == [["cart-0", "cart-1"], ["payment-0", "payment-1"]]
+    assert results[1][1]["scores"] == [1.0, 0.9]
+
+    ctx, docs = asyncio.run(sdk_tools.asearch_vector("email", top_k=1))
+    assert ctx == "doc about email #0"
+
+
+def test_cancelled_search_never_runs_when_pool_is_busy(monkeypatch):
+    monkeypatch.setattr(retrieval_executor, "_EXECUTOR", None)
+    retrieval_executor.get_retrieval_executor(max_workers=1)
+    release = threading.Event()
+    ran = []
+
+    def blocking(tag):
+        if tag == "first":
+            release.wait(5)
+        ran.append(tag)
+        return tag
+
+    async def scenario():
+        first = asyncio.ensure_future(retrieval_executor.run_retrieval(blocking, "first"))
+        queued = asyncio.ensure_future(retrieval_executor.run_retrieval(blocking, "queued"))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        await asyncio.sleep(0.05)  # let the cancellation reach the pool future
+        release.set()
+        assert await first == "first"
+        try:
+            await queued
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    try:
+        assert asyncio.run(scenario())
+        time.sleep(0.05)
+        assert ran == ["first"]
+    finally:
+        retrieval_executor.get_retrieval_executor().shutdown(wait=True)
+        retrieval_executor._EXECUTOR = None
@@ -0,0 +1,36 @@
+import os
+
+from ai_agents.config import ConfigStore, Settings
+
+
+def _write(path, text, mtime):
+    path.write_text(text)
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_typed_defaults_and_helpers():
+    cfg = Settings.model_validate({"llm_mapping": {"default": "m-default", "impact_agent": "m-impact"},
+                                   "compression": {"default": {"enabled": True, "outline_after": 3},
+                                                   "doc_agent": {"outline_after": None}},
+                                   "logging": {"level": "INFO"}})
+    assert cfg.model_for("impact_agent") == "m-impact" and cfg.model_for("doc_agent") == "m-default"
+    assert cfg.context_budget("anything") == 12000 and cfg.retrieval.rerank.candidates == 30
+    assert cfg.compression_for("doc_agent") == {"enabled": True, "outline_after": None}
+    assert cfg.logging == {"level": "INFO"}  # unknown sections are kept
+
+
+def test_reload_on_mtime_change_notifies_subscribers_and_survives_bad_files(tmp_path):
+    path = tmp_path / "config.yaml"
+    _write(path, "concurrency:\n  llm: 4\n", 1_000_000_000)
+    store = ConfigStore(str(path), check_interval=0)
+    seen = []
+    store.subscribe(lambda old, new: seen.append((old.concurrency.llm, new.concurrency.llm)))
+
+    first = store.get()
+    assert first.concurrency.llm == 4 and store.get() is first  # unchanged file: same object
+
+    _write(path, "concurrency:\n  llm: 9\n", 2_000_000_000)
+    assert store.get().concurrency.llm == 9 and seen == [(4, 9)]
+
+    _write(path, "concurrency:\n  llm: [not, a, number]\n", 3_000_000_000)
+    assert store.get().concurrency.llm == 9 and seen == [(4, 9)]
@@ -0,0 +1,44 @@
+from ai_agents.context_assembler import (
+    ContextPiece, NO_CONTEXT, _fair_shares, assemble_context, count_tokens, truncate_to_tokens,
+)
+
+
+def _lines(prefix, n):
+    return "".join(f"{prefix} line {i} with some code tokens\n" for i in range(n))
+
+
+def test_fair_shares_redistribute_surplus():
+    shares = _fair_shares({"small": 10, "big1": 500, "big2": 500}, 300)
+    assert shares["small"] == 10
+    assert shares["big1"] == shares["big2"] == 145
+
+
+def test_duplicates_are_dropped_and_reported():
+    text = _lines("a", 3)
+    res = assemble_context([ContextPiece("a.py", text, "Source: a.py"),
+                            ContextPiece("copy/a.py", text, "Source: copy/a.py")], 10_000)
+    assert len(res.included) == 1
+    assert res.dropped == [{"source": "copy/a.py", "reason": "duplicate", "tokens": count_tokens(text)}]
+
+
+def test_budget_is_respected_and_split_across_sources():
+    pieces = [ContextPiece("big.py", _lines("big", 400), "Source: big.py"),
+              ContextPiece("big.py", _lines("big2", 400), "Source: big.py"),
+              ContextPiece("other.py", _lines("other", 400), "Source: other.py")]
+    res = assemble_context(pieces, 1000)
+    assert res.used_tokens <= 1000
+    sources = {i["source"] for i in res.included}
+    assert sources == {"big.py", "other.py"}
+    reasons = sorted(d["reason"] for d in res.dropped)
+    assert "budget" in reasons and "truncated" in reasons
+    # truncation happens on whole lines
+    assert all(line.endswith("tokens") or line.startswith("Source") or line == "---" or not line
+               for line in res.text.splitlines())
+
+
+def test_truncate_to_tokens_keeps_whole_lines_and_empty_context_message():
+    text = _lines("x", 50)
+    cut = truncate_to_tokens(text, 40)
+    assert text.startswith(cut) and cut.endswith("\n")
+    assert count_tokens(cut) <= 40
+    assert assemble_context([], 100).text == NO_CONTEXT
@@ -0,0 +1,110 @@
+from ai_agents.context_assembler import ContextPiece
+from tools.context_compressor import compress_pieces, compress_text
+
+PY_CHUNK = '''# Copyright (c) 2024 Example Corp
+# Licensed under the MIT License
+
+import os
+from typing import (
+    Dict,
+    List,
+)
+
+
+# helper comment that the model doesn't need
+def load(path: str) -> Dict:
+    """Load a config file."""
+    with open(path) as f:   
+        return {"raw": f.read()}
+
+
+
+class Store:
+    """Keeps things."""
+
+    def get(self, key):
+        return key
+'''
+
+JS_CHUNK = '''/*
+ * Copyright 2024 Example
+ */
+import { a,
+  b } from "./x";
+const fs = require("fs");
+
+/** Adds two numbers. */
+function add(x, y) {
+  // inline note
+  return x + y;
+}
+'''
+
+
+def test_strip_keeps_code_and_docstrings_only():
+    out, outlined = compress_text(PY_CHUNK, "svc/config.py")
+    assert not outlined
+    assert "Copyright" not in out and "import" not in out and "helper comment" not in out
+    assert '"""Load a config file."""' in out and "return key" in out
+    assert "\n\n\n" not in out and not any(line != line.rstrip() for line in out.splitlines())
+
+    js, _ = compress_text(JS_CHUNK, "web/math.js")
+    assert "Copyright" not in js and "require" not in js and "inline note" not in js
+    assert js.startswith("/** Adds two numbers. */") and "return x + y;" in js
+
+
+def test_low_ranked_pieces_are_outlined_and_stats_measured():
+    pieces = [ContextPiece("a.py", PY_CHUNK, "Source: a.py"),
+              ContextPiece("b.py", PY_CHUNK, "Source: b.py"),
+              ContextPiece("notes.md", "Some   notes\n\n\n\nmore", "Source: notes.md")]
+    out, stats = compress_pieces(pieces, {"enabled": True, "outline_after": 1})
+    assert "return key" in out[0].text
+    assert "def load(path: str) -> Dict:" in out[1].text and "f.read()" not in out[1].text
+    assert out[2].text == "Some   notes\n\nmore"
+    assert pieces[0].text == PY_CHUNK  # inputs are left untouched
+    assert stats.pieces == 3 and stats.outlined == 1 and stats.ratio < 0.8
+
+    same, off = compress_pieces(pieces, {"enabled": False})
+    assert [p.text for p in same] == [p.text for p in pieces] and off.ratio == 1.0
+
+
+def test_hash_lines_inside_python_strings_are_kept():
+    chunk = '''def usage():
+    """Usage:
+    # run with --fast
+    """
+    # real comment
+    return """
+# Title
+body"""
+'''
+    out, _ = compress_text(chunk, "cli.py")
+    assert "# run with --fast" in out and "# Title" in out
+    assert "real comment" not in out
+
+    # a chunk cut mid-docstring can't be tokenized, so it is kept verbatim
+    partial = '    # inside a docstring\n    more text\n    """\n    return 1\n'
+    out, _ = compress_text(partial, "cli.py")
+    assert "# inside a docstring" in out
+
+
+def test_import_lines_inside_python_docstrings_are_kept():
+    chunk = '''"""Example:
+
+from foo import bar
+import os
+"""
+import sys
+from typing import (
+    List,
+)
+import json; print(json)
+
+
+def main():
+    return sys.argv
+'''
+    out, _ = compress_text(chunk, "example.py")
+    assert "from foo import bar\nimport os" in out
+    assert "import sys" not in out and "List," not in out
+    assert "import json; print(json)" in out and "return sys.argv" in out
@@ -0,0 +1,40 @@
+import os
+
+from ai_agents import doc_generator_agent
+from ai_agents.doc_generator_agent import DocGeneratorAgent
+
+
+def _agent(monkeypatch, tmp_path, chunks, fail=False):
+    def fake_stream(model, prompt):
+        yield from chunks
+        if fail:
+            raise RuntimeError("upstream reset")
+
+    monkeypatch.setattr(doc_generator_agent, "get_model", lambda name: object())
+    monkeypatch.setattr(doc_generator_agent, "stream_text", fake_stream)
+    return DocGeneratorAgent(output_dir=str(tmp_path))
+
+
+def test_streamed_doc_is_saved_on_success(monkeypatch, tmp_path):
+    agent = _agent(monkeypatch, tmp_path, ["## Overview\n", "body"])
+    out = agent.finalize("".join(agent.stream("document it", "ctx")))
+
+    (saved,) = os.listdir(tmp_path)
+    assert saved.endswith(".md")
+    assert (tmp_path / saved).read_text(encoding="utf-8") == "# Generated Documentation\n\n## Overview\nbody"
+    assert out.startswith("Documentation generated successfully")
+
+
+def test_failed_stream_writes_no_doc(monkeypatch, tmp_path):
+    agent = _agent(monkeypatch, tmp_path, ["## Overview\n"], fail=True)
+    text = "".join(agent.stream("document it", "ctx"))
+    out = agent.finalize(text)
+
+    assert "Documentation generation failed: upstream reset" in text
+    assert out == text
+    assert os.listdir(tmp_path) == []
+
+    # the failure flag does not leak into the next request
+    monkeypatch.setattr(doc_generator_agent, "stream_text", lambda model, prompt: iter(["ok"]))
+    agent.finalize("".join(agent.stream("document it", "ctx")))
+    assert len(os.listdir(tmp_path)) == 1
@@ -0,0 +1,31 @@
+from tools.doc_store import DocStore, RetrievalHit, materialize
+
+
+def test_offsets_are_read_back_lazily_and_stale_spans_are_not_served(tmp_path):
+    src = tmp_path / "svc.py"
+    content = "".join(f"value_{i} = {i}\n" for i in range(100))
+    src.write_text(content)
+    store = DocStore(str(tmp_path / "docs.sqlite"))
+    ids = ["svc::0", "svc::1", "gone::0"]
+    docs = [content[0:120], content[120:300], "text of a file that no longer exists"]
+    metas = [{"source": str(src), "start_byte": 0, "end_byte": 120},
+             {"source": str(src), "start_byte": 120, "end_byte": 300},
+             {"source": str(tmp_path / "gone.py"), "start_byte": 0, "end_byte": 35}]
+    assert store.put_many(ids, docs, metas) == 1  # only the unreadable file needed a blob
+
+    calls = []
+
+    def loader(wanted):
+        calls.append(list(wanted))
+        return store.get_many(wanted)
+
+    hits = [RetrievalHit(i, 1.0, m, _loader=loader) for i, m in zip(ids, metas)]
+    assert not any(h.loaded for h in hits) and hits[1].source == str(src) and hits[1].start == 120
+    materialize(hits[:2])
+    assert calls == [["svc::0", "svc::1"]]
+    assert [h.text for h in hits[:2]] == docs[:2] and not hits[2].loaded
+    assert hits[2].text == docs[2]
+
+    src.write_text(content.replace("value_3 ", "VALUE_3 "))
+    assert store.get_many(["svc::0", "svc::1"]) == {"svc::0": "", "svc::1": docs[1]}
+    assert store.get_many(["unknown"]) == {}
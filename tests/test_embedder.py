@@ -0,0 +1,25 @@
+import numpy as np
+
+from tools.embedder import Embedder
+
+
+class _FixedModel:
+    def encode(self, texts, show_progress_bar=False):
+        return np.stack([np.full(8, len(t) % 7 + 1, dtype=np.float32) for t in texts])
+
+
+def test_chunks_are_added_in_batches_below_chromas_limit(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    src.mkdir()
+    for i in range(3):
+        (src / f"mod{i}.py").write_text("".join(f"value_{i}_{j} = {j}\n" for j in range(200)))
+    embedder = Embedder(persist_dir=str(tmp_path / "db"), model=_FixedModel(), chunk_size=300, chunk_overlap=0)
+    assert embedder.vs.max_batch_size() > 0
+    monkeypatch.setattr(embedder.vs, "max_batch_size", lambda: 10)
+    sizes = []
+    add = embedder.vs.add_documents
+    monkeypatch.setattr(embedder.vs, "add_documents", lambda **kw: (sizes.append(len(kw["ids"])), add(**kw)))
+
+    embedder.embed_codebase(str(src), ["*.py"])
+    assert max(sizes) == 10 and len(sizes) > 3
+    assert embedder.vs.collection.count() == sum(sizes)
@@ -0,0 +1,27 @@
+import numpy as np
+
+from tools.embedding_cache import QueryEmbeddingCache
+
+
+def test_repeated_queries_hit_and_memory_cap_evicts_oldest():
+    calls = []
+
+    def embed(texts):
+        calls.append(list(texts))
+        return [np.full(4, len(t), dtype=np.float32) for t in texts]
+
+    cache = QueryEmbeddingCache(max_bytes=3 * 16)  # three 4-float vectors
+    first = cache.embed("m", ["where is checkout", "payment flow", "where is checkout"], embed)
+    assert calls == [["where is checkout", "payment flow"]]
+    assert first[0] is first[2]
+    assert cache.stats == {"hits": 0, "misses": 3, "evictions": 0}
+
+    again = cache.embed("m", ["  where is   checkout ", "payment flow"], embed)
+    assert len(calls) == 1 and again[0] is first[0]
+    assert cache.stats["hits"] == 2
+
+    cache.embed("other-model", ["payment flow"], embed)  # keyed per model
+    cache.embed("m", ["cart service"], embed)
+    assert cache.stats["evictions"] == 1 and len(cache) == 3 and cache.nbytes <= 48
+    cache.embed("m", ["where is checkout"], embed)  # least recently used one was evicted
+    assert calls[-1] == ["where is checkout"]
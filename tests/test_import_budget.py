@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the project modules main.py imports at startup (Streamlit itself excluded)
+ENTRY_MODULES = ["ai_agents.db", "tools.code_analyzer", "tools.symbol_index", "ai_agents.architect_agent"]
+# cold import was ~2 s before agents, Gemini and Chroma became lazy; ~0.3 s after
+BUDGET_S = 1.0
+HEAVY = ["chromadb", "google.generativeai", "sentence_transformers", "torch"]
+
+SCRIPT = f"""
+import importlib, sys, time
+t0 = time.perf_counter()
+for name in {ENTRY_MODULES!r}:
+    importlib.import_module(name)
+print("elapsed", time.perf_counter() - t0)
+print("heavy", *[m for m in {HEAVY!r} if m in sys.modules])
+"""
+
+
+def test_entry_modules_import_within_budget_without_heavy_sdks():
+    out = subprocess.run([sys.executable, "-c", SCRIPT], cwd=ROOT, capture_output=True, text=True, check=True)
+    report = {line.split()[0]: line.split()[1:] for line in out.stdout.splitlines() if line.strip()}
+    assert report["heavy"] == [], f"heavy modules imported at startup: {report['heavy']}"
+    elapsed = float(report["elapsed"][0])
+    assert elapsed < BUDGET_S, f"cold import took {elapsed:.2f}s (budget {BUDGET_S}s)"
@@ -0,0 +1,61 @@
+import asyncio
+
+import numpy as np
+
+from ai_agents import architect_agent
+from ai_agents.registry import get_agent
+from ai_agents.intent_classifier import IntentClassifier, load_examples
+
+VOCAB = ["impact", "affected", "design", "architecture", "document", "readme", "explain", "how", "hello"]
+
+
+def _bag_of_words(texts):
+    out = []
+    for t in texts:
+        words = t.lower().replace("?", " ").split()
+        v = np.array([sum(w.startswith(k) for w in words) for k in VOCAB], dtype=np.float32) + 0.01
+        out.append(v)
+    return out
+
+
+def test_nearest_centroid_labels_and_confidence():
+    examples = {
+        "impact": ["what is the impact of x", "which services are affected by y"],
+        "blueprint": ["design a solution for z", "architecture for w"],
+        "documentation": ["document the api", "write a readme"],
+        "understanding": ["explain the flow", "how does it work"],
+    }
+    clf = IntentClassifier(_bag_of_words, examples)
+    label, confidence = clf.classify("Which modules are affected, what is the impact?")
+    assert label == "impact" and confidence > 0.9
+    assert abs(sum(clf.scores("anything").values()) - 1.0) < 1e-6
+    # a query sharing nothing with the examples is spread evenly -> low confidence
+    assert clf.classify("zzz")[1] < 0.5
+
+
+def test_shipped_examples_cover_every_intent():
+    assert set(load_examples()) == {"impact", "blueprint", "documentation", "understanding", "generic"}
+
+
+def test_low_confidence_escalates_to_llm(monkeypatch):
+    class Unsure:
+        def classify(self, query):
+            return "impact", 0.3
+
+    class Sure:
+        def classify(self, query):
+            return "blueprint", 0.95
+
+    llm_calls = []
+
+    async def llm_intent(query):
+        llm_calls.append(query)
+        return {"intent": "documentation"}
+
+    monkeypatch.setattr(get_agent("requirements"), "aget_intent", llm_intent)
+    monkeypatch.setattr(architect_agent, "_intent_classifier", lambda persist_dir: Unsure())
+    detect = lambda q: asyncio.run(architect_agent._detect_intent(q, "chroma_db"))
+    assert detect("hmm") == {"intent": "documentation", "source": "llm"}
+    monkeypatch.setattr(architect_agent, "_intent_classifier", lambda persist_dir: Sure())
+    assert detect("design it")["source"] == "local"
+    assert llm_calls == ["hmm"]
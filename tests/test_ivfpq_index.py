@@ -0,0 +1,126 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from tools.ivfpq_index import IVFPQIndex
+
+
+def _data(n=3000, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, dim)).astype(np.float32)
+    return centers[rng.integers(0, 20, n)] + 0.1 * rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def test_search_finds_exact_neighbour_and_nprobe_helps():
+    x = _data()
+    idx = IVFPQIndex(32, nlist=16, m=8)
+    idx.train(x[:2000], iters=8)
+    idx.add([f"v{i}" for i in range(len(x))], x)
+    assert idx.ntotal == len(x)
+    assert idx.memory_bytes() < x.nbytes
+
+    found = {}
+    for nprobe in (1, 16):
+        ids, dists = idx.search(x[:40], k=5, nprobe=nprobe)
+        found[nprobe] = sum(f"v{i}" in ids[i] for i in range(40))
+        assert np.all(np.diff(dists, axis=1) >= 0)
+    assert found[16] >= found[1]
+    assert found[16] >= 36
+
+
+def test_save_load_roundtrip_and_incremental_add(tmp_path):
+    x = _data(n=1500, dim=16, seed=1)
+    idx = IVFPQIndex(16, nlist=8, m=4)
+    idx.train(x, iters=5)
+    idx.add([f"a{i}" for i in range(1000)], x[:1000])
+    idx.add([f"b{i}" for i in range(500)], x[1000:])
+    path = str(tmp_path / "index.npz")
+    idx.save(path)
+
+    loaded = IVFPQIndex.load(path)
+    assert loaded.ntotal == 1500
+    q = x[1200]
+    assert loaded.search(q, k=3, nprobe=8)[0] == idx.search(q, k=3, nprobe=8)[0]
+    assert "b200" in loaded.search(q, k=3, nprobe=8)[0][0]
+
+
+def test_small_adds_are_merged_and_saved_once(tmp_path, monkeypatch):
+    x = _data(n=1200, dim=16, seed=2)
+    idx = IVFPQIndex(16, nlist=8, m=4)
+    idx.train(x, iters=5)
+    merges = []
+    merge = idx.add_encoded
+    monkeypatch.setattr(idx, "add_encoded", lambda *a: (merges.append(len(a[0])), merge(*a)))
+    for s in range(0, 1200, 100):
+        idx.add([f"v{i}" for i in range(s, s + 100)], x[s:s + 100])
+    assert merges == [] and idx.ntotal == 1200
+    assert "v700" in idx.search(x[700], k=3, nprobe=8)[0][0]
+    assert merges == [1200]
+
+
+def test_re_added_ids_replace_their_entries():
+    x = _data(n=600, dim=16, seed=5)
+    idx = IVFPQIndex(16, nlist=8, m=4)
+    idx.train(x, iters=5)
+    idx.add(["a", "b"], x[:2])
+    idx.add(["a", "b"], x[:2])
+    assert sorted(idx.search(x[0], k=4, nprobe=8)[0][0]) == ["a", "b"]
+    assert idx.ntotal == 2
+
+    # the latest vector for an id wins, within one batch and across merges
+    idx.add(["c", "c"], x[[10, 300]])
+    idx.flush()
+    idx.add(["a"], x[[300]])
+    assert idx.ntotal == 3 + 1
+    assert set(idx.search(x[300], k=2, nprobe=8)[0][0]) == {"a", "c"}
+    assert idx.ntotal == 3
+
+
+def test_search_sees_a_consistent_layout_while_merging():
+    x = _data(n=2000, dim=16, seed=6)
+    idx = IVFPQIndex(16, nlist=8, m=4)
+    idx.train(x[:600], iters=5)
+    idx.add([f"v{i}" for i in range(200)], x[:200])
+    errors, stop = [], threading.Event()
+
+    def searcher():
+        while not stop.is_set():
+            try:
+                idx.search(x[:4], k=5, nprobe=8)
+            except Exception as e:
+                errors.append(e)
+                return
+
+    threads = [threading.Thread(target=searcher) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for s in range(200, 2000, 50):
+        idx.add_encoded([f"v{i}" for i in range(s, s + 50)], *idx.encode(x[s:s + 50]))
+    stop.set()
+    for t in threads:
+        t.join()
+    assert errors == [] and idx.ntotal == 2000
+
+
+def test_vector_store_defers_the_index_file_and_rejects_tiny_collections(tmp_path):
+    from tools.vector_store import VectorStore
+
+    vs = VectorStore(persist_directory=str(tmp_path / "db"))
+    x = _data(n=100, dim=16, seed=3)
+    vs.add_documents([f"d{i}" for i in range(100)], [f"doc {i}" for i in range(100)],
+                     [{"source": "mem"} for _ in range(100)], x.tolist())
+    with pytest.raises(ValueError, match="at least 256 vectors"):
+        vs.build_ivfpq_index()
+
+    more = _data(n=400, dim=16, seed=4)
+    vs.add_documents([f"e{i}" for i in range(400)], [f"doc {i}" for i in range(400)],
+                     [{"source": "mem"} for _ in range(400)], more.tolist())
+    vs.build_ivfpq_index(m=4)
+    path = vs._ivfpq_path()
+    before = os.stat(path).st_mtime_ns
+    vs.add_documents(["f0"], ["late doc"], [{"source": "mem"}], more[:1].tolist(), save_index=False)
+    assert os.stat(path).st_mtime_ns == before and vs.ivfpq.ntotal == 501
+    vs.persist()
+    assert IVFPQIndex.load(path).ntotal == 501
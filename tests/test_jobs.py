@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+from ai_agents.jobs import JobRegistry, current_job
+
+
+def _report(tag, steps):
+    job = current_job()
+    job.set_phase(f"{tag} running")
+    for i in range(steps):
+        job.set_agent(f"{tag}-agent", "running")
+        job.log({"tag": tag, "step": i})
+        time.sleep(0.001)
+    job.set_agent(f"{tag}-agent", "done")
+    return tag
+
+
+def test_concurrent_jobs_keep_their_own_progress():
+    registry = JobRegistry(workers=4, max_events=20)
+    jobs = [registry.submit(_report, f"user{i}", 50, query=f"q{i}") for i in range(4)]
+    assert [j.result(5) for j in jobs] == [f"user{i}" for i in range(4)]
+
+    for i, job in enumerate(jobs):
+        snap = job.snapshot()
+        assert snap["state"] == "done" and snap["phase"] == f"user{i} running"
+        assert snap["agents"] == [{"name": f"user{i}-agent", "status": "done"}]
+        # bounded ring buffer, and only this job's events
+        assert len(job.events()) == 20
+        assert all(p.get("tag", f"user{i}") == f"user{i}" for p in snap["logs"])
+        assert registry.get(job.id) is job
+    registry.shutdown()
+
+
+def test_wait_events_wakes_on_new_events_and_failures_are_recorded():
+    registry = JobRegistry(workers=1)
+    gate = threading.Event()
+
+    def work():
+        current_job().log("started")
+        gate.wait(5)
+        raise RuntimeError("agent blew up")
+
+    job = registry.submit(work)
+    first = job.wait_events(0, timeout=5)
+    assert [p for _, _, p in first] == ["started"]
+    gate.set()
+    with pytest.raises(RuntimeError):
+        job.result(5)
+    assert job.state == "error" and job.done
+    assert job.events(first[-1][0])[-1][2] == {"state": "error"}
+    registry.shutdown()
+
+
+def test_finished_jobs_expire_after_ttl():
+    registry = JobRegistry(workers=1, ttl_s=0.05)
+    job = registry.submit(lambda: 1)
+    job.result(5)
+    assert registry.get(job.id) is job
+    time.sleep(0.1)
+    running = registry.submit(time.sleep, 0.2)
+    # expired jobs are swept as new ones arrive; running jobs are kept
+    assert registry.get(job.id) is None
+    assert registry.sweep() == 0 and registry.get(running.id) is running
+    registry.shutdown()
+
+
+def test_agent_status_changes_are_logged_once():
+    registry = JobRegistry(workers=1)
+
+    def work():
+        job = current_job()
+        job.set_agent("impact", "running")
+        job.set_agent("impact", "error", "quota exceeded")
+        return "ok"
+
+    job = registry.submit(work)
+    assert job.result(5) == "ok"
+    agent_events = [p for p in job.snapshot()["logs"] if "agent" in p]
+    assert agent_events == [{"agent": "impact", "status": "running"},
+                            {"agent": "impact", "status": "error", "output": "quota exceeded"}]
+    registry.shutdown()
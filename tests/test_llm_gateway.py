@@ -0,0 +1,176 @@
+import asyncio
+import threading
+import time
+
+from ai_agents import llm, runtime
+from ai_agents.llm_backends import LLMBackend
+
+
+class _Resp:
+    def __init__(self, text):
+        self.text = text
+
+
+class _SlowModel:
+    model_name = "models/gateway-test"
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def _exit(self):
+        with self._lock:
+            self.active -= 1
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        self._enter()
+        time.sleep(self.delay)
+        self._exit()
+        return _Resp(prompt.upper())
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        self._enter()
+        await asyncio.sleep(self.delay)
+        self._exit()
+        return _Resp(prompt.upper())
+
+
+def _limit_models(monkeypatch, n):
+    monkeypatch.setattr(runtime.get_config().concurrency, "models", {"default": n})
+    monkeypatch.setattr(runtime, "_SHARED_LIMITS", {})
+
+
+def test_model_handles_are_shared_per_model_name(monkeypatch):
+    built = []
+
+    class _Backend(LLMBackend):
+        def model(self, name):
+            built.append(name)
+            return object()
+
+    monkeypatch.setattr(llm, "_BACKEND", _Backend())
+    monkeypatch.setattr(llm, "_MODELS", {})
+
+    assert llm.model_handle("gemini-x") is llm.model_handle("gemini-x")
+    assert llm.model_handle("gemini-y") is not llm.model_handle("gemini-x")
+    assert built == ["gemini-x", "gemini-y"]
+
+
+def test_per_model_limit_bounds_sync_and_async_callers(monkeypatch):
+    _limit_models(monkeypatch, 2)
+    model = _SlowModel()
+    threads = [threading.Thread(target=llm.generate, args=(model, f"q{i}"), kwargs={"cache": False})
+               for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert model.peak == 2
+
+    model = _SlowModel()
+
+    async def main():
+        await asyncio.gather(*(llm.agenerate(model, f"q{i}", cache=False) for i in range(8)))
+
+    asyncio.run(main())
+    assert model.peak == 2
+
+
+def test_per_model_limit_is_shared_by_sync_and_async_callers(monkeypatch):
+    _limit_models(monkeypatch, 3)
+    model = _SlowModel(delay=0.05)
+
+    async def many_async():
+        await asyncio.gather(*(llm.agenerate(model, f"a{i}", cache=False) for i in range(6)))
+
+    threads = [threading.Thread(target=llm.generate, args=(model, f"s{i}"), kwargs={"cache": False})
+               for i in range(6)]
+    threads.append(threading.Thread(target=asyncio.run, args=(many_async(),)))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert model.peak == 3
+    assert runtime.shared_limit("model:gateway-test").in_use == 0
+
+
+def test_cancelled_async_waiters_give_their_slot_back():
+    slots = runtime.SharedLimit(1)
+
+    async def main():
+        await slots.aacquire()
+        waiter = asyncio.ensure_future(slots.aacquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        slots.release()
+        await asyncio.sleep(0.01)
+        assert slots.in_use == 0
+        async with slots:
+            assert slots.in_use == 1
+
+    asyncio.run(main())
+    assert slots.in_use == 0
+
+
+def test_gateway_overhead_outside_the_round_trip_is_small(monkeypatch):
+    _limit_models(monkeypatch, 4)
+    llm.reset_gateway_stats()
+    model = _SlowModel(delay=0.001)
+    for i in range(50):
+        assert llm.generate(model, f"q{i}", cache=False) == f"Q{i}"
+
+    stats = llm.gateway_stats()["gateway-test"]
+    assert stats["calls"] == 50
+    assert stats["upstream_ms"] >= 1.0
+    # params merge, slot bookkeeping and stats; the network call itself is excluded
+    assert stats["overhead_us"] < 500
+
+
+def test_identical_deterministic_streams_share_one_upstream_call(monkeypatch):
+    _limit_models(monkeypatch, 4)
+    model = _SlowModel()
+    opened = []
+
+    def chunks():
+        for text in "abc":
+            time.sleep(0.05)
+            yield _Resp(text)
+
+    def stream(prompt, generation_config=None, stream=False):
+        opened.append(prompt)
+        return chunks()
+
+    model.generate_content = stream
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        "".join(llm.stream_text(model, "same", params={"temperature": 0}, cache=False)))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["abc"] * 4
+    assert opened == ["same"]
+
+
+def test_streams_show_up_in_gateway_stats(monkeypatch):
+    _limit_models(monkeypatch, 4)
+    llm.reset_gateway_stats()
+    model = _SlowModel()
+
+    def chunks():
+        for text in "ab":
+            time.sleep(0.02)
+            yield _Resp(text)
+
+    model.generate_content = lambda prompt, generation_config=None, stream=False: chunks()
+    assert "".join(llm.stream_text(model, "hi", params={"temperature": 0.7})) == "ab"
+    stats = llm.gateway_stats()["gateway-test"]
+    assert stats["calls"] == 1 and stats["upstream_ms"] >= 40
+    assert runtime.shared_limit("model:gateway-test").in_use == 0
@@ -0,0 +1,27 @@
+import numpy as np
+
+from tools.mmr import mmr_select, mean_pairwise_similarity
+
+
+def test_lambda_one_is_plain_similarity_ranking():
+    q = [1.0, 0.0]
+    embs = [[0.9, 0.1], [1.0, 0.0], [0.0, 1.0]]
+    picks = mmr_select(q, embs, k=3, lambda_mult=1.0)
+    assert [i for i, _ in picks] == [1, 0, 2]
+    assert picks[0][1] == 1.0
+
+
+def test_mmr_skips_near_duplicates():
+    q = [1.0, 0.2]
+    # two near-identical chunks and one distinct but still relevant chunk
+    embs = [[1.0, 0.2], [1.0, 0.21], [0.7, -0.5]]
+    plain = [i for i, _ in mmr_select(q, embs, k=2, lambda_mult=1.0)]
+    diverse = [i for i, _ in mmr_select(q, embs, k=2, lambda_mult=0.3)]
+    assert plain == [0, 1]
+    assert diverse == [0, 2]
+    assert mean_pairwise_similarity([embs[i] for i in diverse]) < mean_pairwise_similarity([embs[i] for i in plain])
+
+
+def test_k_larger_than_candidates_and_empty_input():
+    assert len(mmr_select([1.0, 0.0], np.eye(2), k=5)) == 2
+    assert mmr_select([1.0, 0.0], [], k=3) == []
@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+from ai_agents import architect_agent
+from ai_agents.registry import get_agent
+from ai_agents.context_assembler import ContextPiece
+
+
+class _FakeDB:
+    def add_chat(self, **kwargs):
+        return 7
+
+
+def test_intent_and_retrieval_overlap_and_timings_are_reported(monkeypatch):
+    async def slow_intent(query, persist_dir):
+        await asyncio.sleep(0.2)
+        return {"intent": "understanding"}
+
+    def slow_retrieval(query, persist_dir):
+        time.sleep(0.2)
+        return [ContextPiece("svc.py", "def handler(): pass", "Source: svc.py")]
+
+    monkeypatch.setattr(architect_agent, "_detect_intent", slow_intent)
+    monkeypatch.setattr(architect_agent, "_retrieve_pieces", slow_retrieval)
+    async def answer(query, ctx):
+        return f"answer using {ctx}"
+
+    monkeypatch.setattr(get_agent("understanding"), "aanalyze", answer)
+    monkeypatch.setattr(architect_agent, "_chat_db", _FakeDB)
+    monkeypatch.setattr(architect_agent, "_index_generation", lambda persist_dir: 0)
+    monkeypatch.setattr(architect_agent, "_response_cache", lambda persist_dir: None)
+
+    result = architect_agent.run_agent_sync("explain the handler")
+    assert result["chat_id"] == 7 and result["agent"] == "UnderstandingAgent"
+    assert "def handler(): pass" in result["response"]
+    t = result["timings"]
+    assert t["intent"] >= 200 and t["retrieval"] >= 200
+    assert t["intent_and_retrieval"] < 350 and t["overlap_saved"] > 100
+    assert {"context", "agent", "persist", "total"} <= set(t)
+
+
+def test_stream_emits_sources_then_tokens_and_tracks_first_token(monkeypatch):
+    def tokens(query, context):
+        yield "Hello"
+        time.sleep(0.2)
+        yield " world"
+
+    async def intent(query, persist_dir):
+        return {"intent": "understanding"}
+
+    monkeypatch.setattr(architect_agent, "_detect_intent", intent)
+    monkeypatch.setattr(architect_agent, "_retrieve_pieces",
+                        lambda q, p: [ContextPiece("svc.py", "def handler(): pass", "Source: svc.py")])
+    monkeypatch.setattr(get_agent("understanding"), "stream", tokens)
+    monkeypatch.setattr(architect_agent, "_chat_db", _FakeDB)
+    monkeypatch.setattr(architect_agent, "_index_generation", lambda persist_dir: 0)
+    monkeypatch.setattr(architect_agent, "_response_cache", lambda persist_dir: None)
+
+    events = list(architect_agent.run_agent_stream("explain the handler"))
+    assert [e["type"] for e in events] == ["sources", "token", "token", "done"]
+    assert events[0]["sources"] == ["svc.py"]
+    done = events[-1]
+    assert done["response"] == "Hello world" and done["chat_id"] == 7
+    assert done["timings"]["first_token"] + 150 < done["timings"]["total"]
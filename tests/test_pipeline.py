@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from ai_agents.pipeline import Stage, run_pipeline, validate
+
+
+def _agent(tag, delay=0.1, fail=False):
+    def run(query, context):
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError(f"{tag} broke")
+        return f"{tag}<{context}>"
+    return run
+
+
+def test_independent_stages_overlap_and_dependents_get_upstream_outputs():
+    # each independent stage waits for the other to start: only passes if they run side by side
+    both_running = threading.Barrier(2, timeout=5)
+
+    def overlapping(tag):
+        def run(query, context):
+            both_running.wait()
+            return f"{tag}<{context}>"
+        return run
+
+    stages = [Stage("understand", overlapping("U")), Stage("impact", overlapping("I")),
+              Stage("blueprint", _agent("B", 0.0), deps=("understand", "impact"))]
+    events = []
+    res = run_pipeline(stages, "q", "ctx", on_event=lambda n, s, d: events.append((n, s)))
+    assert not both_running.broken
+    assert res.complete and list(res.outputs)[-1] == "blueprint"
+    assert "==understand==\nU<ctx>" in res.outputs["blueprint"] and "==impact==\nI<ctx>" in res.outputs["blueprint"]
+    assert ("blueprint", "running") in events and events.index(("impact", "done")) < events.index(("blueprint", "running"))
+
+
+def test_failed_or_slow_branch_yields_partial_results():
+    stages = [Stage("ok", _agent("OK", 0.0)), Stage("bad", _agent("X", 0.0, fail=True)),
+              Stage("slow", _agent("S", 1.0), timeout=0.1),
+              Stage("after_bad", _agent("A", 0.0), deps=("bad",)), Stage("after_ok", _agent("C", 0.0), deps=("ok",))]
+    res = run_pipeline(stages, "q", "ctx")
+    assert set(res.outputs) == {"ok", "after_ok"}
+    assert "RuntimeError" in res.errors["bad"] and "timed out" in res.errors["slow"]
+    assert res.skipped == ["after_bad"] and not res.complete
+
+
+def test_cancellation_stops_scheduling():
+    cancel, release = threading.Event(), threading.Event()
+
+    def cancelled_while_running(query, context):
+        cancel.set()
+        release.wait(5)
+        return "F"
+
+    stages = [Stage("first", cancelled_while_running), Stage("second", _agent("S", 0.0), deps=("first",))]
+    res = run_pipeline(stages, "q", "ctx", cancel=cancel)
+    release.set()
+    assert res.outputs == {} and sorted(res.skipped) == ["first", "second"]
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError, match="cycle"):
+        validate([Stage("a", _agent("a"), deps=("b",)), Stage("b", _agent("b"), deps=("a",))])
+    with pytest.raises(ValueError, match="unknown"):
+        validate([Stage("a", _agent("a"), deps=("missing",))])
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+from ai_agents import llm
+from ai_agents.prompt_cache import PromptCache, bypass_prompt_cache, prompt_key
+
+
+class _Resp:
+    def __init__(self, text):
+        self.text = text
+
+
+class _FakeModel:
+    model_name = "models/fake"
+
+    def __init__(self):
+        self.calls = []
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        self.calls.append((prompt, generation_config))
+        return _Resp(f"answer {len(self.calls)}")
+
+    async def generate_content_async(self, prompt, generation_config=None):
+        return self.generate_content(prompt, generation_config)
+
+
+def test_ttl_and_size_bound(tmp_path):
+    cache = PromptCache(str(tmp_path / "p.sqlite"), ttl_s=60, max_entries=2)
+    keys = [prompt_key("m", f"prompt {i}", {"temperature": 0}) for i in range(3)]
+    for i, k in enumerate(keys):
+        cache.put(k, "m", f"text {i}")
+    assert len(cache) == 2 and cache.stats["evictions"] == 1
+    assert cache.get(keys[2]) == "text 2"
+
+    expired = PromptCache(str(tmp_path / "q.sqlite"), ttl_s=-1)
+    expired.put(keys[0], "m", "old")
+    assert expired.get(keys[0]) is None
+    assert prompt_key("m", "p", {"temperature": 0}) != prompt_key("m", "p", {"temperature": 0.5})
+
+
+def test_generate_serves_repeats_from_cache_and_honours_bypass(monkeypatch, tmp_path):
+    store = PromptCache(str(tmp_path / "p.sqlite"))
+    monkeypatch.setattr(llm, "get_prompt_cache", lambda *a, **k: store)
+    monkeypatch.setattr(llm.get_config().prompt_cache, "enabled", True)
+    model = _FakeModel()
+
+    assert llm.generate(model, "explain cart", params={"temperature": 0}) == "answer 1"
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        assert llm.generate(model, "explain cart", params={"temperature": 0}) == "answer 1"
+    assert (time.perf_counter() - t0) / 1000 < 0.001
+    assert asyncio.run(llm.agenerate(model, "explain cart", params={"temperature": 0})) == "answer 1"
+    assert len(model.calls) == 1
+
+    with bypass_prompt_cache():
+        assert llm.generate(model, "explain cart", params={"temperature": 0}) == "answer 2"
+    assert llm.generate(model, "explain cart", params={"temperature": 0}) == "answer 2"
+    # sampled calls are never cached
+    llm.generate(model, "explain cart", params={"temperature": 0.7})
+    llm.generate(model, "explain cart", params={"temperature": 0.7})
+    assert len(model.calls) == 4
+
+
+def test_async_lookup_runs_off_the_event_loop(monkeypatch, tmp_path):
+    class _SlowDisk(PromptCache):
+        def get(self, key):
+            time.sleep(0.3)
+            return super().get(key)
+
+    store = _SlowDisk(str(tmp_path / "p.sqlite"))
+    monkeypatch.setattr(llm, "get_prompt_cache", lambda *a, **k: store)
+    monkeypatch.setattr(llm.get_config().prompt_cache, "enabled", True)
+    model = _FakeModel()
+    llm.generate(model, "explain cart", params={"temperature": 0})
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        tick = asyncio.ensure_future(ticker())
+        text = await llm.agenerate(model, "explain cart", params={"temperature": 0})
+        with bypass_prompt_cache():
+            fresh = await llm.agenerate(model, "explain cart", params={"temperature": 0})
+        tick.cancel()
+        return text, fresh, ticks
+
+    text, fresh, ticks = asyncio.run(main())
+    assert text == "answer 1" and fresh == "answer 2"
+    assert ticks >= 10  # the loop kept running while the lookup waited on the disk
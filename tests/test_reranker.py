@@ -0,0 +1,75 @@
+import sys
+import threading
+import time
+import types
+
+from tools.reranker import CrossEncoderReranker
+
+
+class FakeCrossEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size=16):
+        self.calls.append(len(pairs))
+        # relevance = how often the query word appears in the chunk
+        return [float(doc.count(q)) for q, doc in pairs]
+
+
+def test_rerank_orders_by_score_and_keeps_top_n():
+    rr = CrossEncoderReranker(model=FakeCrossEncoder(), batch_size=2)
+    docs = ["cart", "cart cart cart", "payment", "cart cart"]
+    ranked = rr.rerank("cart", docs, top_n=2)
+    assert [i for i, _ in ranked] == [1, 3]
+    assert ranked[0][1] == 3.0
+    # 4 candidates in batches of 2
+    assert rr._model.calls == [2, 2]
+
+
+def test_scores_are_cached_per_query_and_chunk():
+    model = FakeCrossEncoder()
+    rr = CrossEncoderReranker(model=model)
+    docs = ["cart service", "payment service"]
+    rr.rerank("cart", docs)
+    rr.rerank("cart", docs)
+    assert model.calls == [2]
+    assert rr.stats["cache_hits"] == 2
+    rr.rerank("payment", docs)
+    assert model.calls == [2, 2]
+
+
+def test_candidates_are_bounded():
+    model = FakeCrossEncoder()
+    rr = CrossEncoderReranker(model=model, max_candidates=3)
+    ranked = rr.rerank("x", ["x"] * 10, top_n=10)
+    assert len(ranked) == 3
+    assert rr.stats["pairs_scored"] == 3
+
+
+def test_concurrent_first_calls_load_the_model_once(monkeypatch):
+    loads = []
+
+    class SlowCrossEncoder(FakeCrossEncoder):
+        def __init__(self, name):
+            super().__init__()
+            loads.append(name)
+            time.sleep(0.05)
+
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.SimpleNamespace(CrossEncoder=SlowCrossEncoder))
+    rr = CrossEncoderReranker(model_name="fake-ce")
+    docs = ["cart", "cart cart", "payment"]
+    start = threading.Barrier(8, timeout=5)
+
+    def call():
+        start.wait()
+        rr.score("cart", docs)
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert loads == ["fake-ce"]
+    assert rr.stats["calls"] == 8
+    assert rr.stats["pairs_scored"] + rr.stats["cache_hits"] == 8 * len(docs)
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+from ai_agents import impact_agent
+from ai_agents.resilience import CircuitBreaker, LLMUnavailable, ModelGuard, TokenBucket, backoff_delay, is_retryable
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ResourceExhausted(Exception):
+    code = 429
+
+
+class InvalidArgument(Exception):
+    code = 400
+
+
+def test_token_bucket_spaces_reservations_at_the_quota_rate():
+    clock = _Clock()
+    bucket = TokenBucket(60, clock=clock)  # 1 per second, burst of 60
+    assert all(bucket.reserve() == 0 for _ in range(60))
+    # queued callers are due one per second rather than all at once
+    assert [bucket.reserve() for _ in range(3)] == [1.0, 2.0, 3.0]
+    clock.now = 10  # 10 refilled, 3 of them already owed
+    assert bucket.reserve() == 0 and bucket.available == pytest.approx(6)
+    assert TokenBucket(0).reserve(10_000) == 0  # unlimited
+
+
+def test_backoff_is_jittered_and_capped():
+    assert backoff_delay(0, 0.5, 20, rng=lambda: 1.0) == 0.5
+    assert backoff_delay(3, 0.5, 20, rng=lambda: 1.0) == 4.0
+    assert backoff_delay(10, 0.5, 20, rng=lambda: 1.0) == 20
+    assert backoff_delay(3, 0.5, 20, rng=lambda: 0.25) == 1.0
+    assert is_retryable(ResourceExhausted()) and is_retryable(TimeoutError())
+    assert not is_retryable(InvalidArgument()) and not is_retryable(ValueError())
+
+
+def test_guard_retries_transient_errors_and_raises_others(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("ai_agents.resilience.time.sleep", sleeps.append)
+    guard = ModelGuard("m", retries=3, backoff_base_s=0.1, backoff_cap_s=1)
+
+    outcomes = [ResourceExhausted(), ResourceExhausted(), "ok"]
+
+    def flaky():
+        out = outcomes.pop(0)
+        if isinstance(out, Exception):
+            raise out
+        return out
+
+    assert guard.call(flaky, "prompt") == "ok"
+    assert guard.stats["retries"] == 2 and len(sleeps) == 2
+    assert all(0 <= s <= 0.2 for s in sleeps)
+
+    def bad_request():
+        raise InvalidArgument()
+
+    with pytest.raises(InvalidArgument):
+        guard.call(bad_request, "prompt")
+    assert guard.stats["retries"] == 2
+    assert guard.breaker.state == "closed"
+
+
+def test_breaker_fails_fast_then_lets_one_trial_through():
+    clock = _Clock()
+    breaker = CircuitBreaker(failures=2, reset_s=30, clock=clock)
+    guard = ModelGuard("m", retries=0)
+    guard.breaker = breaker
+    calls = []
+
+    def down():
+        calls.append(1)
+        raise ResourceExhausted()
+
+    for _ in range(2):
+        with pytest.raises(ResourceExhausted):
+            guard.call(down, "prompt")
+    assert breaker.state == "open"
+    with pytest.raises(LLMUnavailable):
+        guard.call(down, "prompt")
+    assert len(calls) == 2 and guard.stats["rejected"] == 1
+
+    clock.now = 31
+    assert breaker.allow() and not breaker.allow()  # a single trial call
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_cancelled_half_open_trial_does_not_wedge_the_breaker():
+    clock = _Clock()
+    guard = ModelGuard("m", retries=0)
+    guard.breaker = CircuitBreaker(failures=1, reset_s=30, clock=clock)
+    with pytest.raises(ResourceExhausted):
+        guard.call(lambda: (_ for _ in ()).throw(ResourceExhausted()), "prompt")
+    assert guard.breaker.state == "open"
+
+    clock.now = 31
+
+    async def trial():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(60)
+
+        task = asyncio.ensure_future(guard.acall(hang, "prompt"))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(trial())
+    assert guard.breaker.state == "half_open"
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        guard.call(interrupted, "prompt")
+
+    clock.now = 1000
+    assert guard.call(lambda: "ok", "prompt") == "ok"
+    assert guard.breaker.state == "closed"
+
+
+def test_impact_agent_surfaces_quota_errors_instead_of_an_empty_list(monkeypatch):
+    def quota(*a, **k):
+        raise ResourceExhausted("quota exceeded")
+
+    monkeypatch.setattr(impact_agent, "get_model", lambda key: object())
+    monkeypatch.setattr(impact_agent, "generate", quota)
+    with pytest.raises(ResourceExhausted):
+        impact_agent.ImpactAnalyzerAgent().analyze("change the cart")
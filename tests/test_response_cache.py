@@ -0,0 +1,108 @@
+import os
+
+from ai_agents import architect_agent
+from ai_agents.registry import get_agent
+from tools.doc_store import DocStore
+from tools.response_cache import SemanticResponseCache
+
+
+def test_similar_question_hits_and_changed_sources_invalidate(tmp_path):
+    src = tmp_path / "cart.py"
+    src.write_text("def add_item(): pass\n")
+    cache = SemanticResponseCache(str(tmp_path / "cache.sqlite"), threshold=0.9)
+    cache.put([1.0, 0.0, 0.0], "understanding", 3, "how does the cart work?", "UnderstandingAgent",
+              "It stores items in Redis.", [str(src)], cost_ms=4200.0)
+
+    hit = cache.lookup([0.98, 0.2, 0.0], "understanding", 3)
+    assert hit is not None and hit.response == "It stores items in Redis." and hit.similarity > 0.9
+    assert hit.sources == [str(src)] and hit.saved_ms == 4200.0
+    assert cache.lookup([0.0, 1.0, 0.0], "understanding", 3) is None      # not similar enough
+    assert cache.lookup([1.0, 0.0, 0.0], "impact", 3) is None             # other intent
+    assert cache.lookup([1.0, 0.0, 0.0], "understanding", 4) is None      # other index generation
+
+    src.write_text("def add_item(item): pass\n")
+    os.utime(src, ns=(1, 1))
+    assert cache.lookup([1.0, 0.0, 0.0], "understanding", 3) is None
+    report = cache.report()
+    assert report["hits"] == 1 and report["stale"] == 1 and report["saved_ms"] == 4200.0
+    assert report["hit_rate"] == 0.2 and "similarity_p50" in report
+    assert len(cache) == 0
+
+
+def test_new_generation_purges_and_size_bound_evicts(tmp_path):
+    cache = SemanticResponseCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    cache.put([1, 0], "impact", 1, "old", "ImpactAnalyserAgent", "[...]", [], 10.0)
+    for i in range(3):
+        cache.put([1, i], "impact", 2, f"q{i}", "ImpactAnalyserAgent", f"a{i}", [], 10.0)
+    assert len(cache) == 2
+    assert cache.lookup([1, 0], "impact", 1) is None
+
+
+def test_doc_store_generation_counts_index_changes(tmp_path):
+    store = DocStore(str(tmp_path / "docs.sqlite"))
+    assert store.generation() == 0
+    assert store.bump_generation() == 1 and store.bump_generation() == 2
+    assert DocStore(str(tmp_path / "docs.sqlite")).generation() == 2
+
+
+def test_orchestrator_serves_cached_answer_without_retrieval_or_agent(monkeypatch, tmp_path):
+    cache = SemanticResponseCache(str(tmp_path / "cache.sqlite"))
+    cache.put([1.0, 0.0], "understanding", 5, "explain checkout", "UnderstandingAgent", "cached answer", [], 900.0)
+
+    async def intent(query, persist_dir):
+        return {"intent": "understanding"}
+
+    async def agent_must_not_run(query, ctx):
+        raise AssertionError("agent called on a cache hit")
+
+    class _FakeDB:
+        def add_chat(self, **kwargs):
+            return 11
+
+    monkeypatch.setattr(architect_agent, "_detect_intent", intent)
+    monkeypatch.setattr(architect_agent, "_retrieve_pieces", lambda q, p: [])
+    monkeypatch.setattr(architect_agent, "_response_cache", lambda persist_dir: cache)
+    monkeypatch.setattr(architect_agent, "_cache_key", lambda q, p: ([0.99, 0.05], 5))
+    monkeypatch.setattr(get_agent("understanding"), "aanalyze", agent_must_not_run)
+    monkeypatch.setattr(architect_agent, "_chat_db", _FakeDB)
+    monkeypatch.setattr(architect_agent, "_index_generation", lambda persist_dir: 5)
+
+    result = architect_agent.run_agent_sync("how does checkout work?")
+    assert result["response"] == "cached answer" and result["chat_id"] == 11
+    assert result["cached"]["query"] == "explain checkout" and "agent" not in result["timings"]
+
+
+def test_stream_failing_part_way_is_not_cached_or_saved(monkeypatch, tmp_path):
+    from ai_agents import blueprint_agent, understanding_agent
+
+    cache = SemanticResponseCache(str(tmp_path / "cache.sqlite"))
+    saved = []
+
+    class _FakeDB:
+        def add_chat(self, **kwargs):
+            saved.append(kwargs)
+            return 12
+
+    def broken_stream(model, prompt):
+        yield '{"components": ['
+        raise ConnectionError("stream reset")
+
+    for module in (understanding_agent, blueprint_agent):
+        monkeypatch.setattr(module, "stream_text", broken_stream)
+        monkeypatch.setattr(module, "get_model", lambda name: object())
+    monkeypatch.setattr(architect_agent, "_retrieve_pieces", lambda q, p: [])
+    monkeypatch.setattr(architect_agent, "_response_cache", lambda persist_dir: cache)
+    monkeypatch.setattr(architect_agent, "_cache_key", lambda q, p: ([1.0, 0.0], 5))
+    monkeypatch.setattr(architect_agent, "_chat_db", _FakeDB)
+    monkeypatch.setattr(architect_agent, "_index_generation", lambda persist_dir: None)
+
+    for intent_name in ("understanding", "blueprint"):
+        async def intent(query, persist_dir, intent_name=intent_name):
+            return {"intent": intent_name}
+
+        monkeypatch.setattr(architect_agent, "_detect_intent", intent)
+        done = list(architect_agent.run_agent_stream(f"{intent_name} of checkout"))[-1]
+        assert done["failed"] and done["chat_id"] is None
+        assert done["response"].startswith('{"components": [')
+
+    assert len(cache) == 0 and saved == []
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+
+import pytest
+
+from ai_agents import runtime
+from ai_agents.crew_adapter import Crew, make_agent
+
+
+def test_run_coroutine_uses_one_shared_loop_from_any_thread():
+    async def loop_id():
+        return id(asyncio.get_running_loop())
+
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(runtime.run_coroutine(loop_id()))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(set(seen)) == 1 and seen[0] == id(runtime.get_loop())
+
+
+def test_run_coroutine_refuses_to_block_the_shared_loop():
+    async def nested():
+        async def inner():
+            return 1
+        with pytest.raises(RuntimeError):
+            runtime.run_coroutine(inner())
+        return "ok"
+
+    assert runtime.run_coroutine(nested()) == "ok"
+
+
+def test_limit_bounds_concurrent_calls(monkeypatch):
+    monkeypatch.setattr(runtime.get_config().concurrency, "llm", 2)
+    active, peak = 0, 0
+
+    async def call():
+        nonlocal active, peak
+        async with runtime.limit("llm"):
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(10)))
+
+    asyncio.run(main())
+    assert peak == 2
+
+
+def test_crew_run_agent_reuses_the_shared_loop():
+    crew = Crew([make_agent("echo", lambda text, ctx: text.upper())])
+    assert crew.run_agent("echo", "hi") == "HI"
+    assert crew.run_agent("echo", "again") == "AGAIN"
+
+
+def test_timed_out_coroutines_are_cancelled_and_release_their_slots(monkeypatch):
+    monkeypatch.setattr(runtime.get_config().concurrency, "llm", 1)
+    monkeypatch.setattr(runtime, "_SEMAPHORES", runtime.weakref.WeakKeyDictionary())
+    cancelled = threading.Event()
+
+    async def stuck():
+        async with runtime.limit("llm"):
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+    async def quick():
+        async with runtime.limit("llm"):
+            return "got the slot"
+
+    with pytest.raises(TimeoutError):
+        runtime.run_coroutine(stuck(), timeout=0.05)
+    assert cancelled.wait(1)
+    assert runtime.run_coroutine(quick(), timeout=1) == "got the slot"
@@ -0,0 +1,177 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ai_agents import architect_agent
+from ai_agents.context_assembler import ContextPiece
+from ai_agents.registry import get_agent
+from ai_agents.singleflight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flights = SingleFlight("test")
+    calls = []
+
+    def work(x):
+        calls.append(x)
+        time.sleep(0.1)
+        return x * 2
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do("k", work, 21))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [42] * 8 and calls == [21]
+    assert flights.stats == {"leaders": 1, "shared": 7}
+    # nothing is remembered afterwards
+    assert flights.do("k", work, 1) == 2 and calls == [21, 1]
+
+
+def test_async_followers_get_the_leaders_exception_and_survive_its_cancellation():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise ValueError("upstream down")
+
+    async def slow():
+        calls.append(2)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        results = await asyncio.gather(*(flights.ado("a", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+
+        leader = asyncio.ensure_future(flights.ado("b", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.ado("b", slow))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await follower == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    asyncio.run(main())
+    assert calls == [1, 2]
+
+
+def test_identical_streams_share_one_upstream_and_outlive_an_abandoning_leader():
+    flights = SingleFlight("test")
+    opened = []
+
+    def chunks(n):
+        opened.append(n)
+        for i in range(n):
+            time.sleep(0.02)
+            yield i
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(list(flights.stream("k", lambda: chunks(5)))))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [[0, 1, 2, 3, 4]] * 4 and opened == [5]
+    assert flights.stats == {"leaders": 1, "shared": 3}
+
+    leader = flights.stream("j", lambda: chunks(5))
+    assert next(leader) == 0
+    follower = flights.stream("j", lambda: chunks(5))
+    leader.close()
+    assert list(follower) == [0, 1, 2, 3, 4] and opened == [5, 5]
+
+    def failing():
+        yield "partial"
+        raise ValueError("stream broke")
+
+    got = []
+    with pytest.raises(ValueError):
+        for item in flights.stream("e", failing):
+            got.append(item)
+    assert got == ["partial"]
+
+
+class _FakeDB:
+    def __init__(self):
+        self.saved = 0
+
+    def add_chat(self, **kwargs):
+        self.saved += 1
+        return self.saved
+
+
+def test_identical_requests_in_flight_run_once(monkeypatch):
+    agent_calls, searches = [], []
+
+    async def intent(query, persist_dir):
+        return {"intent": "understanding"}
+
+    def search(query, persist_dir):
+        searches.append(query)
+        return [ContextPiece("svc.py", "def handler(): pass", "Source: svc.py")]
+
+    async def answer(query, ctx):
+        agent_calls.append(query)
+        await asyncio.sleep(0.1)
+        return "the handler handles"
+
+    db = _FakeDB()
+    monkeypatch.setattr(architect_agent, "_detect_intent", intent)
+    monkeypatch.setattr(architect_agent, "_retrieve_pieces", search)
+    monkeypatch.setattr(get_agent("understanding"), "aanalyze", answer)
+    monkeypatch.setattr(architect_agent, "_chat_db", lambda: db)
+    monkeypatch.setattr(architect_agent, "_response_cache", lambda persist_dir: None)
+    monkeypatch.setattr(architect_agent, "_index_generation", lambda persist_dir: 3)
+
+    async def burst():
+        queries = ["Explain the handler", "explain  the handler ", "Explain the handler"]
+        return await asyncio.gather(*(architect_agent.run_agent_async(q) for q in queries))
+
+    results = architect_agent.run_coroutine(burst())
+    # whitespace is normalised but case is kept: the lower-case variant is its own request
+    assert [r["response"] for r in results] == ["the handler handles"] * 3
+    assert results[0]["chat_id"] == results[2]["chat_id"]
+    assert len(agent_calls) == 2 and db.saved == 2
+    assert len(searches) == 2
+
+
+def test_identical_streaming_requests_run_once(monkeypatch):
+    streamed = []
+
+    def tokens(query, context):
+        streamed.append(query)
+        for word in ("the ", "handler ", "handles"):
+            time.sleep(0.05)
+            yield word
+
+    async def intent(query, persist_dir):
+        return {"intent": "understanding"}
+
+    db = _FakeDB()
+    monkeypatch.setattr(architect_agent, "_detect_intent", intent)
+    monkeypatch.setattr(architect_agent, "_retrieve_pieces",
+                        lambda q, p: [ContextPiece("svc.py", "def handler(): pass", "Source: svc.py")])
+    monkeypatch.setattr(get_agent("understanding"), "stream", tokens)
+    monkeypatch.setattr(architect_agent, "_chat_db", lambda: db)
+    monkeypatch.setattr(architect_agent, "_response_cache", lambda persist_dir: None)
+    monkeypatch.setattr(architect_agent, "_index_generation", lambda persist_dir: 3)
+
+    runs = []
+    threads = [threading.Thread(target=lambda: runs.append(list(architect_agent.run_agent_stream("Explain the handler"))))
+               for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(streamed) == 1 and db.saved == 1
+    for events in runs:
+        assert [e["type"] for e in events] == ["sources", "token", "token", "token", "done"]
+        assert events[-1]["response"] == "the handler handles" and events[-1]["chat_id"] == 1
@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import pytest
+
+from ai_agents import llm
+from ai_agents.llm_backends import HTTPBackend, HTTPError, StandInBackend
+from ai_agents.registry import get_agent
+from ai_agents.resilience import is_retryable
+from ai_agents.standin import StandInError, StandInModel, render, serve
+
+CONTEXT = "Source: src/cartservice/cart.py\ndef add_item(): ...\n\n---\n\nSource: src/checkout/main.go\nfunc Place() {}"
+FAST = {"latency_ms": {"dist": "fixed", "ms": 0}}
+
+
+@pytest.fixture
+def standin(monkeypatch):
+    monkeypatch.setattr(llm, "_BACKEND", StandInBackend(FAST))
+    monkeypatch.setattr(llm, "_MODELS", {})
+    monkeypatch.setattr(llm.get_config().prompt_cache, "enabled", False)
+
+
+def test_answers_fit_each_agents_schema_and_are_deterministic(standin):
+    intent = get_agent("requirements").get_intent("what is the impact of adding coupons to the cart?")
+    assert intent["intent"] == "impact" and intent["summary"].startswith("(stand-in)")
+
+    impacts = json.loads(get_agent("impact").analyze("add coupons to the cart", CONTEXT))
+    assert impacts and {"name", "nature", "level", "tshirt", "justification", "sources"} <= set(impacts[0])
+    assert impacts[0]["sources"] == ["src/cartservice/cart.py"]
+
+    blueprint = json.loads(get_agent("blueprint").generate("design a coupon service", CONTEXT))
+    assert blueprint["originalRequirement"] == "design a coupon service" and blueprint["components"]
+
+    prompt = get_agent("understanding").build_prompt("explain the cart", CONTEXT)
+    assert render(prompt) == render(prompt) and "src/checkout/main.go" in render(prompt)
+    assert get_agent("understanding").analyze("explain the cart", CONTEXT) == render(prompt)
+
+
+def test_latency_errors_and_token_counts_follow_the_settings():
+    slow = StandInModel("m", {"latency_ms": {"dist": "lognormal", "median": 100, "p99": 400}, "seed": 7})
+    again = StandInModel("m", {"latency_ms": {"dist": "lognormal", "median": 100, "p99": 400}, "seed": 7})
+    samples = [slow.latency.sample() for _ in range(2000)]
+    assert samples[:20] == [again.latency.sample() for _ in range(20)]
+    samples.sort()
+    assert 0.08 < samples[1000] < 0.12 and 0.25 < samples[1980] < 0.6
+
+    long = StandInModel("m", {**FAST, "output_tokens": 800}).generate_content("User query:\nexplain\n")
+    short = StandInModel("m", {**FAST, "output_tokens": 100}).generate_content("User query:\nexplain\n")
+    assert long.usage_metadata.candidates_token_count > 4 * short.usage_metadata.candidates_token_count
+
+    failing = StandInModel("m", {**FAST, "error_rate": 1.0, "error_codes": [429]})
+    with pytest.raises(StandInError) as err:
+        asyncio.run(failing.generate_content_async("User query:\nexplain\n"))
+    assert err.value.code == 429 and is_retryable(err.value)
+
+
+def test_http_server_serves_the_same_answers():
+    server = serve(port=0, settings=FAST)
+    try:
+        url = "http://%s:%d" % server.server_address[:2]
+        model = HTTPBackend(url).model("gemini-test")
+        prompt = "User query:\nexplain the cart\n"
+        assert model.generate_content(prompt).text == render(prompt)
+        assert "".join(c.text for c in model.generate_content(prompt, stream=True)) == render(prompt)
+        assert asyncio.run(model.generate_content_async(prompt)).text == render(prompt)
+    finally:
+        server.shutdown()
+
+    server = serve(port=0, settings={**FAST, "error_rate": 1.0, "error_codes": [503]})
+    try:
+        model = HTTPBackend("http://%s:%d" % server.server_address[:2]).model("gemini-test")
+        with pytest.raises(HTTPError) as err:
+            model.generate_content("User query:\nexplain\n")
+        assert err.value.code == 503 and is_retryable(err.value)
+    finally:
+        server.shutdown()
@@ -0,0 +1,44 @@
+from tools.code_analyzer import analyze_file
+from tools.symbol_index import SymbolIndex, get_symbol_index
+
+SOURCE = '''import os
+
+
+class CartStore:
+    """Keeps carts."""
+
+    def add_item(self, user, item):
+        return item
+
+
+def checkout(cart):
+    return cart
+'''
+
+
+def test_named_symbols_resolve_to_defining_lines(tmp_path):
+    src = tmp_path / "cart_store.py"
+    src.write_text(SOURCE)
+    meta_dir = tmp_path / "metadata"
+    meta = analyze_file(str(src), str(meta_dir))
+    assert {"name": "add_item", "kind": "function", "start_line": 7, "end_line": 8} in meta["symbols"]
+
+    index = get_symbol_index(str(meta_dir))
+    assert index is get_symbol_index(str(meta_dir))
+
+    found = index.lookup("Why does CartStore.add_item return the item?")
+    assert [(s.name, s.kind, s.start_line, s.end_line) for s in found] == [("add_item", "function", 7, 8)]
+    assert found[0].read().strip().startswith("def add_item(")
+    assert [s.end_line for s in index.lookup("explain `CartStore`")] == [8]
+
+    assert [s.name for s in index.lookup("what does `checkout` do, see cart_store.py")] == ["checkout", "cart_store.py"]
+    # plain words never trigger the fast path, even when a symbol shares the name
+    assert index.lookup("how does checkout work?") == []
+
+
+def test_ambiguous_names_are_skipped():
+    index = SymbolIndex()
+    for i in range(5):
+        index.add({"file": f"svc{i}/main.go", "symbols": [{"name": "NewServer", "kind": "function",
+                                                           "start_line": 1, "end_line": 3}]})
+    assert index.lookup("where is NewServer defined") == []
@@ -0,0 +1,77 @@
+from tools.window_assembler import ChunkHit, assemble_windows, hits_from_search
+
+
+def test_chunk_bytes_covers_file_with_line_aligned_overlap():
+    from tools.embedder import chunk_bytes
+
+    data = b"".join(b"line %03d of the file\n" % i for i in range(200))
+    spans = chunk_bytes(data, chunk_size=300, overlap=60)
+    assert spans[0][0] == 0 and spans[-1][1] == len(data)
+    for (s1, e1), (s2, e2) in zip(spans, spans[1:]):
+        assert s2 < e1  # overlapping
+        assert s2 > s1  # progressing
+        assert data[s2 - 1:s2] == b"\n"  # line aligned
+        assert e1 - s1 <= 300
+
+
+def test_overlapping_hits_from_same_file_are_coalesced(tmp_path):
+    src = tmp_path / "svc.py"
+    content = "".join(f"x{i} = {i}\n" for i in range(300))
+    src.write_text(content)
+    hits = [
+        ChunkHit("b", str(src), 100, 200, score=0.9),
+        ChunkHit("other", "whole_file.md", None, None, text="whole doc", score=0.8),
+        ChunkHit("a", str(src), 150, 260, score=0.7),
+        ChunkHit("far", str(src), 2000, 2100, score=0.5),
+    ]
+    windows = assemble_windows(hits, pad_bytes=20)
+    assert [w.chunk_ids for w in windows] == [["b", "a"], ["other"], ["far"]]
+    first = windows[0]
+    assert (first.start, first.end) == (80, 280)
+    assert first.text == content[80:280]
+    assert first.score == 0.9
+
+
+def test_falls_back_to_stitching_chunk_texts_when_file_missing():
+    text = "abcdefghijklmnopqrstuvwxyz"
+    docs = {
+        "ids": ["c0", "c1"],
+        "documents": [text[0:10], text[6:20]],
+        "metadatas": [{"source": "/nope/gone.py", "start_byte": 0, "end_byte": 10},
+                      {"source": "/nope/gone.py", "start_byte": 6, "end_byte": 20}],
+    }
+    windows = assemble_windows(hits_from_search(docs), pad_bytes=0)
+    assert len(windows) == 1
+    assert windows[0].text == text[0:20]
+
+
+def test_spans_edited_since_indexing_are_not_served(tmp_path):
+    from tools.doc_store import DocStore, RetrievalHit
+
+    src = tmp_path / "svc.py"
+    content = "".join(f"value_{i} = {i}\n" for i in range(100))
+    src.write_text(content)
+    store = DocStore(str(tmp_path / "docs.sqlite"))
+    store_blobs = DocStore(str(tmp_path / "blobs.sqlite"), keep_blobs=True)
+    metas = {"early": {"source": str(src), "start_byte": 0, "end_byte": 120},
+             "late": {"source": str(src), "start_byte": 900, "end_byte": 1000}}
+    store.put_many(["early", "late"], [content[0:120], content[900:1000]], [metas["early"], metas["late"]])
+    store_blobs.put_many(["blob"], [content[600:700]], [{"source": str(src), "start_byte": 600, "end_byte": 700}])
+
+    def hits():
+        return [RetrievalHit("early", 0.9, metas["early"], _loader=store.get_many, _digests=store.digests),
+                RetrievalHit("late", 0.8, metas["late"], _loader=store.get_many, _digests=store.digests),
+                RetrievalHit("blob", 0.7, {"source": str(src), "start_byte": 600, "end_byte": 700},
+                             _loader=store_blobs.get_many, _digests=store_blobs.digests)]
+
+    windows = assemble_windows(hits(), pad_bytes=0)
+    assert [w.text for w in windows] == [content[0:120], content[900:1000], content[600:700]]
+
+    # a line inserted at the top shifts every later span
+    src.write_text("import os\n" + content)
+    windows = assemble_windows(hits(), pad_bytes=0)
+    # offset-only chunks can't be served any more; the blob keeps its indexed text
+    assert [(w.chunk_ids, w.text, w.start) for w in windows] == [(["blob"], content[600:700], None)]
+
+    stale = ChunkHit("c", str(src), 0, 120, text=content[0:120])
+    assert [(w.text, w.start) for w in assemble_windows([stale], pad_bytes=0)] == [(content[0:120], None)]
@@ -42,6 +42,66 @@ def _heuristic_imports(text):
         imports.add(m.group(1))
     return list(imports)
 
+_SYMBOL_RE = {
+    "py": [(re.compile(r'^([ \t]*)(?:async\s+)?def\s+([A-Za-z_]\w*)\s*\('), "function"),
+           (re.compile(r'^([ \t]*)class\s+([A-Za-z_]\w*)\s*[:\(]'), "class")],
+    "go": [(re.compile(r'^()func\s+(?:\([^)]*\)\s*)?([A-Za-z_]\w*)\s*[\[(]'), "function"),
+           (re.compile(r'^()type\s+([A-Za-z_]\w*)\s+(?:struct|interface)\b'), "class")],
+    "java": [(re.compile(r'^(\s*)(?:(?:public|protected|private|static|abstract|final)\s+)*(?:class|interface|enum)\s+([A-Za-z_]\w*)'), "class"),
+             (re.compile(r'^(\s*)(?:(?:public|protected|private|static|abstract|final|synchronized)\s+)+[\w<>\[\],\s]*?\s([a-z_]\w*)\s*\([^;]*$'), "function")],
+    "js": [(re.compile(r'^(\s*)(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)\s*\('), "function"),
+           (re.compile(r'^(\s*)(?:export\s+)?(?:default\s+)?class\s+([A-Za-z_$][\w$]*)'), "class"),
+           (re.compile(r'^(\s*)(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*(?:async\s*)?(?:\([^)]*\)|\w+)\s*=>'), "function")],
+}
+_SYMBOL_RE["ts"] = _SYMBOL_RE["js"] + [
+    (re.compile(r'^(\s*)(?:export\s+)?(?:interface|enum)\s+([A-Za-z_$][\w$]*)'), "class")]
+
+
+def _block_end(lines, i, language, indent):
+    """Last line (0-based) of the definition starting at line i."""
+    if language == "py":
+        end = i
+        for j in range(i + 1, len(lines)):
+            s = lines[j]
+            if not s.strip():
+                continue
+            if len(s) - len(s.lstrip()) <= len(indent) and not s.lstrip().startswith((")", "]", "#")):
+                break
+            end = j
+        return end
+    depth, opened = 0, False
+    for j in range(i, len(lines)):
+        depth += lines[j].count("{") - lines[j].count("}")
+        opened = opened or "{" in lines[j]
+        if opened and depth <= 0:
+            return j
+        if not opened and j > i and lines[j].rstrip().endswith(";"):
+            return j
+    return len(lines) - 1
+
+
+def extract_symbols(text: str, language: str, limit: int = 200):
+    """Definitions with 1-based inclusive line spans: [{name, kind, start_line, end_line}]."""
+    patterns = _SYMBOL_RE.get(language)
+    if not patterns:
+        return []
+    lines = text.splitlines()
+    symbols = []
+    for i, line in enumerate(lines):
+        for rx, kind in patterns:
+            m = rx.match(line)
+            if m:
+                end = _block_end(lines, i, language, m.group(1))
+                start = i
+                while language == "py" and start > 0 and lines[start - 1].strip().startswith("@"):
+                    start -= 1
+                symbols.append({"name": m.group(2), "kind": kind, "start_line": start + 1, "end_line": end + 1})
+                break
+        if len(symbols) >= limit:
+            break
+    return symbols
+
+
 def analyze_file(path: str, metadata_dir: str):
     ext = Path(path).suffix.lower()
     if ext not in SUPPORTED_EXTS:
@@ -105,6 +165,8 @@ def analyze_file(path: str, metadata_dir: str):
 
     meta["functions"] = list(dict.fromkeys(functions))[:80]
     meta["classes"] = list(dict.fromkeys(classes))[:80]
+    # definitions with line spans, for tools.symbol_index
+    meta["symbols"] = extract_symbols(txt, meta["language"])
 
     # Save metadata JSON
     os.makedirs(metadata_dir, exist_ok=True)
@@ -120,6 +182,66 @@ def analyze_file(path: str, metadata_dir: str):
     log.info(f"analyzed {path} -> {out}")
     return meta
 
+_SIGNATURE_RE = {
+    "py": re.compile(r'^\s*(?:@\w[\w\.]*(?:\(.*\))?\s*$|(?:async\s+)?def\s+\w+|class\s+\w+)'),
+    "go": re.compile(r'^\s*(?:func\s|type\s+\w+\s+(?:struct|interface)|package\s)'),
+    "java": re.compile(r'^\s*(?:public|protected|private|static|abstract|final|class|interface|enum|@interface)\b[^;=]*[({]?\s*$'),
+    "js": re.compile(r'^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?(?:function\b|class\b|(?:const|let|var)\s+\w+\s*=\s*(?:async\s*)?(?:\([^)]*\)|\w+)\s*=>)'),
+}
+_SIGNATURE_RE["ts"] = re.compile(_SIGNATURE_RE["js"].pattern[:-1] + r'|(?:export\s+)?(?:interface|type|enum)\s+\w+)')
+
+_TS_OUTLINE_NODES = ("function_definition", "function_declaration", "method_definition", "method_declaration",
+                     "class_definition", "class_declaration", "interface_declaration", "type_declaration")
+
+
+def extract_outline(text: str, language: str) -> str:
+    """Signature lines (plus Python docstrings) of a source snippet — a skeleton of the code.
+
+    Uses tree-sitter when available, otherwise per-language regex heuristics. Returns "" for
+    languages we don't outline (callers keep the original text then).
+    """
+    lines = text.splitlines()
+    keep = set()
+    try:
+        if HAS_TREESITTER and language in ("py", "go", "java", "js", "ts"):
+            lang_name = {"py": "python", "js": "javascript", "ts": "typescript"}.get(language, language)
+            tree = get_parser(lang_name).parse(bytes(text, "utf8"))
+            stack = [tree.root_node]
+            while stack:
+                node = stack.pop()
+                if node.type in _TS_OUTLINE_NODES:
+                    keep.add(node.start_point[0])
+                stack.extend(node.children)
+    except Exception as e:
+        log.warning(f"tree-sitter outline failed, using regex: {e}")
+        keep = set()
+
+    sig = _SIGNATURE_RE.get(language)
+    if sig is None:
+        return ""
+    if not keep:
+        keep = {i for i, line in enumerate(lines) if sig.match(line)}
+
+    out = []
+    i = 0
+    while i < len(lines):
+        if i in keep:
+            out.append(lines[i].rstrip())
+            # Python: carry the docstring that follows a def/class
+            if language == "py" and i + 1 < len(lines):
+                nxt = lines[i + 1].strip()
+                quote = nxt[:3] if nxt[:3] in ('"""', "'''") else None
+                if quote:
+                    j = i + 1
+                    out.append(lines[j].rstrip())
+                    while not (lines[j].strip().endswith(quote) and (j > i + 1 or len(lines[j].strip()) >= 6)) and j + 1 < len(lines):
+                        j += 1
+                        out.append(lines[j].rstrip())
+                    i = j
+        i += 1
+    return "\n".join(out)
+
+
 def analyze_folder(root_folder: str, metadata_dir: str):
     metas = []
     for root, _, files in os.walk(root_folder):
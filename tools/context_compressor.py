@@ -0,0 +1,216 @@
+# tools/context_compressor.py
+"""
+Language-aware compression of code chunks before they go into an LLM prompt.
+
+Two levels:
+  - "strip":   drop license headers, import blocks, comment-only lines and blank-line runs,
+               and trailing whitespace. Docstrings / doc comments (`/** */`) are kept.
+  - "outline": reduce the chunk to its signatures and docstrings (tools.code_analyzer.extract_outline);
+               used for lower-ranked chunks where the shape of the code matters more than the body.
+
+Non-code files (markdown, plain text) only get whitespace collapsing; YAML loses comment lines.
+Every call reports original vs compressed size so the prompt-size reduction can be measured.
+"""
+
+import dataclasses
+import logging
+import os
+import re
+import tokenize
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from tools.code_analyzer import extract_outline
+
+logger = logging.getLogger(__name__)
+
+_EXT_LANG = {".py": "py", ".go": "go", ".java": "java", ".js": "js", ".ts": "ts",
+             ".yaml": "yaml", ".yml": "yaml"}
+_HASH_COMMENT = {"py", "yaml"}
+_SLASH_COMMENT = {"go", "java", "js", "ts"}
+
+_IMPORT_RE = {
+    "py": re.compile(r'^\s*(?:import\s+\S|from\s+\S+\s+import\b)'),
+    "go": re.compile(r'^\s*import\s+(?:\w+\s+)?"'),
+    "java": re.compile(r'^\s*import\s+[\w\.\*]+\s*;'),
+    "js": re.compile(r'^\s*(?:import\s.*from\s+[\'"]|import\s+[\'"]|(?:const|let|var)\s+.*=\s*require\()'),
+}
+_IMPORT_RE["ts"] = _IMPORT_RE["js"]
+_LICENSE_RE = re.compile(r'licen[sc]e|copyright|\(c\)|spdx', re.I)
+
+
+def language_of(source: Optional[str]) -> Optional[str]:
+    return _EXT_LANG.get(os.path.splitext(source or "")[1].lower())
+
+
+@dataclass
+class CompressionStats:
+    original_chars: int = 0
+    compressed_chars: int = 0
+    pieces: int = 0
+    outlined: int = 0
+
+    @property
+    def ratio(self) -> float:
+        """compressed / original (lower is better; 1.0 means nothing was removed)."""
+        return self.compressed_chars / self.original_chars if self.original_chars else 1.0
+
+    def add(self, before: str, after: str, outlined: bool = False):
+        self.original_chars += len(before)
+        self.compressed_chars += len(after)
+        self.pieces += 1
+        self.outlined += int(outlined)
+
+
+def _strip_license_header(lines: List[str], lang: str) -> List[str]:
+    """Drop a leading comment block that mentions a license/copyright."""
+    i = 0
+    while i < len(lines) and not lines[i].strip():
+        i += 1
+    if i < len(lines) and lines[i].lstrip().startswith("#!"):
+        i += 1
+    start = i
+    if lang in _SLASH_COMMENT and i < len(lines) and lines[i].lstrip().startswith("/*"):
+        while i < len(lines) and "*/" not in lines[i]:
+            i += 1
+        i += 1
+    else:
+        prefix = "#" if lang in _HASH_COMMENT else "//"
+        while i < len(lines) and lines[i].lstrip().startswith(prefix):
+            i += 1
+    if i > start and _LICENSE_RE.search("\n".join(lines[start:i])):
+        return lines[:start] + lines[i:]
+    return lines
+
+
+def _strip_imports(lines: List[str], lang: str) -> List[str]:
+    imp = _IMPORT_RE.get(lang)
+    if imp is None:
+        return lines
+    out, in_block = [], False
+    for line in lines:
+        s = line.strip()
+        if in_block:
+            # python parenthesised imports and Go/JS multi-line import blocks
+            if s.endswith(")") or s.startswith("}") or "}" in s and "from" in s:
+                in_block = False
+            continue
+        if lang == "go" and s in ("import (",):
+            in_block = True
+            continue
+        if imp.match(line):
+            in_block = s.endswith("(")
+            continue
+        if lang in ("js", "ts") and s.startswith("import {"):
+            in_block = True  # `import {` spanning lines, closed by the `} from "..."` line
+            continue
+        out.append(line)
+    return out
+
+
+def _py_droppable_lines(lines: List[str]) -> Optional[Set[int]]:
+    """0-based indices of comment-only lines (license headers included) and whole-line import
+    statements, found with one `tokenize` pass so look-alike lines inside docstrings and
+    multi-line strings are left alone. None when the chunk does not tokenize (e.g. it starts
+    or ends inside a string)."""
+    source = iter(line + "\n" for line in lines)
+    drop: Set[int] = set()
+    at_start, import_from, shared_line = True, None, False
+    try:
+        for tok in tokenize.generate_tokens(lambda: next(source, "")):
+            if tok.type == tokenize.COMMENT:
+                if not tok.line[:tok.start[1]].strip() and not tok.string.startswith("#!"):
+                    drop.add(tok.start[0] - 1)
+            elif tok.type in (tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT):
+                if import_from is not None and not shared_line:
+                    drop.update(range(import_from - 1, tok.start[0]))
+                at_start, import_from, shared_line = True, None, False
+            elif tok.type not in (tokenize.NL, tokenize.ENDMARKER):
+                if at_start and tok.type == tokenize.NAME and tok.string in ("import", "from"):
+                    import_from = tok.start[0]
+                elif tok.type == tokenize.OP and tok.string == ";":
+                    shared_line = True  # `import os; main()` keeps the code after it
+                at_start = False
+    except (tokenize.TokenError, SyntaxError):  # IndentationError is a SyntaxError
+        return None
+    return drop
+
+
+def _strip_python(lines: List[str]) -> List[str]:
+    drop = _py_droppable_lines(lines)
+    if drop is None:
+        return lines  # can't tell code from string contents: keep the chunk verbatim
+    return [line for i, line in enumerate(lines) if i not in drop]
+
+
+def _strip_comments(lines: List[str], lang: str) -> List[str]:
+    out, in_block = [], False
+    for line in lines:
+        s = line.strip()
+        if lang in _SLASH_COMMENT:
+            if in_block:
+                if "*/" in s:
+                    in_block = False
+                continue
+            if s.startswith("/*") and not s.startswith("/**"):
+                in_block = "*/" not in s
+                continue
+            if s.startswith("//"):
+                continue
+        elif lang in _HASH_COMMENT and s.startswith("#") and not s.startswith("#!"):
+            continue
+        out.append(line)
+    return out
+
+
+def _collapse_whitespace(lines: List[str]) -> str:
+    out, blank = [], False
+    for line in lines:
+        line = line.rstrip()
+        if not line:
+            if not blank and out:
+                out.append("")
+            blank = True
+            continue
+        blank = False
+        out.append(line)
+    return "\n".join(out).strip("\n")
+
+
+def compress_text(text: str, source: Optional[str], level: str = "strip") -> Tuple[str, bool]:
+    """Compress one chunk; returns (text, outlined?). Unknown languages only lose extra whitespace."""
+    lang = language_of(source)
+    if level == "outline" and lang in _IMPORT_RE:
+        outline = extract_outline(text, lang)
+        if outline.strip():
+            return outline, True
+    lines = text.splitlines()
+    if lang == "py":
+        lines = _strip_python(lines)
+    elif lang is not None:
+        lines = _strip_license_header(lines, lang)
+        lines = _strip_imports(lines, lang)
+        lines = _strip_comments(lines, lang)
+    return _collapse_whitespace(lines), False
+
+
+def compress_pieces(pieces: List, settings: Optional[Dict] = None) -> Tuple[List, CompressionStats]:
+    """Compress ranked context pieces (dataclasses with `.source` and `.text`, best first).
+
+    settings: {"enabled": bool, "outline_after": int} — pieces ranked at or beyond
+    `outline_after` are reduced to signatures + docstrings; earlier ones are only stripped.
+    """
+    settings = settings or {}
+    stats = CompressionStats()
+    if not settings.get("enabled", True):
+        return list(pieces), stats
+    outline_after = settings.get("outline_after")
+    out = []
+    for rank, p in enumerate(pieces):
+        level = "outline" if outline_after is not None and rank >= outline_after else "strip"
+        text, outlined = compress_text(p.text, p.source, level)
+        stats.add(p.text, text, outlined)
+        out.append(dataclasses.replace(p, text=text))
+    logger.info("🗜️ Compressed %d pieces: %d -> %d chars (ratio %.2f, %d outlined)",
+                stats.pieces, stats.original_chars, stats.compressed_chars, stats.ratio, stats.outlined)
+    return out, stats
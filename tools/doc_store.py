@@ -0,0 +1,210 @@
+# tools/doc_store.py
+"""
+Compact chunk-text store and lazily loaded retrieval hits.
+
+Chroma keeps a full copy of every chunk in its SQLite file although the text already lives
+in the indexed source files. `DocStore` keeps, per chunk id, only the source path, the byte
+span and a short digest of the chunk bytes; the text is read back from the file on demand.
+Chunks whose file can't be re-read at index time (or every chunk, with `keep_blobs=True`)
+are stored as zlib-compressed blobs instead. The store also keeps the index `generation`, a
+counter bumped whenever the index contents change, so caches of derived answers can tell
+when they were computed against an older index.
+
+`RetrievalHit` is the typed result of a vector search: id, score and metadata are there
+up front, the text is only fetched (in one batch per store, see `materialize`) when someone
+actually needs it — typically just the chunks that make it into the final prompt.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+TextLoader = Callable[[List[str]], Dict[str, str]]
+DigestLoader = Callable[[List[str]], Dict[str, str]]
+
+
+def chunk_digest(data: bytes) -> str:
+    """Digest of a chunk's bytes as recorded at index time."""
+    return hashlib.sha1(data).hexdigest()[:16]
+
+
+class DocStore:
+    def __init__(self, path: str, keep_blobs: bool = False):
+        self.path = path
+        self.keep_blobs = keep_blobs
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY,
+                source TEXT,
+                start_byte INTEGER,
+                end_byte INTEGER,
+                digest TEXT,
+                blob BLOB
+            )
+            """
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self._conn.commit()
+
+    def _row_for(self, doc_id: str, text: str, meta: Dict, files: Dict[str, Optional[bytes]]):
+        data = text.encode("utf-8")
+        source, start, end = meta.get("source"), meta.get("start_byte"), meta.get("end_byte")
+        if not self.keep_blobs and source and start is not None and end is not None:
+            if source not in files:
+                try:
+                    with open(source, "rb") as fh:
+                        files[source] = fh.read()
+                except OSError:
+                    files[source] = None
+            raw = files[source]
+            # the span must still decode to the indexed text, otherwise offsets are useless
+            if raw is not None and raw[start:end].decode("utf-8", errors="ignore") == text:
+                return doc_id, source, start, end, chunk_digest(raw[start:end]), None
+        return doc_id, source, start, end, chunk_digest(data), zlib.compress(data)
+
+    def put_many(self, ids: Sequence[str], documents: Sequence[str], metadatas: Sequence[Dict]) -> int:
+        """Store chunk texts (as offsets where possible); returns how many went in as blobs."""
+        files: Dict[str, Optional[bytes]] = {}
+        rows = [self._row_for(i, d or "", m or {}, files) for i, d, m in zip(ids, documents, metadatas)]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+        blobs = sum(1 for r in rows if r[5] is not None)
+        logger.info("🗃️ Doc store: %d chunks as offsets, %d as compressed blobs", len(rows) - blobs, blobs)
+        return blobs
+
+    def get_many(self, ids: Sequence[str]) -> Dict[str, str]:
+        """Texts for the given chunk ids. Unknown ids are absent from the result; a chunk whose
+        file changed since indexing comes back as "" (stale offsets are never served)."""
+        if not ids:
+            return {}
+        marks = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, source, start_byte, end_byte, digest, blob FROM chunks WHERE id IN ({marks})",
+                list(ids)).fetchall()
+        out: Dict[str, str] = {}
+        handles = {}
+        try:
+            for doc_id, source, start, end, digest, blob in rows:
+                if blob is not None:
+                    out[doc_id] = zlib.decompress(blob).decode("utf-8", errors="ignore")
+                    continue
+                data = None
+                try:
+                    fh = handles.get(source) or handles.setdefault(source, open(source, "rb"))
+                    fh.seek(start)
+                    data = fh.read(end - start)
+                except OSError:
+                    pass
+                if data is None or chunk_digest(data) != digest:
+                    logger.warning("⚠️ %s changed since indexing; chunk %s needs re-embedding", source, doc_id)
+                    out[doc_id] = ""
+                else:
+                    out[doc_id] = data.decode("utf-8", errors="ignore")
+        finally:
+            for fh in handles.values():
+                fh.close()
+        return out
+
+    def digests(self, ids: Sequence[str]) -> Dict[str, str]:
+        """Index-time `chunk_digest`s by chunk id, for callers that re-read spans from the
+        source files themselves (`tools.window_assembler`). Unknown ids are absent."""
+        if not ids:
+            return {}
+        marks = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(f"SELECT id, digest FROM chunks WHERE id IN ({marks})", list(ids)).fetchall()
+        return dict(rows)
+
+    def generation(self) -> int:
+        """Index generation; 0 for a store that has never been written."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    def bump_generation(self) -> int:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO meta VALUES ('generation', 1) ON CONFLICT(key) DO UPDATE SET value = value + 1")
+            self._conn.commit()
+            return int(self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0])
+
+    def size_bytes(self) -> int:
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+@dataclass
+class RetrievalHit:
+    id: str
+    score: Optional[float] = None
+    metadata: Dict = field(default_factory=dict)
+    rerank_score: Optional[float] = None
+    _loader: Optional[TextLoader] = field(default=None, repr=False, compare=False)
+    _text: Optional[str] = field(default=None, repr=False, compare=False)
+    _digests: Optional[DigestLoader] = field(default=None, repr=False, compare=False)
+
+    @property
+    def source(self) -> Optional[str]:
+        return self.metadata.get("source")
+
+    @property
+    def start(self) -> Optional[int]:
+        return self.metadata.get("start_byte")
+
+    @property
+    def end(self) -> Optional[int]:
+        return self.metadata.get("end_byte")
+
+    @property
+    def loaded(self) -> bool:
+        return self._text is not None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            materialize([self])
+        return self._text
+
+
+def materialize(hits: Sequence[RetrievalHit]) -> List[RetrievalHit]:
+    """Load the text of every not-yet-loaded hit, one loader call per store; returns `hits`."""
+    pending: Dict[TextLoader, List[RetrievalHit]] = {}
+    for h in hits:
+        if h._text is None:
+            if h._loader is None:
+                h._text = ""
+            else:
+                pending.setdefault(h._loader, []).append(h)
+    for loader, group in pending.items():
+        texts = loader([h.id for h in group])
+        for h in group:
+            h._text = texts.get(h.id) or ""
+    return list(hits)
+
+
+def load_digests(hits: Sequence[RetrievalHit]) -> Dict[str, str]:
+    """Index-time digests of the hits' chunks by id, one lookup per store; hits from a store
+    that doesn't record them are absent."""
+    pending: Dict[DigestLoader, List[str]] = {}
+    for h in hits:
+        if h._digests is not None:
+            pending.setdefault(h._digests, []).append(h.id)
+    out: Dict[str, str] = {}
+    for loader, ids in pending.items():
+        out.update(loader(ids))
+    return out
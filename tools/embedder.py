@@ -3,8 +3,7 @@ import os
 import glob
 import logging
 import hashlib
-from typing import List, Dict
-from sentence_transformers import SentenceTransformer
+from typing import List, Dict, Tuple
 
 from tools.vector_store import VectorStore
 
@@ -19,11 +18,57 @@ def _sha256_of_file(path: str) -> str:
             h.update(chunk)
     return h.hexdigest()
 
+def chunk_bytes(data: bytes, chunk_size: int = 1500, overlap: int = 200) -> List[Tuple[int, int]]:
+    """Split file content into line-aligned (start_byte, end_byte) spans of about `chunk_size` bytes.
+
+    Consecutive spans overlap by roughly `overlap` bytes (whole lines). Offsets index into the
+    original file so retrieval can re-read surrounding code straight from disk.
+    """
+    if len(data) <= chunk_size:
+        return [(0, len(data))]
+    line_starts = [0]
+    pos = data.find(b"\n")
+    while pos != -1:
+        line_starts.append(pos + 1)
+        pos = data.find(b"\n", pos + 1)
+    if line_starts[-1] != len(data):
+        line_starts.append(len(data))
+
+    spans = []
+    i = 0
+    while i < len(line_starts) - 1:
+        start = line_starts[i]
+        j = i + 1
+        while j < len(line_starts) - 1 and line_starts[j + 1] - start <= chunk_size:
+            j += 1
+        end = line_starts[j]
+        spans.append((start, end))
+        if end >= len(data):
+            break
+        # step back whole lines to keep ~overlap bytes, but always make progress
+        k = j
+        while k - 1 > i and end - line_starts[k - 1] <= overlap:
+            k -= 1
+        i = k if k > i else j
+    return spans
+
+
 class Embedder:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2", persist_dir: str = "chroma_db"):
-        logger.info("🔁 Loading SentenceTransformer model (%s) — this may take a moment.", model_name)
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", persist_dir: str = "chroma_db",
+                 chunk_size: int = 1500, chunk_overlap: int = 200, model=None):
+        """chunk_size / chunk_overlap are in bytes; each chunk records its byte span in the source file.
+
+        `model` replaces the SentenceTransformer: anything with `encode(texts, show_progress_bar=False)`
+        returning one vector per text (benchmarks pass a deterministic one)."""
+        if model is None:
+            # sentence-transformers pulls in torch; only import it when a real model is loaded
+            from sentence_transformers import SentenceTransformer
+            logger.info("🔁 Loading SentenceTransformer model (%s) — this may take a moment.", model_name)
+            model = SentenceTransformer(model_name)
+        self.model = model
         self.vs = VectorStore(persist_directory=persist_dir)
+        self.chunk_size = int(chunk_size)
+        self.chunk_overlap = int(chunk_overlap)
         logger.info("✅ Embedder initialized")
 
     def _gather_files(self, base_dir: str, exts: List[str] = None) -> List[str]:
@@ -48,27 +93,51 @@ class Embedder:
         ids = []
         metadatas = []
         embeddings = []
+        # Chroma rejects adds above its max batch size; chunks are added (and released) in batches
+        batch_size = self.vs.max_batch_size()
+        persisted = 0
 
         for idx, fp in enumerate(files):
             try:
-                with open(fp, "r", encoding="utf-8", errors="ignore") as fh:
-                    content = fh.read()
+                with open(fp, "rb") as fh:
+                    raw = fh.read()
             except Exception:
                 # binary or unreadable => skip
                 logger.warning("⚠️ Skipping unreadable file: %s", fp)
                 continue
-            if not content.strip():
+            if not raw.strip():
                 logger.info("⏭️ Empty content, skipping: %s", fp)
                 continue
-            chunk_id = f"{os.path.relpath(fp, base_dir)}::{_sha256_of_file(fp)[:8]}"
-            ids.append(chunk_id)
-            docs.append(content)
-            metadatas.append({"source": fp})
-            emb = self.model.encode(content, show_progress_bar=False).tolist()
-            embeddings.append(emb)
+            file_hash = hashlib.sha256(raw).hexdigest()[:8]
+            chunk_texts = []
+            for cidx, (start, end) in enumerate(chunk_bytes(raw, self.chunk_size, self.chunk_overlap)):
+                text = raw[start:end].decode("utf-8", errors="ignore")
+                if not text.strip():
+                    continue
+                ids.append(f"{os.path.relpath(fp, base_dir)}::{file_hash}::chunk{cidx}")
+                docs.append(text)
+                metadatas.append({"source": fp, "chunk_index": cidx, "start_byte": start, "end_byte": end})
+                chunk_texts.append(text)
+            if chunk_texts:
+                embeddings.extend(e.tolist() for e in self.model.encode(chunk_texts, show_progress_bar=False))
+            while len(ids) >= batch_size:
+                persisted += self._add_batch(ids, docs, metadatas, embeddings, batch_size)
 
-        if docs:
-            self.vs.add_documents(ids=ids, documents=docs, metadatas=metadatas, embeddings=embeddings)
-            logger.info("✅ Persisted %d code chunks to vector DB", len(ids))
+        while ids:
+            persisted += self._add_batch(ids, docs, metadatas, embeddings, batch_size)
+        # batches leave the ANN index file unsaved; write it once
+        self.vs.persist()
+        if persisted:
+            logger.info("✅ Persisted %d code chunks to vector DB", persisted)
         else:
             logger.warning("⚠️ No document content to embed.")
+
+    def _add_batch(self, ids: List[str], docs: List[str], metadatas: List[Dict], embeddings: List,
+                   batch_size: int) -> int:
+        """Add (and drop from the pending lists) the first `batch_size` pending chunks."""
+        n = min(batch_size, len(ids))
+        self.vs.add_documents(ids=ids[:n], documents=docs[:n], metadatas=metadatas[:n], embeddings=embeddings[:n],
+                              save_index=False)
+        for pending in (ids, docs, metadatas, embeddings):
+            del pending[:n]
+        return n
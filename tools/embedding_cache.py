@@ -0,0 +1,116 @@
+# tools/embedding_cache.py
+"""
+Process-wide LRU cache of query embeddings.
+
+Repeated and follow-up questions, and the same text embedded by several components
+(vector search, intent classification, ...), should not hit the embedding model again.
+Entries are keyed by (model, normalized text) and the cache is bounded by the bytes held
+in the vectors, not by entry count, so a long-running UI process stays within its budget.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+EmbedFn = Callable[[List[str]], Sequence]
+
+
+def normalize_query(text: str) -> str:
+    """Cache key text: surrounding and repeated whitespace doesn't change the question."""
+    return " ".join((text or "").split())
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = int(max_bytes)
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def _put(self, key: Tuple[str, str], vec: np.ndarray):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        if vec.nbytes > self.max_bytes:
+            return
+        self._entries[key] = vec
+        self._bytes += vec.nbytes
+        while self._bytes > self.max_bytes:
+            _, dropped = self._entries.popitem(last=False)
+            self._bytes -= dropped.nbytes
+            self.stats["evictions"] += 1
+
+    def embed(self, model: str, texts: Sequence[str], embed_fn: EmbedFn) -> List[np.ndarray]:
+        """Embeddings for `texts` under `model`; misses are embedded in one `embed_fn` call."""
+        keys = [(model, normalize_query(t)) for t in texts]
+        out: List[Optional[np.ndarray]] = [None] * len(keys)
+        missing: Dict[Tuple[str, str], List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vec = self._entries.get(key)
+                if vec is not None:
+                    self._entries.move_to_end(key)
+                    out[i] = vec
+                    self.stats["hits"] += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+                    self.stats["misses"] += 1
+        if missing:
+            # embed outside the lock; two threads racing on the same text just both compute it
+            vectors = embed_fn([key[1] for key in missing])
+            with self._lock:
+                for (key, slots), vec in zip(missing.items(), vectors):
+                    vec = np.asarray(vec, dtype=np.float32)
+                    vec.setflags(write=False)
+                    self._put(key, vec)
+                    for i in slots:
+                        out[i] = vec
+        return out
+
+    def resize(self, max_bytes: int):
+        """Change the byte cap, evicting least recently used vectors if it shrank."""
+        with self._lock:
+            self.max_bytes = int(max_bytes)
+            while self._bytes > self.max_bytes and self._entries:
+                _, dropped = self._entries.popitem(last=False)
+                self._bytes -= dropped.nbytes
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_CACHE: Optional[QueryEmbeddingCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_query_embedding_cache(max_bytes: Optional[int] = None) -> QueryEmbeddingCache:
+    """Process-wide cache; `max_bytes` only applies when the cache is first created."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = QueryEmbeddingCache(max_bytes or DEFAULT_MAX_BYTES)
+            logger.info("🧠 Query embedding cache started (%.0f MB cap)", _CACHE.max_bytes / 1e6)
+        return _CACHE
+
+
+def embed_queries(model: str, texts: Sequence[str], embed_fn: EmbedFn) -> List[np.ndarray]:
+    """Embed query texts through the shared cache."""
+    return get_query_embedding_cache().embed(model, texts, embed_fn)
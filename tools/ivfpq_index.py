@@ -0,0 +1,245 @@
+# tools/ivfpq_index.py
+"""
+Approximate nearest-neighbour index for very large corpora: coarse inverted-file (IVF)
+clustering plus product-quantized (PQ) residuals, in plain NumPy.
+
+- train(): k-means for `nlist` coarse centroids, then `m` sub-quantizers of 2**nbits
+  centroids each over the residuals (vector - coarse centroid).
+- add(): each vector is stored as its list id + `m` one-byte codes (instead of dim * 4 bytes),
+  laid out CSR-style (codes sorted by list, plus per-list offsets). Added vectors are encoded
+  right away but merged into the layout in one pass on the next search or save, so a run of
+  small adds costs a single rebuild. Re-adding an id replaces its entry.
+- search(): probe the `nprobe` closest lists, score candidates with asymmetric distance
+  computation (per-list lookup tables), return the k best ids and approximate L2² distances.
+- save()/load(): a single .npz file, so the index lives next to the Chroma directory.
+
+Typical sizing: nlist ~ 4 * sqrt(N), m = dim / 8 (48 bytes per 384-d vector).
+"""
+
+import logging
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _sq_dists(x: np.ndarray, c: np.ndarray, c_sq: Optional[np.ndarray] = None) -> np.ndarray:
+    """Squared L2 distances between rows of x (n, d) and c (k, d) -> (n, k)."""
+    if c_sq is None:
+        c_sq = (c * c).sum(1)
+    d = (x * x).sum(1)[:, None] - 2.0 * (x @ c.T) + c_sq[None, :]
+    np.maximum(d, 0, out=d)
+    return d
+
+
+def _assign(x: np.ndarray, c: np.ndarray, batch: int = 65536) -> np.ndarray:
+    c_sq = (c * c).sum(1)
+    out = np.empty(len(x), dtype=np.int64)
+    for s in range(0, len(x), batch):
+        out[s:s + batch] = _sq_dists(x[s:s + batch], c, c_sq).argmin(1)
+    return out
+
+
+def kmeans(x: np.ndarray, k: int, iters: int = 15, seed: int = 0) -> np.ndarray:
+    """Plain Lloyd's k-means; empty clusters are re-seeded from random points."""
+    rng = np.random.default_rng(seed)
+    x = np.asarray(x, dtype=np.float32)
+    if len(x) < k:
+        raise ValueError(f"need at least {k} training vectors, got {len(x)}")
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iters):
+        labels = _assign(x, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=k)
+        present = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[present]
+        sums = np.add.reduceat(x[order], starts, axis=0)
+        centroids[present] = sums / counts[present, None]
+        empty = counts == 0
+        if empty.any():
+            centroids[empty] = x[rng.choice(len(x), int(empty.sum()), replace=False)]
+    return centroids
+
+
+class IVFPQIndex:
+    def __init__(self, dim: int, nlist: int = 1024, m: int = 48, nbits: int = 8):
+        if dim % m != 0:
+            raise ValueError(f"dim ({dim}) must be divisible by m ({m})")
+        if nbits != 8:
+            raise ValueError("only 8-bit sub-quantizers (uint8 codes) are supported")
+        self.dim = dim
+        self.nlist = nlist
+        self.m = m
+        self.nbits = nbits
+        self.ksub = 2 ** nbits
+        self.dsub = dim // m
+        self.coarse: Optional[np.ndarray] = None      # (nlist, dim)
+        self.codebooks: Optional[np.ndarray] = None   # (m, ksub, dsub)
+        self._book_sq: Optional[np.ndarray] = None    # (m, ksub) squared codeword norms
+        # CSR layout (codes, ids, offsets): entries of list l live in [offsets[l], offsets[l + 1]).
+        # Replaced as one tuple by a merge, so a search reading a snapshot never mixes versions.
+        self._layout: Tuple[np.ndarray, np.ndarray, np.ndarray] = (
+            np.empty((0, m), dtype=np.uint8), np.empty(0, dtype=object), np.zeros(nlist + 1, dtype=np.int64))
+        # (ids, lists, codes) encoded by add() but not merged into the CSR layout yet
+        self._pending: List[Tuple[List, np.ndarray, np.ndarray]] = []
+        self._pending_lock = threading.Lock()
+        # one merge at a time; reentrant so `flush` can hold it across `add_encoded`
+        self._merge_lock = threading.RLock()
+
+    @property
+    def codes(self) -> np.ndarray:
+        return self._layout[0]
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._layout[1]
+
+    @property
+    def offsets(self) -> np.ndarray:
+        return self._layout[2]
+
+    @property
+    def is_trained(self) -> bool:
+        return self.coarse is not None and self.codebooks is not None
+
+    @property
+    def ntotal(self) -> int:
+        """Entries in the index; queued re-adds of an indexed id count until the next merge."""
+        return len(self.codes) + sum(len(ids) for ids, _, _ in self._pending)
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the index arrays (codes + centroids + codebooks + offsets; ids excluded)."""
+        total = self.codes.nbytes + self.offsets.nbytes
+        if self.is_trained:
+            total += self.coarse.nbytes + self.codebooks.nbytes
+        return int(total)
+
+    def train(self, sample: np.ndarray, iters: int = 15, seed: int = 0):
+        sample = np.asarray(sample, dtype=np.float32)
+        started = time.perf_counter()
+        self.coarse = kmeans(sample, self.nlist, iters=iters, seed=seed)
+        residuals = sample - self.coarse[_assign(sample, self.coarse)]
+        books = []
+        for j in range(self.m):
+            sub = residuals[:, j * self.dsub:(j + 1) * self.dsub]
+            books.append(kmeans(sub, self.ksub, iters=iters, seed=seed + j + 1))
+        self.codebooks = np.stack(books).astype(np.float32)
+        self._book_sq = None
+        logger.info("🧮 IVF-PQ trained on %d vectors (nlist=%d, m=%d) in %.1fs",
+                    len(sample), self.nlist, self.m, time.perf_counter() - started)
+
+    def _encode(self, residuals: np.ndarray) -> np.ndarray:
+        codes = np.empty((len(residuals), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            sub = residuals[:, j * self.dsub:(j + 1) * self.dsub]
+            codes[:, j] = _assign(sub, self.codebooks[j])
+        return codes
+
+    def encode(self, vectors: np.ndarray, batch: int = 65536) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (list ids, PQ codes) for a batch of vectors without adding them."""
+        if not self.is_trained:
+            raise RuntimeError("index must be trained before encoding vectors")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        lists = np.empty(len(vectors), dtype=np.int64)
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for s in range(0, len(vectors), batch):
+            v = vectors[s:s + batch]
+            lists[s:s + batch] = _assign(v, self.coarse)
+            codes[s:s + batch] = self._encode(v - self.coarse[lists[s:s + batch]])
+        return lists, codes
+
+    def add(self, ids: Sequence, vectors: np.ndarray):
+        """Encode and queue vectors; they're merged by the next search/save (`flush`)."""
+        lists, codes = self.encode(vectors)
+        with self._pending_lock:
+            self._pending.append((list(ids), lists, codes))
+
+    def flush(self):
+        """Merge vectors queued by `add` into the CSR layout (one rebuild for all of them)."""
+        # held across the merge so a concurrent search waits for the vectors it can't see yet
+        with self._merge_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return
+            self.add_encoded([i for ids, _, _ in pending for i in ids],
+                             np.concatenate([lists for _, lists, _ in pending]),
+                             np.concatenate([codes for _, _, codes in pending]))
+
+    def add_encoded(self, ids: Sequence, lists: np.ndarray, codes: np.ndarray):
+        """Merge pre-encoded entries and rebuild the CSR layout (call once per bulk load).
+        An id already in the index, or repeated in `ids`, keeps only its last entry."""
+        ids = list(ids)
+        lists = np.asarray(lists, dtype=np.int64)
+        codes = np.asarray(codes, dtype=np.uint8)
+        # last occurrence wins within the batch (re-indexing yields the same chunk ids)
+        seen = set()
+        fresh = np.zeros(len(ids), dtype=bool)
+        for i in range(len(ids) - 1, -1, -1):
+            if ids[i] not in seen:
+                seen.add(ids[i])
+                fresh[i] = True
+        with self._merge_lock:
+            old_codes, old_ids, old_offsets = self._layout
+            old_lists = np.repeat(np.arange(self.nlist), np.diff(old_offsets))
+            kept = np.fromiter((i not in seen for i in old_ids), dtype=bool, count=len(old_ids))
+            new_ids = np.empty(int(fresh.sum()), dtype=object)
+            new_ids[:] = [i for i, f in zip(ids, fresh) if f]
+            all_lists = np.concatenate([old_lists[kept], lists[fresh]])
+            all_codes = np.concatenate([old_codes[kept], codes[fresh]])
+            all_ids = np.concatenate([old_ids[kept], new_ids])
+            order = np.argsort(all_lists, kind="stable")
+            offsets = np.zeros(self.nlist + 1, dtype=np.int64)
+            np.cumsum(np.bincount(all_lists, minlength=self.nlist), out=offsets[1:])
+            self._layout = (all_codes[order], all_ids[order], offsets)
+
+    def search(self, query: np.ndarray, k: int = 10, nprobe: int = 8) -> Tuple[List[List], np.ndarray]:
+        """Return (ids, distances) for each query row; distances are approximate squared L2."""
+        self.flush()
+        codes, ids, offsets = self._layout  # one consistent snapshot, even if a merge lands mid-search
+        queries = np.atleast_2d(np.asarray(query, dtype=np.float32))
+        nprobe = min(nprobe, self.nlist)
+        probe = np.argsort(_sq_dists(queries, self.coarse), axis=1)[:, :nprobe]
+        all_ids, all_d = [], np.full((len(queries), k), np.inf, dtype=np.float32)
+        sub_rows = np.arange(self.m)[None, :]
+        if getattr(self, "_book_sq", None) is None or self._book_sq.shape != self.codebooks.shape[:2]:
+            self._book_sq = (self.codebooks * self.codebooks).sum(-1)
+        for qi, q in enumerate(queries):
+            lists = probe[qi]
+            sizes = offsets[lists + 1] - offsets[lists]
+            if not sizes.any():
+                all_ids.append([])
+                continue
+            # one ADC lookup table per probed list: (nprobe, m, ksub), ||r||^2 - 2 r.c + ||c||^2
+            r = (q[None, :] - self.coarse[lists]).reshape(len(lists), self.m, self.dsub)
+            tables = (np.einsum("pmd,mkd->pmk", r, self.codebooks, optimize=True) * -2.0
+                      + self._book_sq[None] + (r * r).sum(-1)[:, :, None])
+            pos = np.concatenate([np.arange(offsets[l], offsets[l + 1]) for l in lists])
+            owner = np.repeat(np.arange(len(lists)), sizes)
+            d = tables[owner[:, None], sub_rows, codes[pos]].sum(1)
+            kk = min(k, len(d))
+            top = np.argpartition(d, kk - 1)[:kk]
+            top = top[np.argsort(d[top])]
+            all_ids.append(list(ids[pos[top]]))
+            all_d[qi, :kk] = d[top]
+        return all_ids, all_d
+
+    def save(self, path: str):
+        self.flush()
+        codes, ids, offsets = self._layout
+        np.savez(path, dim=self.dim, nlist=self.nlist, m=self.m, nbits=self.nbits,
+                 coarse=self.coarse, codebooks=self.codebooks, codes=codes,
+                 ids=np.asarray([str(i) for i in ids]), offsets=offsets)
+        logger.info("💾 IVF-PQ index (%d vectors) saved to %s", len(ids), path)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFPQIndex":
+        data = np.load(path, allow_pickle=False)
+        idx = cls(int(data["dim"]), nlist=int(data["nlist"]), m=int(data["m"]), nbits=int(data["nbits"]))
+        idx.coarse = data["coarse"]
+        idx.codebooks = data["codebooks"]
+        idx._layout = (data["codes"], data["ids"].astype(object), data["offsets"])
+        return idx
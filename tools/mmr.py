@@ -0,0 +1,72 @@
+# tools/mmr.py
+"""
+Maximal-marginal-relevance (MMR) selection over candidate embeddings.
+
+Given a query embedding and N candidate embeddings, greedily pick k candidates that
+balance relevance to the query against redundancy with what was already picked:
+
+    score(d) = lambda * sim(q, d) - (1 - lambda) * max_{s in selected} sim(d, s)
+
+lambda=1.0 is plain similarity ranking, lambda=0.0 is maximum diversity.
+Everything is vectorized in NumPy: one N x N similarity matrix up front, then an
+O(N) running-max update per pick.
+"""
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+def cosine_similarities(query_embedding: Sequence[float], embeddings: Sequence[Sequence[float]]) -> np.ndarray:
+    """Cosine similarity of the query against every candidate, shape (N,)."""
+    q = _normalize(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))
+    e = _normalize(np.asarray(embeddings, dtype=np.float32))
+    return (e @ q.T).ravel()
+
+
+def mmr_select(query_embedding: Sequence[float],
+               embeddings: Sequence[Sequence[float]],
+               k: int = 5,
+               lambda_mult: float = 0.5) -> List[Tuple[int, float]]:
+    """Return [(candidate_index, query_similarity)] for the k MMR picks, in pick order."""
+    e = np.asarray(embeddings, dtype=np.float32)
+    if e.size == 0 or k <= 0:
+        return []
+    e = _normalize(e.reshape(len(e), -1))
+    q = _normalize(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))
+    relevance = (e @ q.T).ravel()
+    pairwise = e @ e.T
+
+    k = min(k, len(e))
+    selected = [int(np.argmax(relevance))]
+    # max similarity of every candidate to the selected set so far
+    redundancy = pairwise[selected[0]].copy()
+    available = np.ones(len(e), dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < k:
+        mmr = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        mmr[~available] = -np.inf
+        nxt = int(np.argmax(mmr))
+        selected.append(nxt)
+        available[nxt] = False
+        np.maximum(redundancy, pairwise[nxt], out=redundancy)
+
+    return [(i, float(relevance[i])) for i in selected]
+
+
+def mean_pairwise_similarity(embeddings: Sequence[Sequence[float]]) -> float:
+    """Average off-diagonal cosine similarity of a result set (a simple redundancy measure)."""
+    e = np.asarray(embeddings, dtype=np.float32)
+    n = len(e)
+    if n < 2:
+        return 0.0
+    e = _normalize(e.reshape(n, -1))
+    sims = e @ e.T
+    return float((sims.sum() - np.trace(sims)) / (n * (n - 1)))
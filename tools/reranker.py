@@ -0,0 +1,132 @@
+# tools/reranker.py
+"""
+Optional second retrieval stage: re-score over-fetched vector hits with a small
+local cross-encoder and keep only the best few.
+
+The cross-encoder is loaded lazily (sentence-transformers) on first use, pairs are
+scored in batches, and scores are cached per (query, chunk hash) so follow-up
+questions over the same chunks are free. Cost is bounded by `max_candidates`
+(pairs scored per call) and `max_chars` (text length fed to the model per chunk).
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def chunk_hash(text: str) -> str:
+    """Stable short hash of a chunk's text, used as part of the score cache key."""
+    return hashlib.sha256((text or "").encode("utf-8", errors="ignore")).hexdigest()[:16]
+
+
+class CrossEncoderReranker:
+    def __init__(self,
+                 model_name: str = DEFAULT_RERANK_MODEL,
+                 batch_size: int = 16,
+                 max_candidates: int = 30,
+                 max_chars: int = 2000,
+                 cache_size: int = 4096,
+                 model=None):
+        """model: optional pre-built scorer exposing `predict(pairs, batch_size=...)` (mainly for tests)."""
+        self.model_name = model_name
+        self.batch_size = int(batch_size)
+        self.max_candidates = int(max_candidates)
+        self.max_chars = int(max_chars)
+        self.cache_size = int(cache_size)
+        self._model = model
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()  # guards the score cache and `stats`
+        # separate from `_lock` so cache lookups aren't blocked while the model loads
+        self._load_lock = threading.Lock()
+        self.stats = {"calls": 0, "pairs_scored": 0, "cache_hits": 0, "batches": 0, "seconds": 0.0}
+
+    def _load_model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:  # concurrent first calls load the model once
+                    from sentence_transformers import CrossEncoder
+                    logger.info("🔁 Loading cross-encoder reranker (%s)", self.model_name)
+                    self._model = CrossEncoder(self.model_name)
+        return self._model
+
+    def _cache_get(self, key):
+        with self._lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _cache_put(self, key, score: float):
+        with self._lock:
+            self._cache[key] = score
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def score(self, query: str, documents: Sequence[str]) -> List[float]:
+        """Return one relevance score per document (higher is better)."""
+        started = time.perf_counter()
+        scores: List[Optional[float]] = [None] * len(documents)
+        pending = []
+        batches = 0
+        for i, doc in enumerate(documents):
+            key = (query, chunk_hash(doc))
+            cached = self._cache_get(key)
+            if cached is not None:
+                scores[i] = cached
+            else:
+                pending.append((i, key, (doc or "")[: self.max_chars]))
+
+        if pending:
+            model = self._load_model()
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                preds = model.predict([(query, text) for _, _, text in batch], batch_size=self.batch_size)
+                batches += 1
+                for (i, key, _), s in zip(batch, preds):
+                    scores[i] = float(s)
+                    self._cache_put(key, float(s))
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["cache_hits"] += len(documents) - len(pending)
+            self.stats["pairs_scored"] += len(pending)
+            self.stats["batches"] += batches
+            self.stats["seconds"] += elapsed
+        logger.info("🏅 Reranked %d candidates (%d scored, %d cached) in %.1f ms",
+                    len(documents), len(pending), len(documents) - len(pending), elapsed * 1000)
+        return scores
+
+    def rerank(self, query: str, documents: Sequence[str], top_n: int = 5) -> List[Tuple[int, float]]:
+        """Return [(candidate_index, score)] for the best `top_n` documents, best first.
+
+        Only the first `max_candidates` documents are scored so the per-call cost stays bounded.
+        """
+        candidates = list(documents)[: self.max_candidates]
+        if not candidates:
+            return []
+        scores = self.score(query, candidates)
+        ranked = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+        return [(i, scores[i]) for i in ranked[:top_n]]
+
+
+_RERANKERS: Dict[str, CrossEncoderReranker] = {}
+_RERANKERS_LOCK = threading.Lock()
+
+
+def get_reranker(model_name: str = DEFAULT_RERANK_MODEL, **kwargs) -> CrossEncoderReranker:
+    """Process-wide reranker per model name, so the model and score cache are loaded once."""
+    with _RERANKERS_LOCK:
+        rr = _RERANKERS.get(model_name)
+        if rr is None:
+            rr = CrossEncoderReranker(model_name=model_name, **kwargs)
+            _RERANKERS[model_name] = rr
+        return rr
@@ -0,0 +1,177 @@
+# tools/response_cache.py
+"""
+Persistent semantic cache of final agent responses.
+
+The same architecture questions come back with different wording. An entry stores the
+normalised query embedding, the detected intent, the index generation it was answered
+against and a fingerprint (mtime, size) of every source file in its prompt context. A
+lookup returns the most similar entry with the same intent and generation whose cosine
+similarity clears `threshold` — unless one of its source files changed since, in which
+case the entry is dropped. Entries from older index generations are purged on write.
+
+`report()` gives hit rate, the distribution of best-match similarities (useful to tune the
+threshold) and the latency saved, estimated from the original cost of each served answer.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.92
+DEFAULT_MAX_ENTRIES = 5000
+
+
+def fingerprint(sources: Iterable[str]) -> List[list]:
+    """[[path, mtime_ns, size]] for each distinct source (None stats for missing files)."""
+    out = []
+    for src in dict.fromkeys(s for s in sources if s):
+        try:
+            st = os.stat(src)
+            out.append([src, st.st_mtime_ns, st.st_size])
+        except OSError:
+            out.append([src, None, None])
+    return out
+
+
+def _unit(vec) -> np.ndarray:
+    v = np.asarray(vec, dtype=np.float32).ravel()
+    return v / max(float(np.linalg.norm(v)), 1e-12)
+
+
+@dataclass
+class CachedResponse:
+    query: str
+    agent: str
+    response: str
+    similarity: float
+    saved_ms: float
+    sources: List[str]
+
+
+class SemanticResponseCache:
+    def __init__(self, path: str, threshold: float = DEFAULT_THRESHOLD,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                intent TEXT,
+                generation INTEGER,
+                query TEXT,
+                embedding BLOB,
+                agent TEXT,
+                response TEXT,
+                sources TEXT,
+                cost_ms REAL,
+                created REAL,
+                last_used REAL,
+                hits INTEGER DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_key ON responses (intent, generation)")
+        self._conn.commit()
+        self.stats: Dict[str, float] = {"lookups": 0, "hits": 0, "misses": 0, "stale": 0, "saved_ms": 0.0}
+        self._similarities: deque = deque(maxlen=1000)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def lookup(self, embedding, intent: str, generation: int) -> Optional[CachedResponse]:
+        """Best fresh entry for (intent, generation) at or above the threshold, else None."""
+        q = _unit(embedding)
+        with self._lock:
+            self.stats["lookups"] += 1
+            rows = self._conn.execute(
+                "SELECT id, embedding, query, agent, response, sources, cost_ms FROM responses "
+                "WHERE intent = ? AND generation = ?", (intent, generation)).fetchall()
+            rows = [r for r in rows if len(r[1]) == q.nbytes]  # written by another embedding model
+            if not rows:
+                self.stats["misses"] += 1
+                return None
+            matrix = np.stack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+            sims = matrix @ q
+            self._similarities.append(float(sims.max()))
+            for i in np.argsort(-sims):
+                if sims[i] < self.threshold:
+                    break
+                row_id, _, query, agent, response, sources, cost_ms = rows[i]
+                recorded = json.loads(sources or "[]")
+                if fingerprint(s[0] for s in recorded) != recorded:
+                    # a file behind this answer changed; never serve it again
+                    self._conn.execute("DELETE FROM responses WHERE id = ?", (row_id,))
+                    self._conn.commit()
+                    self.stats["stale"] += 1
+                    continue
+                self._conn.execute("UPDATE responses SET hits = hits + 1, last_used = ? WHERE id = ?",
+                                   (time.time(), row_id))
+                self._conn.commit()
+                self.stats["hits"] += 1
+                self.stats["saved_ms"] += cost_ms or 0.0
+                return CachedResponse(query, agent, response, float(sims[i]), cost_ms or 0.0,
+                                      [s[0] for s in recorded])
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, embedding, intent: str, generation: int, query: str, agent: str, response: str,
+            sources: Sequence[str], cost_ms: float):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE generation != ?", (generation,))
+            self._conn.execute(
+                "INSERT INTO responses (intent, generation, query, embedding, agent, response, sources, "
+                "cost_ms, created, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (intent, generation, query, _unit(embedding).tobytes(), agent, response,
+                 json.dumps(fingerprint(sources)), cost_ms, now, now))
+            # least recently used entries beyond the size bound go first
+            self._conn.execute(
+                "DELETE FROM responses WHERE id IN (SELECT id FROM responses ORDER BY last_used DESC "
+                "LIMIT -1 OFFSET ?)", (self.max_entries,))
+            self._conn.commit()
+
+    def report(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self.stats)
+            sims = np.asarray(self._similarities, dtype=np.float32)
+        stats["hit_rate"] = round(stats["hits"] / stats["lookups"], 3) if stats["lookups"] else 0.0
+        if sims.size:
+            for p in (50, 90, 99):
+                stats[f"similarity_p{p}"] = round(float(np.percentile(sims, p)), 3)
+        stats["saved_ms"] = round(stats["saved_ms"], 1)
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_CACHES: Dict[str, SemanticResponseCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_response_cache(path: str, threshold: float = DEFAULT_THRESHOLD,
+                       max_entries: int = DEFAULT_MAX_ENTRIES) -> SemanticResponseCache:
+    """Process-wide cache per database path; threshold and size bound follow the latest call."""
+    with _CACHES_LOCK:
+        cache = _CACHES.get(path)
+        if cache is None:
+            cache = _CACHES[path] = SemanticResponseCache(path, threshold, max_entries)
+            logger.info("🗄️ Response cache at %s (threshold %.2f)", path, threshold)
+        cache.threshold, cache.max_entries = threshold, max_entries
+        return cache
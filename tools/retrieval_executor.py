@@ -0,0 +1,42 @@
+# tools/retrieval_executor.py
+"""
+Shared, bounded thread pool for blocking retrieval work (Chroma queries, embedding, reranking)
+so asyncio callers don't spawn a thread per search.
+
+`run_retrieval` awaits a blocking call on the pool. Cancelling the awaiting task cancels the
+pool job too if it hasn't started yet, so abandoned searches don't queue up behind live ones.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = min(8, (os.cpu_count() or 2) * 2)
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_LOCK = threading.Lock()
+
+
+def get_retrieval_executor(max_workers: Optional[int] = None) -> ThreadPoolExecutor:
+    """Process-wide retrieval pool; `max_workers` only applies when the pool is first created."""
+    global _EXECUTOR
+    with _LOCK:
+        if _EXECUTOR is None:
+            workers = max_workers or DEFAULT_MAX_WORKERS
+            _EXECUTOR = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="retrieval")
+            logger.info("🧵 Retrieval executor started with %d workers", workers)
+        return _EXECUTOR
+
+
+async def run_retrieval(fn: Callable, *args, **kwargs):
+    """Run a blocking retrieval function on the shared pool and await its result."""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(fn, *args, **kwargs)
+    # run_in_executor chains cancellation through to the pool future
+    return await loop.run_in_executor(get_retrieval_executor(), call)
@@ -0,0 +1,130 @@
+# tools/symbol_index.py
+"""
+In-memory symbol index built from the per-file metadata written by `tools.code_analyzer`.
+
+Maps names (functions, classes, file names) to where they are defined, so questions that
+name an exact symbol can be answered from the defining lines without embedding the query
+or touching the vector index.
+
+Only tokens that look like code are matched against the index: `backticked` names, names
+with "_" / "." / inner capitals (snake_case, CamelCase, file.ext), or calls like `name()`.
+Plain English words never trigger the fast path even if a symbol happens to share the name.
+"""
+
+import glob
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# a name referenced by more definitions than this is too ambiguous to be a precise lookup
+MAX_DEFINITIONS = 3
+
+_TOKEN_RE = re.compile(r'`([^`]+)`|([A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)*)(\(\))?')
+
+
+@dataclass(frozen=True)
+class Symbol:
+    name: str
+    kind: str  # "function" | "class" | "file"
+    file: str
+    start_line: Optional[int] = None  # 1-based, inclusive; None for whole files
+    end_line: Optional[int] = None
+
+    def read(self) -> Optional[str]:
+        """The defining lines (whole file for kind "file"), or None if the file is gone."""
+        try:
+            with open(self.file, "r", encoding="utf8", errors="ignore") as fh:
+                lines = fh.readlines()
+        except OSError:
+            return None
+        if self.start_line is None:
+            return "".join(lines)
+        return "".join(lines[self.start_line - 1:self.end_line])
+
+
+def _code_like(token: str, quoted: bool, called: bool) -> bool:
+    if quoted or called:
+        return True
+    return "_" in token or "." in token or bool(re.search(r'[a-z][A-Z]', token))
+
+
+class SymbolIndex:
+    def __init__(self):
+        self._by_name: Dict[str, List[Symbol]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def add(self, meta: Dict):
+        """Index one `code_analyzer.analyze_file` metadata dict."""
+        path = meta.get("file")
+        if not path:
+            return
+        self._by_name.setdefault(os.path.basename(path), []).append(Symbol(os.path.basename(path), "file", path))
+        for sym in meta.get("symbols") or []:
+            self._by_name.setdefault(sym["name"], []).append(
+                Symbol(sym["name"], sym["kind"], path, sym.get("start_line"), sym.get("end_line")))
+
+    @classmethod
+    def from_metadata_dir(cls, metadata_dir: str) -> "SymbolIndex":
+        index = cls()
+        for fp in glob.glob(os.path.join(metadata_dir, "*.json")):
+            try:
+                with open(fp, "r", encoding="utf8") as fh:
+                    index.add(json.load(fh))
+            except Exception as e:
+                logger.warning("⚠️ Skipping unreadable metadata %s: %s", fp, e)
+        logger.info("🗂️ Symbol index: %d names from %s", len(index), metadata_dir)
+        return index
+
+    def lookup(self, query: str, max_symbols: int = 5) -> List[Symbol]:
+        """Definitions of the known symbols named in `query`, in order of mention."""
+        found: List[Symbol] = []
+        for m in _TOKEN_RE.finditer(query or ""):
+            quoted = m.group(1) is not None
+            token = (m.group(1) or m.group(2) or "").strip().rstrip("()")
+            if not token or not _code_like(token, quoted, bool(m.group(3))):
+                continue
+            # "Cart.add_item" -> try the whole token, then its last and first parts
+            parts = token.split(".")
+            for name in dict.fromkeys(p for p in (token, parts[-1], parts[0]) if len(p) >= 3):
+                defs = self._by_name.get(name)
+                if defs and len(defs) <= MAX_DEFINITIONS:
+                    found.extend(d for d in defs if d not in found)
+                    break
+            if len(found) >= max_symbols:
+                break
+        return found[:max_symbols]
+
+
+_INDEXES: Dict[str, Tuple[float, SymbolIndex]] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_symbol_index(metadata_dir: str) -> SymbolIndex:
+    """Process-wide index per metadata dir, rebuilt when files are added to / removed from it.
+    Call `reset_symbol_index` after re-running the analyzer over existing files."""
+    try:
+        stamp = os.stat(metadata_dir).st_mtime
+    except OSError:
+        stamp = 0.0
+    with _INDEXES_LOCK:
+        cached = _INDEXES.get(metadata_dir)
+        if cached is None or cached[0] != stamp:
+            cached = (stamp, SymbolIndex.from_metadata_dir(metadata_dir))
+            _INDEXES[metadata_dir] = cached
+        return cached[1]
+
+
+def reset_symbol_index(metadata_dir: Optional[str] = None):
+    with _INDEXES_LOCK:
+        if metadata_dir is None:
+            _INDEXES.clear()
+        else:
+            _INDEXES.pop(metadata_dir, None)
@@ -1,19 +1,43 @@
 # tools/vector_store.py
 import os
 import json
+import asyncio
 import logging
 from typing import List, Dict, Optional
 
+import numpy as np
 import chromadb
 from chromadb.utils import embedding_functions
 
+from tools.mmr import mmr_select, mean_pairwise_similarity
+from tools.ivfpq_index import IVFPQIndex
+from tools.retrieval_executor import run_retrieval
+from tools.doc_store import DocStore, RetrievalHit, materialize
+from tools.embedding_cache import embed_queries
+
 logger = logging.getLogger(__name__)
 
+IVFPQ_FILE = "ivfpq_index.npz"
+DOCS_FILE = "docs.sqlite"
+DEFAULT_MAX_BATCH = 5000  # when the Chroma client can't report its own limit
+
+
 class VectorStore:
-    def __init__(self, persist_directory: str = "chroma_db", collection_name: str = "code_embeddings"):
+    def __init__(self, persist_directory: str = "chroma_db", collection_name: str = "code_embeddings",
+                 nprobe: int = 8, keep_blobs: bool = False):
+        """If an IVF-PQ index has been built for this store (see `build_ivfpq_index`), plain
+        similarity queries go through it with `nprobe` probed lists instead of Chroma's HNSW.
+
+        Chunk texts added with embeddings live in a `DocStore` next to the Chroma files (file
+        offsets, or compressed blobs with `keep_blobs=True`) rather than inside Chroma."""
         self.persist_directory = persist_directory
         os.makedirs(self.persist_directory, exist_ok=True)
         self.collection_name = collection_name
+        self.nprobe = nprobe
+        self.ivfpq: Optional[IVFPQIndex] = None
+        self._ivfpq_unsaved = False
+        self.docs = DocStore(os.path.join(self.persist_directory, f"{collection_name}_{DOCS_FILE}"),
+                             keep_blobs=keep_blobs)
 
         # Initialize PersistentClient (newer Chroma)
         try:
@@ -28,30 +52,214 @@ class VectorStore:
             logger.exception("💥 Failed to initialize Chroma: %s", e)
             raise
 
-    def add_documents(self, ids: List[str], documents: List[str], metadatas: List[Dict], embeddings: Optional[List[List[float]]] = None):
+        ivfpq_path = self._ivfpq_path()
+        if os.path.exists(ivfpq_path):
+            try:
+                self.ivfpq = IVFPQIndex.load(ivfpq_path)
+                logger.info("🧮 Loaded IVF-PQ index (%d vectors, nprobe=%d)", self.ivfpq.ntotal, self.nprobe)
+            except Exception as e:
+                logger.warning("⚠️ Ignoring unreadable IVF-PQ index %s: %s", ivfpq_path, e)
+
+    def encode_queries(self, query_texts: List[str]) -> List[np.ndarray]:
+        """Query embeddings through the process-wide cache (keyed by embedding model)."""
+        try:
+            model = self.embedding_fn.name()
+        except Exception:
+            model = type(self.embedding_fn).__name__
+        return embed_queries(f"chroma:{model}", query_texts, self.embedding_fn)
+
+    def generation(self) -> int:
+        """Index generation: changes whenever documents are added or the ANN index is rebuilt."""
+        return self.docs.generation()
+
+    def _ivfpq_path(self) -> str:
+        return os.path.join(self.persist_directory, f"{self.collection_name}_{IVFPQ_FILE}")
+
+    def max_batch_size(self) -> int:
+        """Largest number of items Chroma accepts in one `add`."""
+        try:
+            return int(self.client.get_max_batch_size())
+        except Exception:
+            return DEFAULT_MAX_BATCH
+
+    def add_documents(self, ids: List[str], documents: List[str], metadatas: List[Dict], embeddings: Optional[List[List[float]]] = None,
+                      save_index: bool = True):
+        """Add chunks. With an IVF-PQ index the new vectors are encoded into it too; the index
+        file is rewritten unless `save_index=False` (bulk loads call `persist()` once at the end)."""
         try:
             # If embeddings are provided, use them. Otherwise Chroma will try to call embedding_function (if configured)
             if embeddings:
-                self.collection.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+                # texts go to the compact doc store; Chroma only keeps vectors + metadata
+                self.docs.put_many(ids, documents, metadatas)
+                self.collection.add(ids=ids, metadatas=metadatas, embeddings=embeddings)
             else:
                 self.collection.add(ids=ids, documents=documents, metadatas=metadatas)
             logger.info("✅ Added %d items to Chroma collection '%s'", len(ids), self.collection_name)
+            self.docs.bump_generation()
+            if self.ivfpq is not None and embeddings:
+                # trained quantizers stay valid; new vectors are just assigned and encoded
+                self.ivfpq.add(ids, np.asarray(embeddings, dtype=np.float32))
+                self._ivfpq_unsaved = True
+                if save_index:
+                    self.save_ivfpq()
         except Exception as e:
             logger.exception("💥 Error adding docs to Chroma: %s", e)
             raise
 
-    def query(self, query_texts: List[str], n_results: int = 5):
+    def search(self, query_texts: List[str], n_results: int = 5, mode: str = "similarity",
+               fetch_k: Optional[int] = None, lambda_mult: float = 0.5) -> List[List[RetrievalHit]]:
+        """Query the collection; one list of `RetrievalHit` per query text, best first.
+
+        Hits carry id, metadata and `score` (cosine similarity to the query, higher is better);
+        their text is loaded lazily (see `tools.doc_store.materialize`).
+        mode="mmr" over-fetches `fetch_k` candidates (default 4 * n_results) and keeps
+        `n_results` chosen by maximal marginal relevance with the given `lambda_mult`.
+        """
         try:
-            res = self.collection.query(query_texts=query_texts, n_results=n_results)
+            if mode == "mmr":
+                return self._query_mmr(query_texts, n_results, fetch_k or 4 * n_results, lambda_mult)
+            if self.ivfpq is not None:
+                return self._query_ivfpq(query_texts, n_results)
+            res = self.collection.query(query_embeddings=self.encode_queries(query_texts), n_results=n_results,
+                                        include=["metadatas", "distances"])
             logger.info("🔍 Chroma query for %d texts returned.", len(query_texts))
-            return res
+            # default collection space is squared L2 over unit-normalised vectors: d = 2 - 2*cos
+            return [self._hits(res["ids"][qi], res["metadatas"][qi], [1.0 - d / 2.0 for d in dists])
+                    for qi, dists in enumerate(res.get("distances") or [])]
         except Exception as e:
             logger.exception("💥 Chroma query failed: %s", e)
-            return {"ids": [], "documents": [], "metadatas": []}
+            return []
+
+    def query(self, query_texts: List[str], n_results: int = 5, mode: str = "similarity",
+              fetch_k: Optional[int] = None, lambda_mult: float = 0.5):
+        """`search` with Chroma-shaped results (one nested list per query text, texts
+        materialized) plus `scores`, for callers that want plain dicts."""
+        out = {"ids": [], "documents": [], "metadatas": [], "scores": []}
+        for hits in self.search(query_texts, n_results, mode=mode, fetch_k=fetch_k, lambda_mult=lambda_mult):
+            materialize(hits)
+            out["ids"].append([h.id for h in hits])
+            out["documents"].append([h.text for h in hits])
+            out["metadatas"].append([h.metadata for h in hits])
+            out["scores"].append([h.score for h in hits])
+        return out
+
+    def load_texts(self, ids: List[str]) -> Dict[str, str]:
+        """Chunk texts by id: doc store first, Chroma documents for collections indexed before it."""
+        texts = self.docs.get_many(ids)
+        missing = [i for i in ids if i not in texts]
+        if missing:
+            got = self.collection.get(ids=missing, include=["documents"])
+            texts.update({i: d or "" for i, d in zip(got["ids"], got["documents"] or [])})
+        return texts
+
+    def _hits(self, ids, metadatas, scores) -> List[RetrievalHit]:
+        return [RetrievalHit(cid, float(score), meta or {}, _loader=self.load_texts,
+                             _digests=self.docs.digests)
+                for cid, meta, score in zip(ids, metadatas, scores)]
+
+    async def aquery(self, query_texts: List[str], n_results: int = 5, **kwargs):
+        """Async `query` on the shared bounded retrieval pool (cancellable while queued)."""
+        return await run_retrieval(self.query, query_texts, n_results=n_results, **kwargs)
+
+    async def asearch(self, query_texts: List[str], n_results: int = 5, **kwargs) -> List[List[RetrievalHit]]:
+        """Async `search` on the shared bounded retrieval pool (cancellable while queued)."""
+        return await run_retrieval(self.search, query_texts, n_results=n_results, **kwargs)
+
+    async def aquery_batch(self, query_batches: List[List[str]], n_results: int = 5, **kwargs):
+        """Run several `query` calls concurrently on the retrieval pool; results in input order.
+        Cancelling the caller cancels every batch that hasn't started."""
+        tasks = [asyncio.ensure_future(self.aquery(batch, n_results=n_results, **kwargs)) for batch in query_batches]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for t in tasks:
+                t.cancel()
+            raise
+
+    def _query_mmr(self, query_texts: List[str], n_results: int, fetch_k: int, lambda_mult: float):
+        query_embeddings = self.encode_queries(query_texts)
+        raw = self.collection.query(query_embeddings=query_embeddings, n_results=max(fetch_k, n_results),
+                                    include=["metadatas", "embeddings"])
+        out = []
+        for qi, q_emb in enumerate(query_embeddings):
+            cand_embs = raw["embeddings"][qi]
+            picks = mmr_select(q_emb, cand_embs, k=n_results, lambda_mult=lambda_mult)
+            idx = [i for i, _ in picks]
+            out.append(self._hits([raw["ids"][qi][i] for i in idx], [raw["metadatas"][qi][i] for i in idx],
+                                  [s for _, s in picks]))
+            logger.info("🔀 MMR kept %d/%d candidates (lambda=%.2f); redundancy %.3f -> %.3f",
+                        len(idx), len(cand_embs), lambda_mult,
+                        mean_pairwise_similarity(cand_embs[:n_results]),
+                        mean_pairwise_similarity([cand_embs[i] for i in idx]))
+        return out
+
+    def _query_ivfpq(self, query_texts: List[str], n_results: int):
+        hits, dists = self.ivfpq.search(np.asarray(self.encode_queries(query_texts)), k=n_results, nprobe=self.nprobe)
+        out = []
+        for qi, ids in enumerate(hits):
+            got = self.collection.get(ids=list(ids), include=["metadatas"]) if ids else {"ids": []}
+            pos = {cid: i for i, cid in enumerate(got["ids"])}
+            keep = [(cid, d) for cid, d in zip(ids, dists[qi]) if cid in pos]
+            out.append(self._hits([cid for cid, _ in keep], [got["metadatas"][pos[cid]] for cid, _ in keep],
+                                  [1.0 - float(d) / 2.0 for _, d in keep]))
+        logger.info("🔍 IVF-PQ query for %d texts returned (nprobe=%d).", len(query_texts), self.nprobe)
+        return out
+
+    def _iter_embeddings(self, page_size: int = 10000, offsets: Optional[List[int]] = None):
+        for offset in (offsets if offsets is not None else range(0, self.collection.count(), page_size)):
+            page = self.collection.get(include=["embeddings"], limit=page_size, offset=offset)
+            if len(page["ids"]):
+                yield page["ids"], np.asarray(page["embeddings"], dtype=np.float32)
+
+    def build_ivfpq_index(self, nlist: Optional[int] = None, m: Optional[int] = None,
+                          sample_size: int = 100000, page_size: int = 10000, seed: int = 0) -> IVFPQIndex:
+        """Train an IVF-PQ index from a sample of the stored embeddings, encode every stored
+        vector, and persist it next to the Chroma files. Subsequent similarity queries use it."""
+        total = self.collection.count()
+        if total == 0:
+            raise ValueError("collection is empty; nothing to index")
+        rng = np.random.default_rng(seed)
+        pages = list(range(0, total, page_size))
+        n_pages = max(1, min(len(pages), -(-sample_size // page_size)))
+        sample_pages = sorted(rng.choice(pages, n_pages, replace=False).tolist())
+        sample = np.concatenate([emb for _, emb in self._iter_embeddings(page_size, sample_pages)])[:sample_size]
+
+        dim = sample.shape[1]
+        nlist = nlist or max(1, min(int(4 * np.sqrt(total)), len(sample) // 39))
+        m = m or next(c for c in (dim // 8, dim // 4, dim // 2, dim) if c and dim % c == 0)
+        index = IVFPQIndex(dim, nlist=nlist, m=m)
+        needed = max(index.ksub, nlist)
+        if len(sample) < needed:
+            # k-means needs a training vector per centroid: nlist coarse ones, ksub per sub-quantizer
+            raise ValueError(f"IVF-PQ needs at least {needed} vectors to train (ksub={index.ksub}, nlist={nlist}) "
+                             f"but only {len(sample)} are available; keep using Chroma's own index for a "
+                             f"collection this small")
+        index.train(sample, seed=seed)
+
+        all_ids, all_lists, all_codes = [], [], []
+        for ids, emb in self._iter_embeddings(page_size):
+            lists, codes = index.encode(emb)
+            all_ids.extend(ids)
+            all_lists.append(lists)
+            all_codes.append(codes)
+        index.add_encoded(all_ids, np.concatenate(all_lists), np.concatenate(all_codes))
+        index.save(self._ivfpq_path())
+        self.ivfpq = index
+        self.docs.bump_generation()
+        logger.info("✅ IVF-PQ index built: %d vectors, nlist=%d, m=%d, %.1f MB",
+                    index.ntotal, nlist, m, index.memory_bytes() / 1e6)
+        return index
+
+    def save_ivfpq(self):
+        if self.ivfpq is not None:
+            self.ivfpq.save(self._ivfpq_path())
+            self._ivfpq_unsaved = False
 
     def persist(self):
         try:
-            # PersistentClient persists automatically, but keep a hook
+            # PersistentClient persists automatically; the IVF-PQ file is ours to write
+            if self._ivfpq_unsaved:
+                self.save_ivfpq()
             logger.info("💾 Chroma persistence OK (PersistentClient handles on-disk state).")
         except Exception as e:
             logger.exception("⚠️ Chroma persist failed: %s", e)
@@ -0,0 +1,181 @@
+# tools/window_assembler.py
+"""
+Parent-document window assembly.
+
+Retrieval works best on small chunks, but agents need the code around them. Given the
+retrieved chunk hits (id + source file + byte span, see `tools.embedder.chunk_bytes`),
+this module pads each span, coalesces adjacent/overlapping spans of the same file into one
+contiguous window, and reads the window straight from the original file. If the file is no
+longer readable, the window is stitched from the chunk texts we already have (the chunk store).
+
+Before a span is read from disk it is checked against the digest the doc store recorded at
+index time (or, without one, against the hit's chunk text), so a file edited since indexing
+never yields a misaligned window: such hits fall back to their stored chunk text and are
+dropped when the store can't serve it either.
+
+Hits without byte offsets (e.g. whole-file documents from an older index) pass through as-is.
+`assemble_windows` also takes `tools.doc_store.RetrievalHit`s directly; their text is then
+only loaded for pass-through hits, hits without a recorded digest and the fallbacks.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set
+
+from tools.doc_store import chunk_digest, load_digests, materialize
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChunkHit:
+    id: str
+    source: Optional[str]
+    start: Optional[int] = None
+    end: Optional[int] = None
+    text: str = ""
+    score: Optional[float] = None
+    digest: Optional[str] = None  # `chunk_digest` of the span at index time, when known
+
+
+@dataclass
+class Window:
+    source: Optional[str]
+    start: Optional[int]
+    end: Optional[int]
+    text: str
+    chunk_ids: List[str] = field(default_factory=list)
+    score: Optional[float] = None
+
+
+def hits_from_search(docs_dict: Dict) -> List[ChunkHit]:
+    """Build ChunkHits from the `docs_dict` returned by `sdk_tools.search_vector`."""
+    documents = docs_dict.get("documents") or []
+    metadatas = docs_dict.get("metadatas") or []
+    ids = docs_dict.get("ids") or []
+    scores = docs_dict.get("scores") or []
+    hits = []
+    for i, doc in enumerate(documents):
+        meta = (metadatas[i] if i < len(metadatas) else None) or {}
+        hits.append(ChunkHit(
+            id=ids[i] if i < len(ids) else str(i),
+            source=meta.get("source"),
+            start=meta.get("start_byte"),
+            end=meta.get("end_byte"),
+            text=doc or "",
+            score=scores[i] if i < len(scores) else None,
+        ))
+    return hits
+
+
+def _read_span(path: str, start: int, end: int) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as fh:
+            fh.seek(start)
+            return fh.read(end - start)
+    except OSError:
+        return None
+
+
+def _stale_hits(by_source: Dict[str, List], digests: Dict[str, str]) -> Set[int]:
+    """ids (`id()`) of hits whose span on disk no longer matches what was indexed. Hits of an
+    unreadable file aren't checked; their windows are stitched from the chunk texts."""
+    stale = set()
+    for source, file_hits in by_source.items():
+        try:
+            fh = open(source, "rb")
+        except OSError:
+            continue
+        with fh:
+            for h in file_hits:
+                expected = getattr(h, "digest", None) or digests.get(h.id)
+                if expected is None and not h.text:
+                    continue  # nothing recorded to check against
+                fh.seek(h.start)
+                data = fh.read(h.end - h.start)
+                if expected is not None:
+                    fresh = chunk_digest(data) == expected
+                else:
+                    fresh = data.decode("utf-8", errors="ignore") == h.text
+                if not fresh:
+                    stale.add(id(h))
+    return stale
+
+
+def _stitch(hits: Sequence[ChunkHit], start: int) -> str:
+    """Rebuild a window from overlapping chunk texts, skipping bytes already emitted."""
+    out = bytearray()
+    pos = start
+    for h in sorted(hits, key=lambda h: h.start):
+        data = h.text.encode("utf-8")
+        if h.end <= pos:
+            continue
+        skip = max(0, pos - h.start)
+        if h.start > pos:
+            out += b"\n...\n"
+        out += data[skip:]
+        pos = h.end
+    return out.decode("utf-8", errors="ignore")
+
+
+def assemble_windows(hits: Sequence, pad_bytes: int = 400, max_gap: int = 0) -> List[Window]:
+    """Merge hits (ChunkHits or RetrievalHits) into per-file windows, ordered by their best-ranked hit.
+
+    pad_bytes: context added on both sides of each hit before merging.
+    max_gap: padded spans of the same file closer than this are coalesced too.
+    """
+    passthrough = []
+    by_source: Dict[str, List[ChunkHit]] = {}
+    rank: Dict[int, int] = {}
+    for r, h in enumerate(hits):
+        rank[id(h)] = r
+        if h.source is None or h.start is None or h.end is None:
+            passthrough.append((r, Window(h.source, None, None, h.text, [h.id], h.score)))
+        else:
+            by_source.setdefault(h.source, []).append(h)
+
+    offset_hits = [h for file_hits in by_source.values() for h in file_hits]
+    digests = load_digests([h for h in offset_hits if getattr(h, "_digests", None) is not None])
+    # without a recorded digest the chunk text is the reference; load those in one batch
+    materialize([h for h in offset_hits if getattr(h, "_loader", None) is not None and h.id not in digests])
+    stale = _stale_hits(by_source, digests)
+    if stale:
+        outdated = [h for h in offset_hits if id(h) in stale]
+        materialize([h for h in outdated if getattr(h, "_loader", None) is not None])
+        for h in outdated:
+            by_source[h.source].remove(h)
+            if h.text:
+                passthrough.append((rank[id(h)], Window(h.source, None, None, h.text, [h.id], h.score)))
+        logger.warning("⚠️ %d chunk hit(s) changed on disk since indexing; served from the chunk store "
+                       "where possible, dropped otherwise", len(outdated))
+
+    windows = []
+    for source, file_hits in by_source.items():
+        if not file_hits:
+            continue
+        file_hits.sort(key=lambda h: h.start)
+        groups: List[List] = []
+        for h in file_hits:
+            lo, hi = max(0, h.start - pad_bytes), h.end + pad_bytes
+            if groups and lo <= groups[-1][1] + max_gap:
+                groups[-1][1] = max(groups[-1][1], hi)
+                groups[-1][2].append(h)
+            else:
+                groups.append([lo, hi, [h]])
+
+        for lo, hi, members in groups:
+            raw = _read_span(source, lo, hi)
+            if raw is not None:
+                text = raw.decode("utf-8", errors="ignore")
+                hi = lo + len(raw)
+            else:
+                logger.info("📄 %s not readable; stitching window from chunk store", source)
+                lo, hi = min(h.start for h in members), max(h.end for h in members)
+                text = _stitch(members, lo)
+            best = min(members, key=lambda h: rank[id(h)])
+            windows.append((rank[id(best)], Window(source, lo, hi, text, [h.id for h in members], best.score)))
+
+    windows.extend(passthrough)
+    merged = [w for _, w in sorted(windows, key=lambda t: t[0])]
+    logger.info("🪟 Assembled %d windows from %d chunk hits", len(merged), len(hits))
+    return merged